@@ -0,0 +1,271 @@
+"""
+Admission control: per-client rate limits, per-route concurrency caps and load shedding.
+
+Every request is sorted into a route class by method and path:
+
+    login   POST /auth_routes/token and /register, limited per (client IP, account)
+    bulk    file imports, JSON batch registration and batch check-ins
+    heavy   reports, search and exports
+    api     everything else, including door check-ins
+
+Admission control is off unless `RATE_LIMIT` is set. Each client, identified
+by the `sub` of a valid bearer token (else by IP), has a token bucket per
+class; logins are limited per account as well as IP, so a venue behind one
+NAT address is not held to a single budget. An empty bucket answers `429`
+with `Retry-After` set to when the next token arrives. Buckets are held by a
+`shared_state` backend: this process's memory by default, or the store at
+`RATE_LIMIT_URL` when workers should share one budget.
+
+Bulk and heavy requests also have a per-process concurrency cap. Requests
+over the cap wait in a bounded queue for a slot; a full queue, or a wait
+longer than `ADMISSION_QUEUE_TIMEOUT`, answers `429`. While the recent
+connection pool wait is over `SHED_POOL_WAIT_MS`, bulk and heavy requests
+are refused with `503` so the pool stays free for registrations and
+check-ins.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import re
+from collections import deque
+from urllib.parse import parse_qs
+
+import config
+import database
+import shared_state
+from auth import decode_token
+from metrics import Counter, registry
+
+# Login bodies up to this size are read for the account name; larger ones are keyed by IP alone
+LOGIN_BODY_LIMIT = 16 * 1024
+# Probes and documentation are never limited
+EXEMPT_PATHS = {"/metrics", "/ready", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"}
+
+REJECTED = registry.register(Counter(
+    "http_requests_rejected_total", "Requests refused by admission control, by route class and reason.",
+    ("route_class", "reason"),
+))
+
+buckets = shared_state.make_backend(config.RATE_LIMIT_URL, config.RATE_LIMIT_MAX_CLIENTS)
+
+
+class ConcurrencyLimit:
+    """
+    At most `limit` holders at once, with up to `queue` waiters served in arrival order.
+
+    Used from one event loop; a released slot is handed straight to the
+    oldest waiter.
+    """
+
+    def __init__(self, limit: int, queue: int):
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self._waiters = deque()
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to `timeout` seconds; False if the queue is full or the wait timed out."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # Cancelled just after being handed a slot: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class RouteClass:
+    """Requests limited together; limits are the named `config` settings, read per request."""
+
+    def __init__(self, name: str, rate: str, burst: str, concurrency: str = None, shed: bool = False,
+                 by_ip: bool = False):
+        self.name = name
+        self._rate = rate
+        self._burst = burst
+        self._concurrency = concurrency
+        self.shed = shed
+        self.by_ip = by_ip
+
+    @property
+    def rate(self) -> float:
+        return getattr(config, self._rate)
+
+    @property
+    def burst(self) -> float:
+        return getattr(config, self._burst)
+
+    def concurrency_limit(self):
+        """This process's cap for the class, or None if it has none."""
+        if self._concurrency is None:
+            return None
+        limit = _limits.get(self.name)
+        if limit is None:
+            limit = _limits[self.name] = ConcurrencyLimit(getattr(config, self._concurrency), config.ADMISSION_QUEUE)
+        return limit
+
+
+LOGIN = RouteClass("login", "LOGIN_RATE_LIMIT_RPS", "LOGIN_RATE_LIMIT_BURST", by_ip=True)
+BULK = RouteClass("bulk", "BULK_RATE_LIMIT_RPS", "BULK_RATE_LIMIT_BURST", "BULK_CONCURRENCY", shed=True)
+HEAVY = RouteClass("heavy", "RATE_LIMIT_RPS", "RATE_LIMIT_BURST", "HEAVY_READ_CONCURRENCY", shed=True)
+API = RouteClass("api", "RATE_LIMIT_RPS", "RATE_LIMIT_BURST")
+
+# (method, path pattern, class); the first match wins, anything else is API
+ROUTES = [
+    ("POST", re.compile(r"/auth_routes/(token|register)"), LOGIN),
+    ("POST", re.compile(r"/attendees/attendee/\d+/bulk-(upload|check-in)"), BULK),
+    ("POST", re.compile(r"/attendees/batch"), BULK),
+    ("PUT", re.compile(r"/attendees/checkin/batch"), BULK),
+    ("GET", re.compile(r"/reports/.*"), HEAVY),
+    ("GET", re.compile(r"/(events|attendees)/search"), HEAVY),
+    ("GET", re.compile(r"/attendees/attendee/\d+/export"), HEAVY),
+]
+
+_limits = {}
+
+
+def classify(method: str, path: str) -> RouteClass:
+    for route_method, pattern, route_class in ROUTES:
+        if method == route_method and pattern.fullmatch(path):
+            return route_class
+    return API
+
+
+def client_key(scope, route_class: RouteClass, account: str = None) -> str:
+    """
+    The bearer token's `sub` when it verifies (and the class allows it), else the client IP.
+
+    `account`, the login's user name, is added to the IP for login requests.
+    """
+    if not route_class.by_ip:
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            payload = decode_token(token)
+            if payload and payload.get("sub"):
+                return "sub:" + str(payload["sub"])
+    client = scope.get("client")
+    key = "ip:" + (client[0] if client else "unknown")
+    if account:
+        key += ":" + hashlib.sha256(account.encode()).hexdigest()[:16]
+    return key
+
+
+def login_account(content_type: bytes, body: bytes):
+    """The user name in a token form (`username`) or registration JSON (`email`) body, if any."""
+    try:
+        if content_type.startswith(b"application/x-www-form-urlencoded"):
+            name = parse_qs(body.decode()).get("username", [None])[0]
+        elif content_type.startswith(b"application/json"):
+            data = json.loads(body)
+            name = data.get("email") if isinstance(data, dict) else None
+        else:
+            return None
+    except ValueError:
+        return None
+    return name.strip().lower() if isinstance(name, str) and name.strip() else None
+
+
+async def _read_login(scope, receive):
+    """Read a login request's body for its account; returns it and a `receive` replaying what was read."""
+    messages, body = [], b""
+    while len(body) <= LOGIN_BODY_LIMIT:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    last = messages[-1]
+    complete = last["type"] == "http.request" and not last.get("more_body")
+    account = login_account(dict(scope["headers"]).get(b"content-type", b""), body) if complete else None
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+    return account, replay
+
+
+def overloaded() -> bool:
+    """True while requests wait longer than SHED_POOL_WAIT_MS for a database connection."""
+    return 0 < config.SHED_POOL_WAIT_MS < database.pool_metrics.recent_wait() * 1000
+
+
+def reset():
+    """Forget all buckets and concurrency caps (caps are rebuilt from `config`)."""
+    buckets.clear()
+    _limits.clear()
+
+
+async def _reject(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        (b"content-length", str(len(body)).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying the limits in the module docstring."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.RATE_LIMIT or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"])
+        # Shed before taking a token, so a refused request costs the client nothing
+        if route_class.shed and overloaded():
+            REJECTED.inc(route_class.name, "shed")
+            await _reject(send, 503, "The server is busy; try again shortly", 1)
+            return
+        account = None
+        if route_class.by_ip:
+            account, receive = await _read_login(scope, receive)
+        key = f"rate:{route_class.name}:{client_key(scope, route_class, account)}"
+        wait = await shared_state.call(buckets, "take", key, route_class.rate, route_class.burst)
+        if wait:
+            REJECTED.inc(route_class.name, "rate_limited")
+            await _reject(send, 429, "Rate limit exceeded", wait)
+            return
+
+        limit = route_class.concurrency_limit()
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        if not await limit.acquire(config.ADMISSION_QUEUE_TIMEOUT):
+            REJECTED.inc(route_class.name, "concurrency")
+            await _reject(send, 429, f"Too many {route_class.name} requests in progress", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
@@ -1,8 +1,9 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
 from sqlalchemy import pool
-from database import Base
+import config as app_config
+from database import Base, make_engine
+import models  # noqa: F401  (registers the tables on Base.metadata)
 
 from alembic import context
 
@@ -26,6 +27,22 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Always the app's database (DATABASE_URL, else the app's default), so a
+# plain `alembic upgrade head` migrates the database the app checks at startup.
+# Used directly rather than through the ini options, whose interpolation
+# rejects the `%` of percent-encoded passwords.
+database_url = app_config.DATABASE_URL
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the search index (see search.py) out of autogenerate: it is created by DDL, not the models."""
+    if type_ == "table":
+        # FTS5 virtual tables and their _data/_idx/_config/_docsize shadow tables
+        return "_fts" not in name
+    if type_ == "index":
+        return not name or not name.endswith("_search_trgm")
+    return True
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -39,10 +56,10 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
+        url=database_url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -58,15 +75,12 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    # Same engine factory as the app (SQLite pragmas included), without pooling
+    connectable = make_engine(database_url, poolclass=pool.NullPool)
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,31 @@
+"""keyset pagination indexes
+
+Revision ID: 1a5f8c3d2e64
+Revises: d81f6a2c9e47
+Create Date: 2026-10-18 10:30:00.000000
+
+Indexes matching the sort keys of the paginated listings, so every page is
+an index range scan: events by (start_time, event_id) and attendees of an
+event by attendee_id.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1a5f8c3d2e64'
+down_revision: Union[str, None] = 'd81f6a2c9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_events_start_time_event_id', 'events', ['start_time', 'event_id'])
+    op.create_index('ix_attendees_event_id_attendee_id', 'attendees', ['event_id', 'attendee_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendees_event_id_attendee_id', table_name='attendees')
+    op.drop_index('ix_events_start_time_event_id', table_name='events')
@@ -0,0 +1,36 @@
+"""add events.registered_count
+
+Revision ID: 4b7d0e3c5a12
+Revises: 9c2e4f1a7b30
+Create Date: 2026-10-18 09:30:00.000000
+
+Denormalized attendee count used for O(1), race-free capacity checks.
+Existing rows are backfilled from the attendees table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7d0e3c5a12'
+down_revision: Union[str, None] = '9c2e4f1a7b30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'events',
+        sa.Column('registered_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.execute(
+        "UPDATE events SET registered_count = "
+        "(SELECT COUNT(*) FROM attendees WHERE attendees.event_id = events.event_id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('registered_count')
@@ -0,0 +1,70 @@
+"""initial schema
+
+Revision ID: 9c2e4f1a7b30
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+Tables as created by `Base.metadata.create_all` before migrations were
+introduced. Databases created that way should be stamped with this
+revision (`alembic stamp 9c2e4f1a7b30`) and then upgraded.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2e4f1a7b30'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'events',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=False),
+        sa.Column('location', sa.String(), nullable=True),
+        sa.Column('max_attendees', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('scheduled', 'ongoing', 'completed', 'canceled', name='eventstatus'), nullable=True),
+        sa.PrimaryKeyConstraint('event_id'),
+    )
+    op.create_index('ix_events_event_id', 'events', ['event_id'], unique=False)
+    op.create_table(
+        'users',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_user_id', 'users', ['user_id'], unique=False)
+    op.create_table(
+        'attendees',
+        sa.Column('attendee_id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(), nullable=False),
+        sa.Column('last_name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('phone_number', sa.String(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('check_in_status', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['events.event_id']),
+        sa.PrimaryKeyConstraint('attendee_id'),
+        sa.UniqueConstraint('email'),
+    )
+    op.create_index('ix_attendees_attendee_id', 'attendees', ['attendee_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendees_attendee_id', table_name='attendees')
+    op.drop_table('attendees')
+    op.drop_index('ix_users_user_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
+    op.drop_index('ix_events_event_id', table_name='events')
+    op.drop_table('events')
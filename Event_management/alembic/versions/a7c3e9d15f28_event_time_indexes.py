@@ -0,0 +1,29 @@
+"""event time-window and venue indexes
+
+Revision ID: a7c3e9d15f28
+Revises: f2d6b8c41e07
+Create Date: 2026-10-18 12:30:00.000000
+
+(start_time, end_time) serves the from/to and happening-now filters of
+list_events; (location, start_time) serves venue overlap checks.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9d15f28'
+down_revision: Union[str, None] = 'f2d6b8c41e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_events_start_time_end_time', 'events', ['start_time', 'end_time'])
+    op.create_index('ix_events_location_start_time', 'events', ['location', 'start_time'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_location_start_time', table_name='events')
+    op.drop_index('ix_events_start_time_end_time', table_name='events')
@@ -0,0 +1,62 @@
+"""reporting rollup tables
+
+Revision ID: c6e2d4a8f913
+Revises: a7c3e9d15f28
+Create Date: 2026-10-18 13:00:00.000000
+
+Per-event daily activity and per-(location, status) totals, maintained by
+the write paths (see reporting.py). Group totals are backfilled from the
+events table; daily activity starts empty, as attendees have no
+registration time to rebuild it from.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e2d4a8f913'
+down_revision: Union[str, None] = 'a7c3e9d15f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# reporting.SHARDS when this revision was written
+SHARDS = 8
+
+
+def upgrade() -> None:
+    op.create_table(
+        'event_daily_stats',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('registrations', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('check_ins', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['event_id'], ['events.event_id']),
+        sa.PrimaryKeyConstraint('event_id', 'day'),
+    )
+    op.create_index('ix_event_daily_stats_day', 'event_daily_stats', ['day'])
+    op.create_table(
+        'event_group_stats',
+        sa.Column('location', sa.String(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('events', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('capacity', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('registered', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('checked_in', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('location', 'status', 'shard'),
+    )
+    op.execute(
+        "INSERT INTO event_group_stats (location, status, shard, events, capacity, registered, checked_in) "
+        "SELECT COALESCE(location, ''), COALESCE(CAST(status AS VARCHAR), ''), event_id % {shards}, COUNT(*), "
+        "SUM(max_attendees), SUM(registered_count), SUM(checked_in_count) FROM events "
+        "GROUP BY COALESCE(location, ''), COALESCE(CAST(status AS VARCHAR), ''), event_id % {shards}"
+        .format(shards=SHARDS)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('event_group_stats')
+    op.drop_index('ix_event_daily_stats_day', table_name='event_daily_stats')
+    op.drop_table('event_daily_stats')
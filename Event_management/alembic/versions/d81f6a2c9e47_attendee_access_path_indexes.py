@@ -0,0 +1,49 @@
+"""attendee and event access path indexes
+
+Revision ID: d81f6a2c9e47
+Revises: 4b7d0e3c5a12
+Create Date: 2026-10-18 10:00:00.000000
+
+Replaces the global unique email with a per-event (event_id, email) unique
+constraint, whose index also serves every lookup by event_id. Adds
+(event_id, check_in_status) for check-in counts and (status, location) for
+list_events.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f6a2c9e47'
+down_revision: Union[str, None] = '4b7d0e3c5a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Names SQLite's unnamed constraints when batch mode reflects the table
+NAMING_CONVENTION = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _email_unique_name() -> str:
+    for constraint in sa.inspect(op.get_bind()).get_unique_constraints('attendees'):
+        if constraint['column_names'] == ['email'] and constraint['name']:
+            return constraint['name']
+    return 'uq_attendees_email'
+
+
+def upgrade() -> None:
+    email_unique = _email_unique_name()
+    with op.batch_alter_table('attendees', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(email_unique, type_='unique')
+        batch_op.create_unique_constraint('uq_attendees_event_id_email', ['event_id', 'email'])
+        batch_op.create_index('ix_attendees_event_id_check_in_status', ['event_id', 'check_in_status'])
+    op.create_index('ix_events_status_location', 'events', ['status', 'location'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_status_location', table_name='events')
+    with op.batch_alter_table('attendees') as batch_op:
+        batch_op.drop_index('ix_attendees_event_id_check_in_status')
+        batch_op.drop_constraint('uq_attendees_event_id_email', type_='unique')
+        batch_op.create_unique_constraint('uq_attendees_email', ['email'])
@@ -0,0 +1,37 @@
+"""add events.checked_in_count
+
+Revision ID: e5c19b7a0d83
+Revises: 1a5f8c3d2e64
+Create Date: 2026-10-18 11:00:00.000000
+
+Denormalized check-in count, so occupancy summaries and streams read one
+row instead of counting attendees. Existing rows are backfilled.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c19b7a0d83'
+down_revision: Union[str, None] = '1a5f8c3d2e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'events',
+        sa.Column('checked_in_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.execute(
+        "UPDATE events SET checked_in_count = "
+        "(SELECT COUNT(*) FROM attendees WHERE attendees.event_id = events.event_id "
+        "AND attendees.check_in_status)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('checked_in_count')
@@ -0,0 +1,72 @@
+"""search indexes for events and attendees
+
+Revision ID: f2d6b8c41e07
+Revises: b3f7a9e2c415
+Create Date: 2026-10-18 12:00:00.000000
+
+SQLite: FTS5 tables over the searchable columns, kept in step by triggers
+and rebuilt from the existing rows. PostgreSQL: pg_trgm GIN indexes over the
+same columns. See search.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d6b8c41e07'
+down_revision: Union[str, None] = 'b3f7a9e2c415'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EVENT_COLUMNS = ['name', 'description', 'location']
+ATTENDEE_COLUMNS = ['first_name', 'last_name', 'email', 'phone_number', 'event_id']
+EVENT_DOCUMENT = (
+    "(coalesce(events.name, '') || ' ' || coalesce(events.description, '') || ' ' || "
+    "coalesce(events.location, ''))"
+)
+ATTENDEE_DOCUMENT = (
+    "(attendees.first_name || ' ' || attendees.last_name || ' ' || attendees.email || ' ' || "
+    "attendees.phone_number)"
+)
+
+
+def _sqlite_fts(table: str, key: str, columns: list) -> None:
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{name}' for name in columns)
+    old = ', '.join(f'old.{name}' for name in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{key}, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.{key}, {new});"
+
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='{key}', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    )
+    op.execute(f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END")
+    op.execute(f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END")
+    op.execute(f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END")
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _sqlite_fts('events', 'event_id', EVENT_COLUMNS)
+        _sqlite_fts('attendees', 'attendee_id', ATTENDEE_COLUMNS)
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(f"CREATE INDEX ix_events_search_trgm ON events USING gin ({EVENT_DOCUMENT} gin_trgm_ops)")
+        op.execute(f"CREATE INDEX ix_attendees_search_trgm ON attendees USING gin ({ATTENDEE_DOCUMENT} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for table in ('events', 'attendees'):
+            for action in ('insert', 'delete', 'update'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{action}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_attendees_search_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_events_search_trgm")
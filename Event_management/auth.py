@@ -1,10 +1,22 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
+from cache import TTLCache
+from config import (
+    BCRYPT_ROUNDS, LOGIN_CONCURRENCY_PER_ACCOUNT, PASSWORD_HASH_WORKERS,
+    TOKEN_CACHE_SIZE, USER_CACHE_SIZE, USER_CACHE_TTL,
+)
 from database import get_db
 from models import User  # Assuming you have a User model
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -14,31 +26,104 @@ SECRET_KEY = "hgdjkbsajdte38yywoyvcjd "
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 security = HTTPBearer()
-# Password hashing setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing setup; hashes with a different cost report needs_update
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+# Bounded pool so bcrypt never runs on the event loop or starves the request threadpool
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Verified token payloads keyed by token hash, each expiring at the token's `exp`
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+# Minimal user snapshots keyed by email, so per-request auth skips the users table
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, hash_password, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    """
+    Verify on the hashing pool; returns (valid, new_hash).
+
+    `new_hash` is set when the stored hash uses a different cost than
+    BCRYPT_ROUNDS and should replace it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+_login_slots = {}
+_login_slots_lock = threading.Lock()
+
+@contextmanager
+def login_slot(email: str):
+    """Cap concurrent logins per account so one user cannot monopolise the hashing pool."""
+    with _login_slots_lock:
+        if _login_slots.get(email, 0) >= LOGIN_CONCURRENCY_PER_ACCOUNT:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many concurrent login attempts for this account",
+            )
+        _login_slots[email] = _login_slots.get(email, 0) + 1
+    try:
+        yield
+    finally:
+        with _login_slots_lock:
+            _login_slots[email] -= 1
+            if not _login_slots[email]:
+                del _login_slots[email]
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
 def decode_token(token: str):
+    """Return the verified payload, or None; signatures are checked once per token."""
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
 
+    # Never serve a token from the cache past its expiry
+    if "exp" in payload:
+        ttl = payload["exp"] - time.time()
+        if ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+def invalidate_token(token: str):
+    token_cache.delete(_token_key(token))
+
+def invalidate_user(email: str):
+    user_cache.delete(email)
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Cover both the current and, after an email change, the previous address
+    history = inspect(target).attrs.email.history
+    for email in {target.email, *history.deleted}:
+        invalidate_user(email)
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -49,10 +134,15 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if not payload or "sub" not in payload:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == payload["sub"]).first()
-    if not user:
-        raise credentials_exception
-    return user
+    snapshot = user_cache.get(payload["sub"])
+    if snapshot is None:
+        user = db.query(User).filter(User.email == payload["sub"]).first()
+        if not user:
+            raise credentials_exception
+        snapshot = {"user_id": user.user_id, "email": user.email}
+        user_cache.set(payload["sub"], snapshot)
+    # Fresh, session-less object; callers get the identity, never the password hash
+    return User(**snapshot)
 
 
 
@@ -61,13 +151,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 
 def token_required(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Validate JWT token before accessing APIs"""
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload  # Returns decoded user data if token is valid
-    except JWTError:
+    payload = decode_token(credentials.credentials)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+    return payload  # Returns decoded user data if token is valid
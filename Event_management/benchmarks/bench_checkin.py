@@ -0,0 +1,98 @@
+"""
+Door check-in throughput: one transaction per scan vs the write-behind buffer.
+
+Loads a throwaway SQLite database, then has `--concurrency` threads (the
+scanners at the doors) check in `--scans` distinct attendees through
+
+    direct     `_check_in_attendee`: SELECT, UPDATE, counter, commit, refresh
+    buffered   attendee read + `CheckInBuffer.submit` (durable log append),
+               with the flusher applying batches every CHECKIN_FLUSH_MS
+
+and reports scans per second and p99 acknowledgement latency. The buffered
+figure includes the final flush, so every scan is in the database when the
+clock stops.
+
+    python -m benchmarks.bench_checkin --scans 20000 --concurrency 32
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.datagen import populate
+from checkin_buffer import CheckInBuffer
+from database import make_engine
+from models import Attendee
+from routers.attendence import _check_in_attendee, _get_detached_attendee
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed(fn, ids: list, concurrency: int):
+    def scan(attendee_id):
+        start = time.perf_counter()
+        fn(attendee_id)
+        return (time.perf_counter() - start) * 1000
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(scan, ids))
+    return time.perf_counter() - begin, latencies
+
+
+def run(mode: str, scans: int, concurrency: int, flush_ms: float, tmp: Path) -> dict:
+    engine = make_engine(f"sqlite:///{tmp / f'{mode}.db'}", pool_size=concurrency, max_overflow=0)
+    populate(engine, 50, scans * 3 // 2 + 3)
+    Session = sessionmaker(bind=engine)
+    # populate() checks in every third attendee (ids 1, 4, 7, ...); scan the others
+    ids = [attendee_id for attendee_id in range(1, scans * 3 // 2 + 3) if (attendee_id - 1) % 3][:scans]
+
+    if mode == "direct":
+        def check_in(attendee_id):
+            with Session() as db:
+                _check_in_attendee(db, attendee_id)
+        elapsed, latencies = timed(check_in, ids, concurrency)
+    else:
+        buffer = CheckInBuffer(str(tmp / "log"), Session, flush_ms=flush_ms).start()
+
+        def check_in(attendee_id):
+            with Session() as db:
+                _get_detached_attendee(db, attendee_id)
+            buffer.submit(attendee_id)
+        begin = time.perf_counter()
+        _, latencies = timed(check_in, ids, concurrency)
+        buffer.stop()
+        elapsed = time.perf_counter() - begin
+
+    with Session() as db:
+        applied = db.scalar(select(func.count()).where(Attendee.attendee_id.in_(ids), Attendee.check_in_status))
+    engine.dispose()
+    return {"scans_per_second": scans / elapsed, "p50_ms": statistics.median(latencies),
+            "p99_ms": percentile(latencies, 99), "applied": applied}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--flush-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'scans/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'applied':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("direct", "buffered"):
+            result = run(mode, args.scans, args.concurrency, args.flush_ms, Path(tmp))
+            print(f"{mode:<10}{result['scans_per_second']:>10.0f}{result['p50_ms']:>10.2f}"
+                  f"{result['p99_ms']:>10.2f}{result['applied']:>10}")
+
+
+if __name__ == "__main__":
+    main()
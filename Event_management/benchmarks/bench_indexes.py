@@ -0,0 +1,104 @@
+"""
+Query-time benchmark for the attendee and event indexes.
+
+Builds a throwaway SQLite database and times the hot-path queries from
+routers/attendence.py and routers/events.py twice: normally, and with
+SQLite's `NOT INDEXED` hint, which forces the full table scans every query
+did before the indexes existed.
+
+    python -m benchmarks.bench_indexes --attendees 1000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy import text
+
+import intervals
+from benchmarks.datagen import LOCATIONS, START, STATUSES, populate
+from database import make_engine
+
+QUERIES = {
+    "count attendees for event": (
+        "SELECT COUNT(*) FROM attendees {hint} WHERE event_id = :event_id"
+    ),
+    "attendee by (event_id, email)": (
+        "SELECT attendee_id FROM attendees {hint} WHERE event_id = :event_id AND email = :email"
+    ),
+    "list attendees for event": (
+        "SELECT * FROM attendees {hint} WHERE event_id = :event_id"
+    ),
+    "count check-ins for event": (
+        "SELECT COUNT(*) FROM attendees {hint} WHERE event_id = :event_id AND check_in_status = 1"
+    ),
+    "events by status and location": (
+        "SELECT * FROM events {hint} WHERE status = :status AND location = :location"
+    ),
+    # The bounded overlap predicate from intervals.py
+    "events overlapping a window": (
+        "SELECT * FROM events {hint} WHERE start_time < :window_end AND start_time >= :window_floor "
+        "AND end_time > :window_start ORDER BY start_time, event_id LIMIT 100"
+    ),
+    "venue overlap check": (
+        "SELECT event_id FROM events {hint} WHERE location = :location AND start_time < :window_end "
+        "AND start_time >= :window_floor AND end_time > :window_start"
+    ),
+}
+
+
+def time_query(conn, sql: str, params_list) -> float:
+    """Median execution time in milliseconds."""
+    samples = []
+    for params in params_list:
+        begin = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        samples.append((time.perf_counter() - begin) * 1000)
+    return statistics.median(samples)
+
+
+def run(events: int, attendees: int, repeat: int, db_path: Path):
+    engine = make_engine(f"sqlite:///{db_path}")
+    print(f"Populating {attendees:,} attendees across {events:,} events ...")
+    populate(engine, events, attendees)
+
+    rng = random.Random(42)
+    params_list = []
+    for _ in range(repeat):
+        n = rng.randrange(attendees)
+        window_start = START + timedelta(hours=rng.randrange(events))
+        params_list.append({
+            "event_id": n % events + 1,
+            "email": f"user{n}@example.com",
+            "status": rng.choice(STATUSES),
+            "location": rng.choice(LOCATIONS),
+            "window_start": window_start,
+            "window_end": window_start + timedelta(hours=3),
+            "window_floor": window_start - intervals.max_duration(),
+        })
+
+    print(f"\n{'query':<32}{'scan ms':>12}{'indexed ms':>12}{'speedup':>10}")
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            scan = time_query(conn, sql.format(hint="NOT INDEXED"), params_list)
+            indexed = time_query(conn, sql.format(hint=""), params_list)
+            print(f"{name:<32}{scan:>12.3f}{indexed:>12.3f}{scan / max(indexed, 1e-6):>9.0f}x")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attendees", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20, help="samples per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(args.events, args.attendees, args.repeat, Path(tmp) / "bench_indexes.db")
+
+
+if __name__ == "__main__":
+    main()
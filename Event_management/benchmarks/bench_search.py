@@ -0,0 +1,128 @@
+"""
+Latency benchmark for attendee and event search.
+
+Loads a throwaway SQLite database with N attendees with varied names,
+emails and phone numbers (the FTS5 index is maintained by its triggers as
+rows go in), then times `search.search_attendees` / `search.search_events`
+for a mix of query shapes and reports p50 / p99 per shape.
+
+    python -m benchmarks.bench_search --attendees 1000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+import search
+from benchmarks.datagen import populate
+from database import make_engine
+from models import Attendee
+from routers.attendence import ATTENDEE_FIELDS
+from routers.events import EVENT_FIELDS
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+               "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Amelia", "Oliver", "Sofia", "Lucas", "Chloe", "Mateo", "Zoë", "Noah", "Emma", "Liam"]
+SYLLABLES = ["an", "ber", "cal", "dor", "el", "fen", "gar", "hal", "is", "jor", "kel", "lin", "mor", "nes", "or",
+             "pel", "quin", "ros", "sen", "tor", "ul", "van", "wes", "yor", "zim"]
+DOMAINS = ["example.com", "mail.test", "corp.example", "uni.example.edu"]
+
+
+def last_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def attendee_rows(rng: random.Random, start: int, count: int, events: int):
+    for n in range(start, start + count):
+        first, last = rng.choice(FIRST_NAMES), last_name(rng)
+        yield {
+            "first_name": first,
+            "last_name": last,
+            "email": f"{first.lower()}.{last.lower()}{n}@{rng.choice(DOMAINS)}",
+            "phone_number": f"+1-{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "event_id": n % events + 1,
+            "check_in_status": False,
+        }
+
+
+def query_mix(rng: random.Random, samples: list, events: int) -> dict:
+    """Query strings per shape, drawn from real rows so most queries have hits."""
+    return {
+        "name prefix (3 chars)": [(row["last_name"][:3], None) for row in samples],
+        "first + last prefix": [(f"{row['first_name'][:2]} {row['last_name'][:4]}", None) for row in samples],
+        "email prefix": [(row["email"][:row["email"].index("@") - 2], None) for row in samples],
+        "phone prefix": [(row["phone_number"][:9], None) for row in samples],
+        "name prefix in event": [(row["last_name"][:3], row["event_id"]) for row in samples],
+        "no match": [(f"qx{rng.randrange(10**6)}", None) for _ in samples],
+    }
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(events: int, attendees: int, queries: int, db_path: Path, batch: int = 50_000):
+    engine = make_engine(f"sqlite:///{db_path}")
+    rng = random.Random(42)
+    print(f"Populating {attendees:,} attendees across {events:,} events ...")
+    begin = time.perf_counter()
+    populate(engine, events, 0)
+    # populate() analyzed an empty attendees_fts; stale statistics on the FTS5
+    # shadow tables make every later index write scan them. Connections load
+    # statistics when they open, so start over with fresh ones.
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM sqlite_stat1"))
+    engine.dispose()
+
+    samples = []
+    with engine.begin() as conn:
+        for offset in range(0, attendees, batch):
+            rows = list(attendee_rows(rng, offset, min(batch, attendees - offset), events))
+            conn.execute(insert(Attendee), rows)
+            samples.extend(rng.sample(rows, min(len(rows), queries * batch // attendees + 1)))
+        conn.execute(text("INSERT INTO attendees_fts(attendees_fts) VALUES ('optimize')"))
+        conn.execute(text("ANALYZE"))
+    print(f"Loaded and indexed in {time.perf_counter() - begin:.1f}s")
+
+    columns = {name: ATTENDEE_FIELDS[name] for name in ATTENDEE_FIELDS}
+    samples = rng.sample(samples, min(queries, len(samples)))
+    with sessionmaker(bind=engine)() as db:
+        print(f"\n{'query':<26}{'p50 ms':>10}{'p99 ms':>10}{'avg hits':>10}")
+        for label, params in query_mix(rng, samples, events).items():
+            timings, hits = [], []
+            for q, event_id in params:
+                start = time.perf_counter()
+                rows = search.search_attendees(db, q, columns, search.SEARCH_PAGE_SIZE + 1, event_id=event_id)
+                timings.append((time.perf_counter() - start) * 1000)
+                hits.append(len(rows))
+            print(f"{label:<26}{statistics.median(timings):>10.2f}{percentile(timings, 99):>10.2f}"
+                  f"{statistics.mean(hits):>10.1f}")
+
+        timings = []
+        for _ in range(len(samples)):
+            start = time.perf_counter()
+            search.search_events(db, f"event {rng.randrange(10, events + 1)}", EVENT_FIELDS, search.SEARCH_PAGE_SIZE)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{'events: name':<26}{statistics.median(timings):>10.2f}{percentile(timings, 99):>10.2f}")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--attendees", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=500, help="queries per shape")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(args.events, args.attendees, args.queries, Path(tmp) / "bench.db")
+
+
+if __name__ == "__main__":
+    main()
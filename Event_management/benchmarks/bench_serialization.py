@@ -0,0 +1,95 @@
+"""
+Serialization benchmark for large list responses.
+
+Times turning N attendee and event rows from a throwaway SQLite database
+into a JSON body, three ways:
+
+    response_model  ORM objects -> Pydantic validation -> jsonable_encoder -> json
+    dicts           column tuples -> dicts -> jsonable_encoder -> json
+    fast            column tuples -> dicts -> FastJSONResponse (orjson)
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.datagen import populate
+from database import make_engine
+from models import Attendee, Event
+from routers.attendence import ATTENDEE_FIELDS
+from routers.events import EVENT_FIELDS
+from schemas import AttendeeResponse, EventResponse
+from serialization import FastJSONResponse, orjson, rows_as_dicts
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of `fn()` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - begin) * 1000)
+    return statistics.median(samples)
+
+
+def strategies(db, model, schema, fields: dict, rows: int):
+    adapter = TypeAdapter(List[schema])
+    keys = list(fields)
+    columns = select(*(column.label(name) for name, column in fields.items())).limit(rows)
+
+    def response_model():
+        objects = db.scalars(select(model).limit(rows)).all()
+        body = json.dumps(jsonable_encoder(adapter.validate_python(objects, from_attributes=True)))
+        db.expunge_all()
+        return body
+
+    def dicts():
+        return json.dumps(jsonable_encoder(rows_as_dicts(db.execute(columns).all(), keys)))
+
+    def fast():
+        return FastJSONResponse(rows_as_dicts(db.execute(columns).all(), keys)).body
+
+    return {"response_model": response_model, "dicts": dicts, "fast": fast}
+
+
+def run(rows: int, repeat: int, db_path: Path):
+    engine = make_engine(f"sqlite:///{db_path}")
+    print(f"Populating {rows:,} attendees and {rows:,} events ...")
+    populate(engine, rows, rows)
+    encoder = "orjson" if orjson is not None else "pydantic-core"
+
+    with sessionmaker(bind=engine)() as db:
+        print(f"\n{'rows':<12}{'path':<18}{'median ms':>12}{'speed-up':>10}   (fast path: {encoder})")
+        for label, model, schema, fields in [
+            ("attendees", Attendee, AttendeeResponse, ATTENDEE_FIELDS),
+            ("events", Event, EventResponse, EVENT_FIELDS),
+        ]:
+            results = {name: timed(fn, repeat) for name, fn in strategies(db, model, schema, fields, rows).items()}
+            baseline = results["response_model"]
+            for name, ms in results.items():
+                print(f"{label:<12}{name:<18}{ms:>12.1f}{baseline / ms:>9.1f}x")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(args.rows, args.repeat, Path(tmp) / "bench.db")
+
+
+if __name__ == "__main__":
+    main()
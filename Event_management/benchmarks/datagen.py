@@ -0,0 +1,71 @@
+"""
+Synthetic data for benchmarks: N events x M attendees, plus CSV uploads.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text, update
+
+from database import Base
+from models import Attendee, Event, EventStatus
+
+LOCATIONS = ["Berlin", "London", "New York", "Paris", "Tokyo", "Toronto", "Sydney", "Madrid"]
+STATUSES = [status.name for status in EventStatus]
+# Event n starts n hours after this and lasts two hours
+START = datetime(2025, 1, 1)
+
+
+def attendee_row(n: int, event_id: int, checked_in: bool = False) -> dict:
+    return {
+        "first_name": "First",
+        "last_name": f"Last{n}",
+        "email": f"user{n}@example.com",
+        "phone_number": "5550100",
+        "event_id": event_id,
+        "check_in_status": checked_in,
+    }
+
+
+def populate(engine, events: int, attendees: int, capacity: int = None, batch: int = 50_000):
+    """
+    Create the schema and load `events` events and `attendees` attendees in total.
+
+    Attendees are spread round-robin over the events and every third one is
+    checked in. `capacity` defaults to leaving plenty of room for new
+    registrations.
+    """
+    Base.metadata.create_all(bind=engine)
+    per_event = [attendees // events + (1 if event_id <= attendees % events else 0)
+                 for event_id in range(1, events + 1)]
+    with engine.begin() as conn:
+        conn.execute(insert(Event), [
+            {
+                "event_id": event_id,
+                "name": f"Event {event_id}",
+                "start_time": START + timedelta(hours=event_id),
+                "end_time": START + timedelta(hours=event_id + 2),
+                "location": LOCATIONS[event_id % len(LOCATIONS)],
+                "max_attendees": capacity or max(attendees, 1) * 10,
+                "registered_count": per_event[event_id - 1],
+                "status": STATUSES[event_id % len(STATUSES)],
+            }
+            for event_id in range(1, events + 1)
+        ])
+        for offset in range(0, attendees, batch):
+            conn.execute(insert(Attendee), [
+                attendee_row(n, n % events + 1, checked_in=n % 3 == 0)
+                for n in range(offset, min(offset + batch, attendees))
+            ])
+        conn.execute(
+            update(Event).values(checked_in_count=select(func.count()).where(
+                Attendee.event_id == Event.event_id, Attendee.check_in_status.is_(True),
+            ).scalar_subquery())
+        )
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+
+
+def attendee_csv(event_id: int, rows: int, first: int = 0) -> str:
+    """CSV accepted by the bulk upload endpoint, with emails numbered from `first`."""
+    lines = ["first_name,last_name,email,phone_number,event_id"]
+    lines.extend(f"Bulk,Row{n},bulk{n}@example.com,5550100,{event_id}" for n in range(first, first + rows))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,266 @@
+"""
+Latency and throughput harness for the API.
+
+Runs the app in-process over httpx's ASGI transport (no server or network),
+against a freshly populated SQLite file or any DATABASE_URL-style stand-in,
+and drives each scenario with a fixed number of concurrent clients:
+
+    registration_storm  POST /attendees/ with unique emails for one event
+    door_check_in       PUT  /attendees/{id}/checkin for existing attendees
+    listing             GET  /events/ and GET /attendees/attendees pages
+    bulk_upload         POST /attendees/attendee/{id}/bulk-upload
+    login               POST /auth_routes/token
+
+Admission control (rate limits and concurrency caps) is as configured for
+the app, off by default; `--admission` turns it on with the configured
+limits, which the default workloads stay within. Results (p50/p95/p99/max latency, throughput, errors, and 429
+rejections counted apart from other errors) are printed and can be written
+as JSON. The run exits non-zero when more than `--max-error-rate` of a
+scenario's requests fail or are rejected, or, given a baseline JSON, when a
+scenario's p99 or throughput regresses beyond the tolerance:
+
+    python -m benchmarks.loadtest --output baseline.json
+    python -m benchmarks.loadtest --baseline baseline.json --tolerance 0.2
+
+Set BCRYPT_ROUNDS in the environment to benchmark login at a given cost.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import admission
+import config
+from benchmarks.datagen import attendee_csv, populate
+from config import DB_MODE
+from database import get_session, make_async_engine, make_engine
+from main import app
+from models import Attendee
+
+SCENARIOS = ["registration_storm", "door_check_in", "listing", "bulk_upload", "login"]
+PASSWORD = "benchmark-password"
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, errors: int, rejected: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rejected": rejected,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1]) if latencies else 0.0,
+    }
+
+
+async def drive(requests, concurrency: int) -> dict:
+    """Send `requests` (zero-argument coroutine factories) from `concurrency` workers."""
+    pending = iter(requests)
+    latencies, errors, rejected = [], 0, 0
+
+    async def worker():
+        nonlocal errors, rejected
+        for make_request in pending:
+            start = time.perf_counter()
+            response = await make_request()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code == 429:
+                rejected += 1
+            elif response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, rejected, time.perf_counter() - start)
+
+
+def use_database(database_url: str):
+    """Point the app's session dependency at `database_url` for the configured DB_MODE."""
+    if DB_MODE == "async":
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        factory = async_sessionmaker(make_async_engine(database_url), autoflush=False, expire_on_commit=False)
+
+        async def override():
+            async with factory() as db:
+                yield db
+    else:
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=make_engine(database_url))
+
+        def override():
+            db = factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+    app.dependency_overrides[get_session] = override
+
+
+async def run(args) -> dict:
+    engine = make_engine(args.database_url, poolclass=NullPool)
+    populate(engine, args.events, args.attendees)
+    with sessionmaker(bind=engine)() as db:
+        attendee_ids = list(db.scalars(select(Attendee.attendee_id).limit(args.requests)))
+    engine.dispose()
+    use_database(args.database_url)
+    rate_limit, config.RATE_LIMIT = config.RATE_LIMIT, config.RATE_LIMIT or args.admission
+    admission.reset()
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Enough accounts that concurrent logins stay within LOGIN_CONCURRENCY_PER_ACCOUNT
+        login_users = args.login_users or math.ceil(args.concurrency / config.LOGIN_CONCURRENCY_PER_ACCOUNT)
+        users = {f"bench{n}@example.com": 0 for n in range(login_users)}
+        for email in users:
+            await client.post("/auth_routes/register", json={"email": email, "password": PASSWORD})
+        login_form = {"username": next(iter(users)), "password": PASSWORD}
+        token = (await client.post("/auth_routes/token", data=login_form)).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        n = args.requests
+
+        async def login():
+            # The account with the fewest logins in flight
+            email = min(users, key=users.get)
+            users[email] += 1
+            try:
+                return await client.post("/auth_routes/token", data={"username": email, "password": PASSWORD})
+            finally:
+                users[email] -= 1
+
+        scenarios = {
+            "registration_storm": lambda: [
+                lambda i=i: client.post("/attendees/", headers=headers, json={
+                    "first_name": "Storm", "last_name": str(i), "email": f"storm{i}@example.com",
+                    "phone_number": "5550100", "event_id": 1,
+                })
+                for i in range(n)
+            ],
+            "door_check_in": lambda: [
+                lambda attendee_id=attendee_id: client.put(f"/attendees/{attendee_id}/checkin", headers=headers)
+                for attendee_id in itertools.islice(itertools.cycle(attendee_ids), n)
+            ],
+            "listing": lambda: [
+                (lambda i=i: client.get("/events/", headers=headers, params={"limit": 50})) if i % 2 else
+                (lambda i=i: client.get("/attendees/attendees", headers=headers,
+                                        params={"event_id": i % args.events + 1, "limit": 100}))
+                for i in range(n)
+            ],
+            "bulk_upload": lambda: [
+                lambda i=i: client.post(
+                    f"/attendees/attendee/{i % args.events + 1}/bulk-upload", headers=headers,
+                    files={"file": ("bulk.csv", attendee_csv(i % args.events + 1, args.bulk_rows, i * args.bulk_rows))},
+                )
+                for i in range(max(1, n // 50))
+            ],
+            "login": lambda: [login for _ in range(max(1, n // 25))],
+        }
+        for name in args.scenarios:
+            results[name] = await drive(scenarios[name](), args.concurrency)
+            print(f"{name:<20}" + "  ".join(f"{key}={value}" for key, value in results[name].items()))
+
+    app.dependency_overrides.pop(get_session, None)
+    config.RATE_LIMIT = rate_limit
+    return {
+        "meta": {
+            "db_mode": DB_MODE,
+            "admission": rate_limit or args.admission,
+            "events": args.events,
+            "attendees": args.attendees,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Return a description of every regression of `current` against `baseline`."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {result['p99_ms']}ms > baseline {base['p99_ms']}ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput_rps']} rps < baseline {base['throughput_rps']} rps")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors > baseline {base['errors']}")
+        if result.get("rejected", 0) > base.get("rejected", 0):
+            regressions.append(f"{name}: {result['rejected']} rejected > baseline {base.get('rejected', 0)}")
+    return regressions
+
+
+def failures(current: dict, max_error_rate: float) -> list:
+    """Return a description of every scenario whose errors and rejections exceed `max_error_rate`."""
+    failed = []
+    for name, result in current["scenarios"].items():
+        failing = result["errors"] + result.get("rejected", 0)
+        if result["requests"] and failing / result["requests"] > max_error_rate:
+            failed.append(f"{name}: {result['errors']} errors and {result.get('rejected', 0)} rejected "
+                          f"of {result['requests']} requests")
+    return failed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="sync SQLAlchemy URL of an empty database (default: temp SQLite file)")
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--attendees", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--bulk-rows", type=int, default=1000, help="rows per bulk upload")
+    parser.add_argument("--login-users", type=int,
+                        help="accounts to log in to (default: concurrency / LOGIN_CONCURRENCY_PER_ACCOUNT)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--admission", action="store_true", help="turn rate limits and concurrency caps on")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="fail when more than this fraction of a scenario's requests fail (default 1%%)")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="fail on regressions against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default 20%%)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        args.database_url = args.database_url or f"sqlite:///{Path(tmp) / 'loadtest.db'}"
+        results = asyncio.run(run(args))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    failed = failures(results, args.max_error_rate)
+    for failure in failed:
+        print(f"ERRORS {failure}", file=sys.stderr)
+    if args.baseline:
+        regressions = compare(json.loads(args.baseline.read_text()), results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""
+Helpers for the bulk endpoints: CSV uploads and JSON batches.
+
+Uploads are decoded and parsed incrementally and processed in fixed-size
+chunks, so memory stays flat regardless of file size and the database sees
+one lookup and one insert per chunk instead of one query per row. JSON
+batches go through the same set-based steps, once per event.
+"""
+import csv
+import io
+import tempfile
+from collections import defaultdict
+from itertools import islice
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from capacity import reserve_available_seats
+from occupancy import record_check_ins
+from models import Attendee, Event
+
+CHUNK_SIZE = 1000
+# Only the first rejections are echoed back; the total is always reported.
+MAX_REPORTED_REJECTIONS = 1000
+
+ATTENDEE_HEADERS = ["first_name", "last_name", "email", "phone_number", "event_id"]
+CHECK_IN_HEADERS = ["email"]
+FULLY_BOOKED = "Event is fully booked"
+ALREADY_REGISTERED = "Email already registered for this event"
+# Misses are kept in memory up to this size before spilling to disk
+MISSES_SPOOL_SIZE = 1024 * 1024
+
+
+def iter_csv_rows(fileobj, encoding: str = "utf-8-sig"):
+    """Yield parsed CSV rows from a binary file object, decoding lazily."""
+    text = io.TextIOWrapper(fileobj, encoding=encoding, newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        # Hand the underlying file back to the caller instead of closing it
+        if not fileobj.closed:
+            text.detach()
+
+
+def chunked(iterable, size: int = CHUNK_SIZE):
+    """Yield lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class ImportReport:
+    """Running totals for a bulk import, with a bounded list of rejections."""
+
+    def __init__(self):
+        self.added = 0
+        self.rejected_count = 0
+        self.fully_booked_count = 0
+        self.rejected = []
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Resume from the totals saved by `as_dict`."""
+        report = cls()
+        report.added = data.get("added", 0)
+        report.rejected_count = data.get("rejected_count", 0)
+        report.fully_booked_count = data.get("fully_booked_count", 0)
+        report.rejected = list(data.get("rejected", []))
+        return report
+
+    def reject(self, row_number: int, email, reason: str):
+        self.rejected_count += 1
+        if reason == FULLY_BOOKED:
+            self.fully_booked_count += 1
+        if len(self.rejected) < MAX_REPORTED_REJECTIONS:
+            self.rejected.append({"row": row_number, "email": email, "reason": reason})
+
+    def as_dict(self) -> dict:
+        return {
+            "added": self.added,
+            "rejected_count": self.rejected_count,
+            "fully_booked_count": self.fully_booked_count,
+            "rejected": self.rejected,
+        }
+
+
+def _parse_attendee_row(row, event_id: int):
+    """Return (attendee dict, None) for a valid row or (None, reason)."""
+    if len(row) != len(ATTENDEE_HEADERS):
+        return None, f"Expected {len(ATTENDEE_HEADERS)} columns, got {len(row)}"
+
+    first_name, last_name, email, phone_number, event_id_csv = (value.strip() for value in row)
+    try:
+        if int(event_id_csv) != event_id:
+            return None, "event_id does not match the upload"
+    except ValueError:
+        return None, "Invalid event_id"
+
+    if not (first_name and last_name and email and phone_number):
+        return None, "Missing required field"
+    if "@" not in email:
+        return None, "Invalid email"
+
+    return {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "phone_number": phone_number,
+        "event_id": event_id,
+    }, None
+
+
+def import_attendees(db: Session, event_id: int, rows, chunk_size: int = CHUNK_SIZE,
+                     report: ImportReport = None, on_chunk=None, first_row: int = 2) -> dict:
+    """
+    Insert attendees from an iterator of CSV data rows (header already consumed).
+
+    Each chunk is deduplicated against the database with a single `IN` lookup
+    and written with one bulk insert. Earlier chunks are flushed inside the
+    same transaction, so later lookups see them and duplicates across chunks
+    are caught without keeping every email in memory. Seats are reserved
+    once per chunk; rows beyond the event's capacity are rejected. The
+    caller owns the commit.
+
+    `on_chunk(rows_consumed, report)` runs after every chunk, e.g. to commit
+    it with the caller's progress. `report` and `first_row` (the file row
+    number of the first row in `rows`) resume an interrupted import.
+    """
+    report = report or ImportReport()
+    for chunk in chunked(enumerate(rows, start=first_row), chunk_size):
+        _import_chunk(db, event_id, chunk, report)
+        if on_chunk:
+            on_chunk(len(chunk), report)
+    return report.as_dict()
+
+
+def _import_chunk(db: Session, event_id: int, chunk, report: ImportReport):
+    candidates = {}
+    for row_number, row in chunk:
+        if not row:
+            continue  # Ignore blank lines
+        data, reason = _parse_attendee_row(row, event_id)
+        if reason:
+            report.reject(row_number, row[2].strip() if len(row) > 2 else None, reason)
+        elif data["email"] in candidates:
+            report.reject(row_number, data["email"], "Duplicate email in file")
+        else:
+            candidates[data["email"]] = (row_number, data)
+
+    if not candidates:
+        return
+
+    report.added += len(insert_new_attendees(db, event_id, candidates, report.reject))
+
+
+def insert_new_attendees(db: Session, event_id: int, candidates: dict, reject) -> list:
+    """
+    Insert the attendees in `candidates` ({email: (key, data)}) that can join the event.
+
+    One `IN` lookup drops emails already registered, one seat reservation
+    covers the rest, and one bulk insert writes what fits. `reject(key, email,
+    reason)` is called for every candidate left out; the inserted
+    `(key, data)` pairs are returned.
+    """
+    existing = set(db.scalars(
+        select(Attendee.email).where(
+            Attendee.event_id == event_id,
+            Attendee.email.in_(list(candidates)),
+        )
+    ))
+
+    to_insert = []
+    for email, (key, data) in candidates.items():
+        if email in existing:
+            reject(key, email, ALREADY_REGISTERED)
+        else:
+            to_insert.append((key, data))
+
+    granted = reserve_available_seats(db, event_id, len(to_insert)) if to_insert else 0
+    for key, data in to_insert[granted:]:
+        reject(key, data["email"], FULLY_BOOKED)
+
+    if granted:
+        db.execute(insert(Attendee), [data for _, data in to_insert[:granted]])
+    return to_insert[:granted]
+
+
+class CheckInReport:
+    """Counts for a bulk check-in, optionally spooling misses to a CSV file."""
+
+    def __init__(self, record_misses: bool = False, counts: dict = None):
+        self.checked_in = 0
+        self.already_checked_in = 0
+        self.unknown = 0
+        # Resume from the counts saved by `as_dict`
+        for key, value in (counts or {}).items():
+            setattr(self, key, value)
+        self.misses = None
+        self._writer = None
+        if record_misses:
+            self.misses = tempfile.SpooledTemporaryFile(max_size=MISSES_SPOOL_SIZE, mode="w+", newline="")
+            self._writer = csv.writer(self.misses)
+            self._writer.writerow(["email", "result"])
+
+    def miss(self, email: str, result: str):
+        if result == "already_checked_in":
+            self.already_checked_in += 1
+        else:
+            self.unknown += 1
+        if self._writer:
+            self._writer.writerow([email, result])
+
+    def as_dict(self) -> dict:
+        return {
+            "checked_in": self.checked_in,
+            "already_checked_in": self.already_checked_in,
+            "unknown": self.unknown,
+        }
+
+
+def check_in_emails(db: Session, event_id: int, rows, record_misses: bool = False,
+                    chunk_size: int = CHUNK_SIZE, report: CheckInReport = None, on_chunk=None) -> CheckInReport:
+    """
+    Check in attendees from an iterator of single-column CSV rows (header already consumed).
+
+    Every chunk costs one lookup to classify the emails and one
+    `UPDATE ... WHERE event_id = ? AND email IN (...)`, plus one increment of
+    the event's check-in counter. Emails repeated within a chunk are ignored;
+    repeats in later chunks count as already checked in. The caller owns the
+    commit; `on_chunk` and `report` work as for `import_attendees`.
+    """
+    report = report or CheckInReport(record_misses)
+    for chunk in chunked(rows, chunk_size):
+        _check_in_chunk(db, event_id, chunk, report)
+        if on_chunk:
+            on_chunk(len(chunk), report)
+
+    if report.misses:
+        report.misses.seek(0)
+    return report
+
+
+def _check_in_chunk(db: Session, event_id: int, chunk, report: CheckInReport):
+    # Normalize email input and drop blanks and duplicates, keeping file order
+    emails = list(dict.fromkeys(row[0].strip().lower() for row in chunk if row and row[0].strip()))
+    if not emails:
+        return
+
+    status_by_email = dict(db.execute(
+        select(Attendee.email, Attendee.check_in_status).where(
+            Attendee.event_id == event_id,
+            Attendee.email.in_(emails),
+        )
+    ).all())
+
+    to_check_in = [email for email, status in status_by_email.items() if not status]
+    if to_check_in:
+        result = db.execute(
+            update(Attendee)
+            .where(
+                Attendee.event_id == event_id,
+                Attendee.email.in_(to_check_in),
+                Attendee.check_in_status.isnot(True),
+            )
+            .values(check_in_status=True)
+            .execution_options(synchronize_session=False)
+        )
+        # Count only rows this update flipped, so the event counter cannot drift
+        record_check_ins(db, event_id, result.rowcount)
+        report.checked_in += result.rowcount
+
+    for email in emails:
+        if email not in status_by_email:
+            report.miss(email, "unknown")
+        elif status_by_email[email]:
+            report.miss(email, "already_checked_in")
+
+
+def register_batch(db: Session, attendees: list) -> list:
+    """
+    Register a list of attendee dicts, possibly spanning several events.
+
+    Attendees are grouped by event, and each group goes through
+    `insert_new_attendees`: one lookup, one seat reservation and one bulk
+    insert. Returns one result per input item, in order, with the new
+    `attendee_id` or the reason it was rejected. The caller owns the commit.
+    """
+    results = [None] * len(attendees)
+
+    def reject(index: int, email, reason: str):
+        results[index] = {"index": index, "status": "rejected", "reason": reason}
+
+    known_events = set(db.scalars(
+        select(Event.event_id).where(Event.event_id.in_({data["event_id"] for data in attendees}))
+    ))
+    by_event = defaultdict(dict)
+    for index, data in enumerate(attendees):
+        candidates = by_event[data["event_id"]]
+        if data["event_id"] not in known_events:
+            reject(index, data["email"], "Event not found")
+        elif data["email"] in candidates:
+            reject(index, data["email"], "Duplicate email in batch")
+        else:
+            candidates[data["email"]] = (index, data)
+
+    for event_id, candidates in by_event.items():
+        if not candidates:
+            continue
+        inserted = insert_new_attendees(db, event_id, candidates, reject)
+        if not inserted:
+            continue
+        ids = dict(db.execute(
+            select(Attendee.email, Attendee.attendee_id).where(
+                Attendee.event_id == event_id,
+                Attendee.email.in_([data["email"] for _, data in inserted]),
+            )
+        ).all())
+        for index, data in inserted:
+            results[index] = {"index": index, "status": "created", "attendee_id": ids[data["email"]]}
+    return results
+
+
+def check_in_batch(db: Session, attendee_ids: list) -> tuple:
+    """
+    Check in attendees by id.
+
+    One lookup classifies the ids, then each event gets one conditional
+    `UPDATE ... WHERE attendee_id IN (...)` and one increment of its check-in
+    counter. Returns the per-id results, in order, and the number of new
+    check-ins per event. The caller owns the commit.
+    """
+    ids = list(dict.fromkeys(attendee_ids))
+    found = {
+        attendee_id: (event_id, status)
+        for attendee_id, event_id, status in db.execute(
+            select(Attendee.attendee_id, Attendee.event_id, Attendee.check_in_status)
+            .where(Attendee.attendee_id.in_(ids))
+        )
+    }
+
+    pending = defaultdict(list)
+    for attendee_id, (event_id, status) in found.items():
+        if not status:
+            pending[event_id].append(attendee_id)
+
+    checked_in = {}
+    for event_id, event_ids in pending.items():
+        result = db.execute(
+            update(Attendee)
+            .where(Attendee.attendee_id.in_(event_ids), Attendee.check_in_status.isnot(True))
+            .values(check_in_status=True)
+            .execution_options(synchronize_session=False)
+        )
+        record_check_ins(db, event_id, result.rowcount)
+        checked_in[event_id] = result.rowcount
+
+    results, seen = [], set()
+    for attendee_id in attendee_ids:
+        if attendee_id not in found:
+            status = "not_found"
+        elif attendee_id in seen or found[attendee_id][1]:
+            status = "already_checked_in"
+        else:
+            status = "checked_in"
+        seen.add(attendee_id)
+        results.append({"attendee_id": attendee_id, "status": status})
+    return results, checked_in
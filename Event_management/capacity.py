@@ -0,0 +1,56 @@
+"""
+Seat reservation against `Event.registered_count`.
+
+A reservation is a single conditional UPDATE, so the capacity check and the
+increment happen atomically in the database: concurrent registrations can
+never overbook, and no COUNT over the attendees table is needed. Reservations
+are part of the caller's transaction and are undone by its rollback, as are
+the reporting rollups they count into.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import Event
+import reporting
+
+
+def reserve_seats(db: Session, event_id: int, seats: int = 1) -> bool:
+    """Claim exactly `seats` places; returns False if that would exceed capacity."""
+    stmt = (
+        update(Event)
+        .where(
+            Event.event_id == event_id,
+            Event.registered_count + seats <= Event.max_attendees,
+        )
+        .values(registered_count=Event.registered_count + seats)
+        .execution_options(synchronize_session=False)
+    )
+    # The event's reporting group comes back with the reservation where the database can return it
+    if db.get_bind().dialect.update_returning:
+        group = db.execute(stmt.returning(Event.location, Event.status)).first()
+        if group is None:
+            return False
+    elif db.execute(stmt).rowcount != 1:
+        return False
+    else:
+        group = None
+    reporting.record_registrations(db, event_id, seats, group)
+    return True
+
+
+def seats_remaining(db: Session, event_id: int):
+    """Places still free at the event, or None if it does not exist."""
+    return db.scalar(select(Event.max_attendees - Event.registered_count).where(Event.event_id == event_id))
+
+
+def reserve_available_seats(db: Session, event_id: int, wanted: int) -> int:
+    """Claim up to `wanted` places and return how many were granted."""
+    while wanted > 0:
+        if reserve_seats(db, event_id, wanted):
+            return wanted
+        remaining = seats_remaining(db, event_id)
+        if not remaining or remaining <= 0:
+            return 0
+        # Another writer may claim seats in between; the UPDATE re-checks
+        wanted = min(wanted, remaining)
+    return 0
@@ -0,0 +1,273 @@
+"""
+Write-behind buffer for single-attendee check-ins (`CHECKIN_BUFFER=1`).
+
+A buffered check-in is acknowledged once its attendee id is durable in a
+local log, not once it is in the database. Concurrent scans share one fsync
+(group commit), so the log costs about one disk flush per burst rather than
+one per scan. Every `CHECKIN_FLUSH_MS` a flusher thread rotates the log
+segment and applies the ids it held with `bulk.check_in_batch`: one
+conditional `UPDATE ... WHERE attendee_id IN (...)` and one counter
+increment per event, in a single transaction. The segment is deleted only
+after that commit.
+
+Each process writes its own segments in `CHECKIN_LOG_DIR` and holds an
+exclusive lock on them, taken before a new segment is renamed into place so
+no other process ever sees it unlocked. At startup, segments that nobody holds (left by a
+crashed or killed process) are replayed. Replay is safe to repeat: a
+check-in only counts if it flips the attendee's status.
+
+Until the next flush, reads of the attendee still show it as not checked in.
+"""
+import fcntl
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import config
+from bulk import check_in_batch
+from database import SessionLocal
+from occupancy import broker
+
+logger = logging.getLogger("event_management.checkin_buffer")
+
+
+class Segment:
+    """One log file, locked by the process appending to it."""
+
+    # Unlocked temporary files older than this were left by a crash mid-create
+    STALE_TEMP_SECONDS = 60
+
+    def __init__(self, path: Path, fd: int):
+        self.path = path
+        self.fd = fd
+        self.ids = []
+
+    @classmethod
+    def create(cls, directory: Path):
+        path = directory / f"{os.getpid()}-{time.time_ns()}.log"
+        temp = path.with_suffix(".tmp")
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.rename(temp, path)
+        except BaseException:
+            os.close(fd)
+            temp.unlink(missing_ok=True)
+            raise
+        return cls(path, fd)
+
+    def close(self, delete: bool):
+        if delete:
+            self.path.unlink(missing_ok=True)
+        os.close(self.fd)
+
+
+def read_segment(path: Path) -> list:
+    """Attendee ids in a log file; a torn last line is ignored."""
+    ids = []
+    for line in path.read_bytes().split(b"\n")[:-1]:
+        try:
+            ids.append(int(line))
+        except ValueError:
+            logger.warning("Skipping corrupt check-in log line in %s: %r", path, line)
+    return ids
+
+
+class CheckInBuffer:
+    def __init__(self, directory: str, session_factory=SessionLocal, flush_ms: float = None, max_batch: int = None):
+        self.directory = Path(directory)
+        self.session_factory = session_factory
+        self.flush_seconds = (config.CHECKIN_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+        self.max_batch = max_batch or config.CHECKIN_FLUSH_MAX
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._written = 0
+        self._durable = 0
+        self._syncing = False
+        self._segment = None
+        # Logged but not yet committed, including rotated segments whose flush failed
+        self._queued = set()
+        self._unapplied = []
+        self._stopping = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.recover()
+        self._segment = Segment.create(self.directory)
+        self._thread = threading.Thread(target=self._loop, name="checkin-flusher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        """Flush what is logged and stop; anything that fails to flush is replayed at the next start."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final check-in flush failed; the log will be replayed at the next start")
+        with self._lock:
+            for segment in self._unapplied + [self._segment]:
+                segment.close(delete=not segment.ids)
+            self._unapplied, self._segment = [], None
+
+    def submit(self, attendee_id: int) -> bool:
+        """
+        Log a check-in and wait until it is durable.
+
+        Returns False without logging if the attendee is already waiting
+        for a flush.
+        """
+        with self._lock:
+            if attendee_id in self._queued:
+                return False
+            os.write(self._segment.fd, b"%d\n" % attendee_id)
+            self._segment.ids.append(attendee_id)
+            self._queued.add(attendee_id)
+            self._written += 1
+            if len(self._segment.ids) >= self.max_batch:
+                self._wake.set()
+            self._wait_durable(self._written)
+        return True
+
+    def _wait_durable(self, sequence: int):
+        # Group commit: the first waiter fsyncs for everyone written so far
+        while self._durable < sequence:
+            if self._syncing:
+                self._synced.wait()
+                continue
+            self._syncing, target, fd = True, self._written, self._segment.fd
+            self._lock.release()
+            try:
+                os.fsync(fd)
+            finally:
+                self._lock.acquire()
+                self._syncing = False
+                self._synced.notify_all()
+            self._durable = max(self._durable, target)
+
+    def _rotate(self):
+        """Seal the current segment for flushing and start a new one."""
+        with self._lock:
+            while self._syncing:
+                self._synced.wait()
+            if self._segment.ids:
+                os.fsync(self._segment.fd)
+                self._durable = self._written
+                self._synced.notify_all()
+                self._unapplied.append(self._segment)
+                self._segment = Segment.create(self.directory)
+            return list(self._unapplied)
+
+    def flush(self) -> int:
+        """Apply every sealed segment in one transaction; returns the number of new check-ins."""
+        segments = self._rotate() if self._segment is not None else list(self._unapplied)
+        if not segments:
+            return 0
+        ids = [attendee_id for segment in segments for attendee_id in segment.ids]
+        checked_in = self._apply(ids)
+        with self._lock:
+            for segment in segments:
+                self._queued.difference_update(segment.ids)
+                segment.close(delete=True)
+                self._unapplied.remove(segment)
+        return sum(checked_in.values())
+
+    def _apply(self, ids: list) -> dict:
+        checked_in = defaultdict(int)
+        db = self.session_factory()
+        try:
+            for start in range(0, len(ids), self.max_batch):
+                for event_id, count in check_in_batch(db, ids[start:start + self.max_batch])[1].items():
+                    checked_in[event_id] += count
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for event_id, count in checked_in.items():
+            broker.publish(event_id, checked_in=count)
+        return checked_in
+
+    def recover(self) -> int:
+        """Replay the segments of processes that are gone; returns the number of new check-ins."""
+        checked_in = 0
+        for path in sorted(self.directory.glob("*.log")):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue  # Replayed by another process
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue  # Still owned by a live process
+            try:
+                ids = read_segment(path)
+                if ids:
+                    checked_in += sum(self._apply(ids).values())
+                path.unlink(missing_ok=True)
+            finally:
+                os.close(fd)
+            logger.info("Replayed %d check-ins from %s", len(ids), path.name)
+        self._remove_stale_temps()
+        return checked_in
+
+    def _remove_stale_temps(self):
+        """Delete segments a crashed process created but never renamed into place (they hold no ids)."""
+        cutoff = time.time() - Segment.STALE_TEMP_SECONDS
+        for path in self.directory.glob("*.tmp"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue  # Possibly being created right now
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                pass
+            finally:
+                os.close(fd)
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The segments stay on disk and are retried on the next tick
+                logger.exception("Check-in flush failed")
+
+
+_buffer = None
+
+
+def start(session_factory=SessionLocal):
+    """Start this process's buffer if `CHECKIN_BUFFER` is on (idempotent)."""
+    global _buffer
+    if config.CHECKIN_BUFFER and _buffer is None:
+        _buffer = CheckInBuffer(config.CHECKIN_LOG_DIR, session_factory).start()
+    return _buffer
+
+
+def stop(timeout: float = None):
+    global _buffer
+    if _buffer is not None:
+        _buffer.stop(timeout)
+        _buffer = None
+
+
+def active():
+    """The running buffer, or None when check-ins go straight to the database."""
+    return _buffer
@@ -1,16 +1,279 @@
-from sqlalchemy import create_engine
+import math
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
+import config
+from config import DATABASE_URL, DB_MODE
+
+# Async drivers used for each sync URL scheme when DB_MODE=async
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+class PoolMetrics:
+    """Thread-safe counters for connection checkouts and time spent waiting on the pool."""
+
+    # Weight of each checkout in the recent wait average
+    RECENT_WAIT_WEIGHT = 0.1
+    # Without checkouts, the recent wait fades with this time constant (seconds)
+    RECENT_WAIT_DECAY_SECONDS = 2.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connections_created = 0
+        self.invalidations = 0
+        self._recent_wait = 0.0
+        self._recent_at = time.monotonic()
+
+    def _observe_wait(self, waited: float):
+        now = time.monotonic()
+        recent = self._decayed(now)
+        self._recent_wait = recent + self.RECENT_WAIT_WEIGHT * (waited - recent)
+        self._recent_at = now
+
+    def _decayed(self, now: float) -> float:
+        return self._recent_wait * math.exp(-(now - self._recent_at) / self.RECENT_WAIT_DECAY_SECONDS)
+
+    def record_checkout(self, waited: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self._observe_wait(waited)
+
+    def record_timeout(self, waited: float = 0.0):
+        with self._lock:
+            self.checkout_timeouts += 1
+            self._observe_wait(waited)
+
+    def recent_wait(self) -> float:
+        """Average checkout wait (seconds) over the last checkouts, fading while none happen."""
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+    def record_connect(self):
+        with self._lock:
+            self.connections_created += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_wait_seconds_total": self.wait_seconds_total,
+                "checkout_wait_seconds_max": self.wait_seconds_max,
+                "checkout_wait_seconds_recent": self._decayed(time.monotonic()),
+                "connections_created": self.connections_created,
+                "invalidations": self.invalidations,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return stats
+
+
+class _MeteredPoolMixin:
+    """Times every checkout, including the wait for a free connection."""
+
+    metrics = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            if self.metrics:
+                self.metrics.record_timeout(time.perf_counter() - start)
+            raise
+        if self.metrics:
+            self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    path = url.partition("://")[2]
+    return path in ("", "/", "/:memory:") or "mode=memory" in path
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {config.SQLITE_BUSY_TIMEOUT_MS}")
+    if config.SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode = WAL")
+        # Durable at checkpoints, and much cheaper per commit than FULL under WAL
+        cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
+
+def _engine_options(url: str, pool_class) -> dict:
+    options = {"echo": config.DB_ECHO}
+    if _is_sqlite(url):
+        # Sessions may be opened and used on different threadpool threads
+        options["connect_args"] = {"check_same_thread": False}
+    if not _is_sqlite_memory(url):
+        options.update({
+            "poolclass": pool_class,
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+            "pool_timeout": config.DB_POOL_TIMEOUT,
+            "pool_recycle": config.DB_POOL_RECYCLE,
+            "pool_pre_ping": config.DB_POOL_PRE_PING,
+        })
+    return options
 
-DATABASE_URL = "sqlite:///./event.db"
 
-engine = create_engine(DATABASE_URL)
+def _merge_options(options: dict, overrides: dict) -> dict:
+    options.update(overrides)
+    if not issubclass(options.get("poolclass", QueuePool), QueuePool):
+        # Sizing only applies to queue pools (e.g. not to NullPool)
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            options.pop(key, None)
+    return options
+
+
+def _instrument(sync_engine, url: str, metrics: PoolMetrics):
+    if isinstance(sync_engine.pool, _MeteredPoolMixin):
+        sync_engine.pool.metrics = metrics
+    event.listen(sync_engine, "connect", lambda *args: metrics.record_connect())
+    event.listen(sync_engine, "invalidate", lambda *args: metrics.record_invalidation())
+    if _is_sqlite(url) and not _is_sqlite_memory(url):
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+
+def make_engine(url: str = DATABASE_URL, metrics: PoolMetrics = None, **kwargs):
+    """
+    Create a sync engine from the pool settings in `config`.
+
+    SQLite files get WAL mode and a busy timeout on every new connection.
+    Keyword arguments override the configured engine options.
+    """
+    options = _merge_options(_engine_options(url, MeteredQueuePool), kwargs)
+    engine = create_engine(url, **options)
+    _instrument(engine, url, metrics or PoolMetrics())
+    return engine
+
+
+def make_async_engine(url: str = DATABASE_URL, metrics: PoolMetrics = None, **kwargs):
+    """Async counterpart of `make_engine`; `url` is the sync URL."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    options = _merge_options(_engine_options(url, MeteredAsyncQueuePool), kwargs)
+    engine = create_async_engine(async_url(url), **options)
+    _instrument(engine.sync_engine, url, metrics or PoolMetrics())
+    return engine
+
+
+def async_url(url: str) -> str:
+    """Return the asyncio driver URL for a sync database URL."""
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    return ASYNC_DRIVERS.get(backend, scheme) + sep + rest
+
+
+pool_metrics = PoolMetrics()
+
+# pool_metrics always describes the engine that serves requests
+engine = make_engine(DATABASE_URL, metrics=pool_metrics if DB_MODE == "sync" else None)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = make_async_engine(DATABASE_URL, metrics=pool_metrics)
+    # Objects must stay readable after commit without an implicit (blocking) refresh
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _reset_pools_after_fork():
+    """
+    Give a forked worker empty pools of its own.
+
+    Connections inherited from the parent share its sockets; `close=False`
+    drops them without closing them under the parent's feet.
+    """
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+# Pre-forking servers (gunicorn --preload) import the app once, then fork
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def pool_status() -> dict:
+    """Checkout/wait counters and current pool occupancy for the serving engine."""
+    serving_engine = async_engine.sync_engine if async_engine is not None else engine
+    return pool_metrics.snapshot(serving_engine.pool)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Session dependency used by the routers, selected by DB_MODE
+get_session = get_async_db if DB_MODE == "async" else get_db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run `fn(session, *args, **kwargs)` without blocking the event loop.
+
+    Sync sessions run on the threadpool; async sessions run the same code
+    through `AsyncSession.run_sync`, so routers keep a single implementation.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
@@ -0,0 +1,109 @@
+"""
+Read-through cache for event metadata and `list_events` pages.
+
+Event snapshots hold the columns that only change through `create_event`
+and `update_event`; `registered_count` moves with every registration and is
+deliberately left out, so seat checks always hit the database.
+
+Listing pages are keyed by generation counters: one for unfiltered
+listings, one per status and one per location. Writing an event bumps the
+counters of every partition it was or is now in, so a change in one city
+does not flush every other city's dashboard. Event snapshots are filled
+only if no event was written while they were being loaded (the "all"
+counter did not move), so a load racing an update cannot cache the old row.
+
+The backend is in-process by default. Set `EVENT_CACHE_URL` to share it
+(and its invalidations) between workers; see `shared_state`.
+"""
+import json
+
+from sqlalchemy.orm import Session
+
+from config import EVENT_CACHE_SIZE, EVENT_CACHE_TTL, EVENT_CACHE_URL, EVENT_LIST_CACHE_TTL
+from models import Event
+from shared_state import make_backend
+
+# Cached per event; everything except the live registered_count
+SNAPSHOT_COLUMNS = ("event_id", "name", "description", "start_time", "end_time", "location", "max_attendees", "status")
+
+
+backend = make_backend(EVENT_CACHE_URL, EVENT_CACHE_SIZE)
+
+
+def snapshot(event: Event) -> dict:
+    return {column: getattr(event, column) for column in SNAPSHOT_COLUMNS}
+
+
+def generation() -> int:
+    """Counter bumped by every `invalidate_event`; read it before loading events to cache."""
+    return backend.counter("events:gen:all")
+
+
+def get_event(db: Session, event_id: int):
+    """Return the metadata snapshot of an event, or None if it does not exist."""
+    key = f"event:{event_id}"
+    cached = backend.get(key)
+    if cached is not None:
+        return cached
+    loaded_at = generation()
+    event = db.get(Event, event_id)
+    if event is None:
+        return None
+    data = snapshot(event)
+    if generation() == loaded_at:
+        backend.set(key, data, EVENT_CACHE_TTL)
+    return data
+
+
+def prime(events, loaded_at: int):
+    """Cache the snapshots of `events`, loaded at generation `loaded_at`, unless an event was written since."""
+    if generation() != loaded_at:
+        return
+    for event in events:
+        backend.set(f"event:{event.event_id}", snapshot(event), EVENT_CACHE_TTL)
+
+
+def _partitions(data: dict):
+    status = getattr(data.get("status"), "value", data.get("status"))
+    return [f"status:{status}", f"location:{data.get('location')}"]
+
+
+def invalidate_event(event_id: int, *snapshots: dict):
+    """
+    Drop an event after a committed write.
+
+    Pass its snapshot from before and after the write so listings of both the
+    old and the new status/location are invalidated.
+    """
+    backend.delete(f"event:{event_id}")
+    partitions = {"all"}
+    for data in snapshots:
+        partitions.update(_partitions(data))
+    for partition in partitions:
+        backend.incr(f"events:gen:{partition}")
+
+
+def listing_key(status=None, location=None, *params) -> str:
+    """Cache key of a `list_events` page at the current generations of its partitions."""
+    status = getattr(status, "value", status)
+    partitions = [f"status:{status}"] if status else []
+    if location:
+        partitions.append(f"location:{location}")
+    generations = [backend.counter(f"events:gen:{partition}") for partition in partitions or ["all"]]
+    return "events:list:" + json.dumps([status, location, generations, *params])
+
+
+def get_listing(key: str):
+    return backend.get(key)
+
+
+def set_listing(key: str, value):
+    backend.set(key, value, EVENT_LIST_CACHE_TTL)
+
+
+def clear():
+    backend.clear()
+
+
+def stats() -> dict:
+    return backend.stats()
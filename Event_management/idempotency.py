@@ -0,0 +1,210 @@
+"""
+Safe retries: `Idempotency-Key` requests and duplicate upload detection.
+
+A POST, PUT or PATCH carrying an `Idempotency-Key` header runs once per
+(credentials, method, path, key). Its JSON response is kept for
+`IDEMPOTENCY_TTL` seconds, and retries get that response back, marked
+`Idempotent-Replayed: true`, without running the endpoint again.
+- A retry with a different body gets `422`.
+- A retry that arrives while the first request is still running gets `409`.
+- Server errors (5xx) and streamed or oversized responses are not kept, so
+  those requests can be retried for real.
+
+Uploaded files are identified by a SHA-256 of their content. A successful
+upload of the same file to the same event returns its earlier report (or
+its still-running job) instead of parsing the file again.
+
+Entries live in a `shared_state` backend selected by `EVENT_CACHE_URL`, so
+retries that land on another worker are recognised as well; the middleware
+reaches it through `shared_state.call`, off the event loop.
+"""
+import hashlib
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+import config
+import shared_state
+
+HEADER = "idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+DUPLICATE_UPLOAD_HEADER = "X-Duplicate-Upload"
+METHODS = {"POST", "PUT", "PATCH"}
+MAX_KEY_LENGTH = 255
+# Response headers kept with a stored response
+STORED_HEADERS = {b"content-type", b"location", b"x-venue-conflicts"}
+
+store = shared_state.make_backend(config.EVENT_CACHE_URL, config.IDEMPOTENCY_STORE_SIZE)
+
+
+def _digest(*parts) -> str:
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else str(part).encode())
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def file_digest(fileobj) -> str:
+    """SHA-256 of an upload's content; the file is rewound for the endpoint."""
+    sha = hashlib.sha256()
+    while block := fileobj.read(1024 * 1024):
+        sha.update(block)
+    fileobj.seek(0)
+    return sha.hexdigest()
+
+
+def _upload_key(kind: str, event_id: int, digest: str) -> str:
+    return f"upload:{kind}:{event_id}:{digest}"
+
+
+def recent_upload(kind: str, event_id: int, digest: str):
+    """What a successful earlier upload of the same file returned, if it is still remembered."""
+    return store.get(_upload_key(kind, event_id, digest))
+
+
+def remember_upload(kind: str, event_id: int, digest: str, result: dict):
+    encoded = jsonable_encoder(result)
+    if len(json.dumps(encoded)) <= config.IDEMPOTENCY_MAX_BODY_BYTES:
+        store.set(_upload_key(kind, event_id, digest), encoded, config.IDEMPOTENCY_TTL)
+
+
+async def _json_response(send, status: int, body: dict, headers=()):
+    payload = json.dumps(body).encode()
+    await _send(send, status, [(b"content-type", b"application/json"), *headers], payload)
+
+
+async def _send(send, status: int, headers: list, body: bytes):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [*headers, (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class Fingerprint:
+    """
+    SHA-256 of a request body, fed chunk by chunk.
+
+    Multipart bodies are hashed without their boundary, which clients pick
+    afresh for every attempt; the same file retried hashes the same.
+    """
+
+    def __init__(self, content_type: bytes):
+        self._sha = hashlib.sha256()
+        self._boundary = None
+        self._tail = b""
+        if content_type.startswith(b"multipart/"):
+            for param in content_type.split(b";")[1:]:
+                name, _, value = param.strip().partition(b"=")
+                if name.lower() == b"boundary" and value:
+                    self._boundary = value.strip(b'"')
+
+    def update(self, chunk: bytes):
+        if self._boundary is None:
+            self._sha.update(chunk)
+            return
+        # Keep a boundary-sized tail back in case one is split across chunks
+        data = (self._tail + chunk).replace(self._boundary, b"")
+        keep = min(len(self._boundary) - 1, len(data))
+        self._sha.update(data[:len(data) - keep])
+        self._tail = data[len(data) - keep:]
+
+    def hexdigest(self) -> str:
+        self._sha.update(self._tail)
+        self._tail = b""
+        return self._sha.hexdigest()
+
+
+async def _drain_body(receive, fingerprint: Fingerprint) -> str:
+    """Read a request body the endpoint will not see, returning its fingerprint."""
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        fingerprint.update(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return fingerprint.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware implementing `Idempotency-Key` (see the module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        key = headers.get(HEADER.encode())
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _json_response(send, 400, {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"})
+            return
+
+        # Scoped to the caller's credentials: one client cannot replay another's response
+        store_key = "idem:" + _digest(headers.get(b"authorization", b""), scope["method"], scope["path"],
+                                      scope.get("query_string", b""), key)
+        stored = await shared_state.call(store, "get", store_key)
+        if stored is None and await shared_state.call(store, "add", store_key, {"state": "running"},
+                                                      config.IDEMPOTENCY_LOCK_SECONDS):
+            await self._run(scope, receive, send, store_key, Fingerprint(headers.get(b"content-type", b"")))
+            return
+        if stored is None or stored.get("state") == "running":
+            await _json_response(send, 409, {"detail": "A request with this Idempotency-Key is in progress"},
+                                 [(b"retry-after", b"1")])
+            return
+
+        fingerprint = await _drain_body(receive, Fingerprint(headers.get(b"content-type", b"")))
+        if stored["fingerprint"] not in (None, fingerprint):
+            await _json_response(send, 422, {"detail": "Idempotency-Key was used with a different request"})
+            return
+        replay = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored["headers"]]
+        await _send(send, stored["status"], [*replay, (REPLAYED_HEADER.lower().encode(), b"true")],
+                    stored["body"].encode())
+
+    async def _run(self, scope, receive, send, store_key: str, fingerprint: Fingerprint):
+        response = {"status": 500, "headers": [], "body": bytearray(), "storable": True}
+        body_read = False
+
+        async def hashing_receive():
+            nonlocal body_read
+            message = await receive()
+            if message["type"] == "http.request":
+                fingerprint.update(message.get("body", b""))
+                body_read = not message.get("more_body")
+            return message
+
+        async def capturing_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [(name.decode("latin-1"), value.decode("latin-1"))
+                                       for name, value in message.get("headers", [])
+                                       if name.lower() in STORED_HEADERS]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                response["storable"] = content_type.startswith(b"application/json")
+            elif message["type"] == "http.response.body" and response["storable"]:
+                response["body"] += message.get("body", b"")
+                if message.get("more_body") or len(response["body"]) > config.IDEMPOTENCY_MAX_BODY_BYTES:
+                    response["storable"] = False  # Streamed or too large to keep
+            await send(message)
+
+        try:
+            await self.app(scope, hashing_receive, capturing_send)
+        except BaseException:
+            await shared_state.call(store, "delete", store_key)
+            raise
+        if response["status"] >= 500 or not response["storable"]:
+            await shared_state.call(store, "delete", store_key)
+            return
+        await shared_state.call(store, "set", store_key, {
+            "state": "done",
+            # Unknown if the endpoint answered without reading the whole body
+            "fingerprint": fingerprint.hexdigest() if body_read else None,
+            "status": response["status"],
+            "headers": response["headers"],
+            "body": response["body"].decode("utf-8"),
+        }, config.IDEMPOTENCY_TTL)
@@ -0,0 +1,80 @@
+"""
+Time-window predicates over `Event.start_time` / `Event.end_time`.
+
+"Overlaps [start, end)" is `start_time < end AND end_time > start`; on its
+own the second half cannot bound an index range, so a query would scan every
+event that started before `end`. Event durations are capped at
+`MAX_EVENT_DURATION_HOURS`, which adds the lower bound
+`start_time >= start - max duration`: the scan becomes a range seek on the
+`(start_time, end_time)` or `(location, start_time)` index whose width is set
+by the window, not by the size of the table.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import config
+from models import Event, EventStatus
+
+# Conflicts reported per create/update
+MAX_REPORTED_CONFLICTS = 20
+
+
+def max_duration() -> timedelta:
+    return timedelta(hours=config.MAX_EVENT_DURATION_HOURS)
+
+
+def validate_times(start_time: datetime, end_time: datetime):
+    """Raise ValueError unless the event ends after it starts, within the maximum duration."""
+    start_time, end_time = as_utc(start_time), as_utc(end_time)
+    if end_time <= start_time:
+        raise ValueError("end_time must be after start_time")
+    if end_time - start_time > max_duration():
+        raise ValueError(f"Events cannot last longer than {config.MAX_EVENT_DURATION_HOURS:g} hours")
+
+
+def as_utc(value: datetime):
+    """Naive UTC, as event times are stored; aware datetimes are converted."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def overlapping(start: datetime = None, end: datetime = None) -> list:
+    """
+    WHERE clauses for events overlapping the window [start, end).
+
+    Either bound may be omitted. `start == end` selects the events in
+    progress at that instant.
+    """
+    start, end = as_utc(start), as_utc(end)
+    clauses = []
+    if start is not None:
+        clauses += [Event.end_time > start, Event.start_time >= start - max_duration()]
+    if end is not None:
+        clauses.append(Event.start_time <= end if end == start else Event.start_time < end)
+    return clauses
+
+
+def happening_now() -> list:
+    """WHERE clauses for the events in progress now (event times are UTC)."""
+    now = datetime.utcnow()
+    return overlapping(now, now)
+
+
+def find_conflicts(db: Session, location: str, start_time: datetime, end_time: datetime,
+                   exclude_event_id: int = None) -> list:
+    """Other non-canceled events at `location` overlapping [start_time, end_time), earliest first."""
+    query = select(Event.event_id, Event.name, Event.start_time, Event.end_time).where(
+        Event.location == location,
+        *overlapping(start_time, end_time),
+        Event.status.is_distinct_from(EventStatus.canceled),
+    )
+    if exclude_event_id is not None:
+        query = query.where(Event.event_id != exclude_event_id)
+    rows = db.execute(query.order_by(Event.start_time, Event.event_id).limit(MAX_REPORTED_CONFLICTS)).all()
+    return [
+        {"event_id": event_id, "name": name, "start_time": start.isoformat(), "end_time": end.isoformat()}
+        for event_id, name, start, end in rows
+    ]
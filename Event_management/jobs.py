@@ -0,0 +1,385 @@
+"""
+Background processing of large bulk uploads and check-ins.
+
+An upload is spooled to `JOB_SPOOL_DIR` and recorded as a `Job` row; the
+request returns immediately. Worker threads (started with the app, or in
+separate `python -m jobs` processes) claim queued jobs with a conditional
+UPDATE, so each job has exactly one owner across all processes.
+
+Jobs are processed in the chunks of bulk.py. Every chunk is committed
+together with the job's progress and running report, so a job interrupted
+by a crash or shutdown resumes after its last committed chunk without
+importing a row twice. A worker that stops reporting for
+`JOB_STALE_SECONDS` loses its claim to the next worker that polls.
+Cancellation takes effect between chunks; committed chunks are kept.
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+import config
+from bulk import CHUNK_SIZE, CheckInReport, ImportReport, check_in_emails, import_attendees, iter_csv_rows
+from database import SessionLocal
+from models import Job, JobStatus
+from occupancy import broker
+
+logger = logging.getLogger("event_management.jobs")
+
+ATTENDEE_IMPORT = "attendee_import"
+CHECK_IN = "check_in"
+FINISHED = (JobStatus.succeeded, JobStatus.failed, JobStatus.canceled)
+
+
+class JobCanceled(Exception):
+    pass
+
+
+class JobPaused(Exception):
+    """The worker is shutting down; the job goes back to the queue."""
+
+
+class LostClaim(Exception):
+    """Another worker took over the job (this one was considered stale)."""
+
+
+def read_header(fileobj):
+    """Parse the header row of an upload and rewind it."""
+    rows = iter_csv_rows(fileobj)
+    try:
+        return next(rows, None)
+    finally:
+        rows.close()
+        fileobj.seek(0)
+
+
+def spool_upload(fileobj, directory: str = None):
+    """Copy an upload into the spool directory; returns (path, estimated data rows)."""
+    directory = Path(directory or config.JOB_SPOOL_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{uuid.uuid4().hex}.csv"
+    lines = 0
+    last = b"\n"
+    with open(path, "wb") as spool:
+        while block := fileobj.read(1024 * 1024):
+            lines += block.count(b"\n")
+            last = block[-1:]
+            spool.write(block)
+    if last != b"\n":
+        lines += 1  # Unterminated last line
+    return str(path), max(lines - 1, 0)
+
+
+def enqueue(db: Session, kind: str, event_id: int, spool_path: str, rows_total: int, created_by: str = None) -> dict:
+    job = Job(
+        job_id=uuid.uuid4().hex,
+        kind=kind,
+        event_id=event_id,
+        status=JobStatus.queued,
+        spool_path=spool_path,
+        rows_total=rows_total,
+        rows_done=0,
+        cancel_requested=False,
+        attempts=0,
+        created_by=created_by,
+    )
+    db.add(job)
+    db.commit()
+    wake_workers()
+    return job_status(job)
+
+
+def job_status(job: Job) -> dict:
+    progress = None
+    if job.status == JobStatus.succeeded:
+        progress = 1.0
+    elif job.rows_total:
+        progress = round(min(job.rows_done / job.rows_total, 1.0), 4)
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "event_id": job.event_id,
+        "status": job.status.value,
+        "rows_done": job.rows_done,
+        "rows_total": job.rows_total,
+        "progress": progress,
+        "result": job.result,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def get_job(db: Session, job_id: str):
+    job = db.get(Job, job_id)
+    return job_status(job) if job else None
+
+
+def cancel_job(db: Session, job_id: str):
+    """
+    Cancel a job: queued jobs stop at once, running ones after their current chunk.
+
+    Returns the job status, or None if there is no such job. Raises
+    ValueError if the job has already finished.
+    """
+    job = db.get(Job, job_id)
+    if job is None:
+        return None
+    if job.status in FINISHED:
+        raise ValueError(f"Job already {job.status.value}")
+
+    canceled_while_queued = db.execute(
+        update(Job)
+        .where(Job.job_id == job_id, Job.status == JobStatus.queued)
+        .values(status=JobStatus.canceled, cancel_requested=True, finished_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not canceled_while_queued:
+        db.execute(
+            update(Job).where(Job.job_id == job_id).values(cancel_requested=True)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    if canceled_while_queued:
+        _remove_spool(job.spool_path)
+    db.refresh(job)
+    return job_status(job)
+
+
+def _remove_spool(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _run_import(db: Session, job: Job, rows, on_chunk, chunk_size: int) -> dict:
+    return import_attendees(
+        db, job.event_id, rows, chunk_size=chunk_size,
+        report=ImportReport.from_dict(job.result or {}), on_chunk=on_chunk,
+        first_row=job.rows_done + 2,  # Row 1 is the header
+    )
+
+
+def _run_check_in(db: Session, job: Job, rows, on_chunk, chunk_size: int) -> dict:
+    report = check_in_emails(
+        db, job.event_id, rows, chunk_size=chunk_size,
+        report=CheckInReport(counts=job.result), on_chunk=on_chunk,
+    )
+    return report.as_dict()
+
+
+HANDLERS = {ATTENDEE_IMPORT: _run_import, CHECK_IN: _run_check_in}
+
+
+class JobRunner:
+    """Claims and processes jobs; one runner per worker thread."""
+
+    def __init__(self, session_factory=SessionLocal, worker_id: str = None, chunk_size: int = CHUNK_SIZE,
+                 should_stop=lambda: False):
+        self.session_factory = session_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.chunk_size = chunk_size
+        self.should_stop = should_stop
+
+    def claim(self, db: Session):
+        """Take ownership of the oldest runnable job; returns its id or None."""
+        now = datetime.utcnow()
+        runnable = or_(
+            Job.status == JobStatus.queued,
+            and_(Job.status == JobStatus.running, Job.heartbeat_at < now - timedelta(seconds=config.JOB_STALE_SECONDS)),
+        )
+        candidates = db.scalars(select(Job.job_id).where(runnable).order_by(Job.created_at).limit(5)).all()
+        for job_id in candidates:
+            # Re-checked in the UPDATE, so of several racing workers only one wins
+            claimed = db.execute(
+                update(Job)
+                .where(Job.job_id == job_id, runnable)
+                .values(status=JobStatus.running, worker_id=self.worker_id, heartbeat_at=now,
+                        attempts=Job.attempts + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if claimed:
+                return job_id
+        return None
+
+    def run_next(self) -> bool:
+        """Claim and process one job; returns False if there was nothing to do."""
+        with self.session_factory() as db:
+            job_id = self.claim(db)
+            if job_id is None:
+                return False
+            self.process(db, job_id)
+            return True
+
+    def run_pending(self) -> int:
+        """Process jobs until the queue is empty; returns how many were processed."""
+        count = 0
+        while not self.should_stop() and self.run_next():
+            count += 1
+        return count
+
+    def _owned(self, job_id: str):
+        return and_(Job.job_id == job_id, Job.worker_id == self.worker_id, Job.status == JobStatus.running)
+
+    def process(self, db: Session, job_id: str):
+        job = db.get(Job, job_id)
+        event_id, done = job.event_id, job.rows_done
+        published = {"registered": (job.result or {}).get("added", 0),
+                     "checked_in": (job.result or {}).get("checked_in", 0)}
+
+        def on_chunk(consumed: int, report):
+            nonlocal done
+            done += consumed
+            # The chunk's writes and the progress that covers them commit together
+            if not db.execute(
+                update(Job).where(self._owned(job_id))
+                .values(rows_done=done, result=report.as_dict(), heartbeat_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            ).rowcount:
+                raise LostClaim(job_id)
+            db.commit()
+            self._publish(event_id, report, published)
+            if db.scalar(select(Job.cancel_requested).where(Job.job_id == job_id)):
+                raise JobCanceled(job_id)
+            if self.should_stop():
+                raise JobPaused(job_id)
+
+        try:
+            if job.cancel_requested:
+                raise JobCanceled(job_id)
+            if job.attempts > config.JOB_MAX_ATTEMPTS:
+                raise RuntimeError(f"Gave up after {job.attempts - 1} interrupted attempts")
+            with open(job.spool_path, "rb") as fileobj:
+                rows = iter_csv_rows(fileobj)
+                next(rows, None)  # Header, validated at upload
+                deque(islice(rows, done), maxlen=0)  # Skip rows committed by earlier attempts
+                result = HANDLERS[job.kind](db, job, rows, on_chunk, self.chunk_size)
+            self._finish(db, job, JobStatus.succeeded, result=result)
+        except LostClaim:
+            db.rollback()
+            logger.warning("Job %s was taken over by another worker", job_id)
+        except JobPaused:
+            db.rollback()
+            db.execute(update(Job).where(self._owned(job_id)).values(status=JobStatus.queued, worker_id=None)
+                       .execution_options(synchronize_session=False))
+            db.commit()
+        except JobCanceled:
+            db.rollback()
+            self._finish(db, job, JobStatus.canceled)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Job %s failed", job_id)
+            self._finish(db, job, JobStatus.failed, error=str(e))
+
+    def _finish(self, db: Session, job: Job, status: JobStatus, result: dict = None, error: str = None):
+        values = {"status": status, "finished_at": datetime.utcnow(), "error": error}
+        if result is not None:
+            values["result"] = result
+        finished = db.execute(
+            update(Job).where(self._owned(job.job_id)).values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if finished:
+            _remove_spool(job.spool_path)
+
+    @staticmethod
+    def _publish(event_id: int, report, published: dict):
+        totals = {"registered": getattr(report, "added", 0), "checked_in": getattr(report, "checked_in", 0)}
+        broker.publish(event_id, **{key: totals[key] - published[key] for key in totals})
+        published.update(totals)
+
+
+class WorkerPool:
+    """Worker threads that poll for jobs, and wake at once for jobs enqueued here."""
+
+    def __init__(self, size: int, session_factory=SessionLocal, poll_seconds: float = None):
+        self.size = size
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds or config.JOB_POLL_SECONDS
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for n in range(self.size):
+            runner = JobRunner(self.session_factory, should_stop=self._stopping.is_set)
+            thread = threading.Thread(target=self._loop, args=(runner,), name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout: float = None):
+        """Finish the current chunk of each job, requeue the rest and join the threads."""
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self, runner: JobRunner):
+        while not self._stopping.is_set():
+            try:
+                if runner.run_pending():
+                    continue
+            except Exception:
+                logger.exception("Job worker error")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+
+_pool = None
+
+
+def start_workers(size: int = None):
+    """Start this process's worker pool (no-op for size 0)."""
+    global _pool
+    size = config.JOB_WORKERS if size is None else size
+    if size > 0 and _pool is None:
+        _pool = WorkerPool(size).start()
+    return _pool
+
+
+def stop_workers(timeout: float = None):
+    global _pool
+    if _pool is not None:
+        _pool.stop(timeout)
+        _pool = None
+
+
+def wake_workers():
+    if _pool is not None:
+        _pool.wake()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run background job workers until interrupted.")
+    parser.add_argument("--workers", type=int, default=max(config.JOB_WORKERS, 1))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    pool = WorkerPool(args.workers).start()
+    logger.info("Started %d job workers", args.workers)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        logger.info("Stopping; running jobs are requeued after their current chunk")
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
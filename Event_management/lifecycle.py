@@ -0,0 +1,98 @@
+"""
+Per-worker startup and shutdown, run from the app's lifespan.
+
+`on_ready` runs once the worker's database check passes (see `readiness`):
+it starts the check-in buffer (when enabled) and the job workers, opens
+`WARMUP_CONNECTIONS` pooled connections so the first requests do not pay
+for connecting, and loads the next `WARMUP_EVENTS` upcoming events into the
+event cache.
+
+`drain` runs on shutdown. By then the server has stopped accepting
+connections and waited for in-flight requests (up to its graceful-shutdown
+timeout); the worker reports not ready, buffered check-ins are flushed,
+running jobs go back to the queue and pooled connections are closed.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import checkin_buffer
+import config
+import database
+import event_cache
+import jobs
+from models import Event, EventStatus
+from readiness import readiness
+
+logger = logging.getLogger("event_management.lifecycle")
+
+
+def _warm_event_cache(bind) -> int:
+    with Session(bind) as db:
+        loaded_at = event_cache.generation()
+        events = db.scalars(
+            select(Event)
+            .where(Event.end_time > datetime.utcnow(), Event.status.is_distinct_from(EventStatus.canceled))
+            .order_by(Event.start_time)
+            .limit(config.WARMUP_EVENTS)
+        ).all()
+        event_cache.prime(events, loaded_at)
+    return len(events)
+
+
+def _warm_sync(connections: int) -> int:
+    opened = [database.engine.connect() for _ in range(connections)]
+    try:
+        for conn in opened:
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return _warm_event_cache(database.engine)
+
+
+async def _open(async_engine):
+    conn = await async_engine.connect()
+    await conn.execute(text("SELECT 1"))
+    return conn
+
+
+async def warm_up():
+    """Fill the connection pool and the event cache; failures are logged, not raised."""
+    connections = min(config.WARMUP_CONNECTIONS, config.DB_POOL_SIZE)
+    try:
+        if database.async_engine is None:
+            cached = await run_in_threadpool(_warm_sync, connections)
+        else:
+            opened = await asyncio.gather(*(_open(database.async_engine) for _ in range(connections)))
+            for conn in opened:
+                await conn.close()
+            async with database.async_engine.connect() as conn:
+                cached = await conn.run_sync(_warm_event_cache)
+    except Exception:
+        logger.warning("Warm-up failed", exc_info=True)
+        return
+    logger.info("Warmed %d connections and %d cached events", connections, cached)
+
+
+async def on_ready():
+    # Replays check-ins logged by processes that died before flushing them
+    await run_in_threadpool(checkin_buffer.start)
+    # JOB_WORKERS=0 disables the in-process job workers
+    jobs.start_workers()
+    await warm_up()
+
+
+async def drain():
+    readiness.stop()
+    # Apply buffered check-ins while the database is still reachable
+    await run_in_threadpool(checkin_buffer.stop)
+    # Running jobs commit their current chunk and go back to the queue
+    await run_in_threadpool(jobs.stop_workers)
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    await run_in_threadpool(database.engine.dispose)
@@ -1,6 +1,23 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from database import engine, Base
-from routers import events, attendence, auth_routes
+from fastapi.responses import JSONResponse, PlainTextResponse
+from admission import AdmissionMiddleware
+from idempotency import IdempotencyMiddleware
+from metrics import MetricsMiddleware, registry
+from routers import events, attendence, auth_routes, jobs as job_routes, reports
+import lifecycle
+from readiness import readiness
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema is managed by Alembic; jobs and warm-up only start against a
+    # current schema (otherwise on the first successful /ready)
+    if await readiness.check():
+        await lifecycle.on_ready()
+    yield
+    await lifecycle.drain()
 
 
 app = FastAPI(
@@ -9,15 +26,30 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",  # Custom Swagger docs URL
     redoc_url="/redoc",  # Enable ReDoc UI
+    lifespan=lifespan,
 )
 
-# Create database tables (ensure all models are initialized)
-Base.metadata.create_all(bind=engine)
-
-
 app.include_router(events.router, prefix="/events", tags=["Events"])
 app.include_router(attendence.router, prefix="/attendees", tags=["Attendees"])
 app.include_router(auth_routes.router, prefix="/auth_routes", tags=["auth_routes"])
+app.include_router(job_routes.router, prefix="/jobs", tags=["Jobs"])
+app.include_router(reports.router, prefix="/reports", tags=["Reports"])
+
+app.add_middleware(IdempotencyMiddleware)
+# Refused requests are counted by MetricsMiddleware and never claim an Idempotency-Key
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of request, SQL and pool metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness probe: 200 once the database is reachable and its schema current, else 503."""
+    if not readiness.ready and await readiness.check():
+        await lifecycle.on_ready()
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
@@ -0,0 +1,310 @@
+"""
+Request instrumentation and Prometheus text exposition.
+
+`MetricsMiddleware` times every request per route template, and SQLAlchemy
+cursor hooks charge each statement to the request that ran it, so latency
+can be split into time spent in the database and everything else (routing,
+validation, serialization). Results are exposed at `/metrics` and, per
+response, in a `Server-Timing` header.
+"""
+import contextvars
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+logger = logging.getLogger("event_management.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """Cumulative bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum, count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        with self._lock:
+            series = self._series.get(label_values)
+            return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, ([*counts], total, n)) for key, (counts, total, n) in self._series.items())
+        names = self.labels + ("le",)
+        for label_values, (counts, total, n) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield f"{self.name}_bucket", _format_labels(names, label_values + (le,)), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labels, label_values), total
+            yield f"{self.name}_count", _format_labels(self.labels, label_values), n
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable returning `(name, kind, documentation, value)` tuples at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+        for collector in self._collectors:
+            for name, kind, documentation, value in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "Requests handled, by route template and status code.",
+    ("method", "route", "status"),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last body byte.",
+    ("method", "route"),
+))
+REQUEST_DB_DURATION = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL statements per request.",
+    ("method", "route"),
+))
+REQUEST_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per request.",
+    ("method", "route"), buckets=QUERY_COUNT_BUCKETS,
+))
+IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "Requests currently being handled.",
+))
+
+
+class RequestStats:
+    """SQL executed on behalf of one request."""
+
+    __slots__ = ("queries", "db_seconds", "statements", "_lock")
+
+    def __init__(self, capture_statements: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if capture_statements else None
+        # Streaming responses may run statements from the threadpool
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            if self.statements is not None and len(self.statements) < config.SLOW_REQUEST_MAX_STATEMENTS:
+                self.statements.append((statement, seconds))
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats():
+    """Stats of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+# Listening on the Engine class covers every engine, including the sync
+# engine behind an AsyncEngine and the ones tests create. The threadpool and
+# AsyncSession.run_sync both run in a copy of the request's context.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("query_start")
+    if stats is not None and starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+def _route_template(scope) -> str:
+    """Label by path template, never by raw path, to keep label cardinality bounded."""
+    # Newer FastAPI resolves included routers lazily and keeps the prefixed
+    # route here; `scope["route"]` then only carries the router-relative path
+    route = (scope.get("fastapi") or {}).get("effective_route_context") or scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and SQL cost per route.
+
+    The body of streaming responses is included in the timing. Requests
+    slower than `config.SLOW_REQUEST_MS` are logged with their statements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        slow_ms = config.SLOW_REQUEST_MS
+        stats = RequestStats(capture_statements=slow_ms > 0)
+        token = _current.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries", '
+                    f"app;dur={elapsed_ms:.2f}"
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_PROGRESS.dec()
+            _current.reset(token)
+            method, route = scope["method"], _route_template(scope)
+            REQUESTS.inc(method, route, str(status_code))
+            REQUEST_DURATION.observe(elapsed, method, route)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, method, route)
+            REQUEST_DB_QUERIES.observe(stats.queries, method, route)
+            if slow_ms > 0 and elapsed * 1000 >= slow_ms:
+                _log_slow_request(method, scope.get("path", ""), route, status_code, elapsed, stats)
+
+
+def _log_slow_request(method, path, route, status_code, elapsed, stats: RequestStats):
+    lines = [
+        f"{method} {path} ({route}) -> {status_code} in {elapsed * 1000:.1f}ms; "
+        f"{stats.queries} queries, {stats.db_seconds * 1000:.1f}ms in the database"
+    ]
+    lines.extend(f"  {seconds * 1000:8.2f}ms  {' '.join(statement.split())}" for statement, seconds in stats.statements)
+    if stats.queries > len(stats.statements):
+        lines.append(f"  ... {stats.queries - len(stats.statements)} more statements")
+    logger.warning("\n".join(lines))
+
+
+_POOL_COUNTERS = {"checkouts", "checkout_timeouts", "checkout_wait_seconds_total", "connections_created", "invalidations"}
+
+
+def _pool_samples():
+    from database import pool_status
+
+    for key, value in pool_status().items():
+        kind = "counter" if key in _POOL_COUNTERS else "gauge"
+        name = f"db_pool_{key}"
+        if kind == "counter" and not name.endswith("_total"):
+            name += "_total"
+        yield name, kind, f"Connection pool {key.replace('_', ' ')}.", value
+
+
+registry.add_collector(_pool_samples)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Boolean
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, DateTime, Enum, ForeignKey, Boolean, Index, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -11,6 +12,16 @@ class EventStatus(str, enum.Enum):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # list_events filters on status, then location
+        Index("ix_events_status_location", "status", "location"),
+        # Keyset pagination order for list_events
+        Index("ix_events_start_time_event_id", "start_time", "event_id"),
+        # Time-window filters; the duration cap bounds the start_time range (see intervals.py)
+        Index("ix_events_start_time_end_time", "start_time", "end_time"),
+        # Venue overlap checks
+        Index("ix_events_location_start_time", "location", "start_time"),
+    )
 
     event_id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -19,17 +30,28 @@ class Event(Base):
     end_time = Column(DateTime, nullable=False)
     location = Column(String)
     max_attendees = Column(Integer, nullable=False)
+    # Kept in step with the attendees table by capacity.reserve_seats
+    registered_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Kept in step with attendees.check_in_status by the check-in paths (see occupancy.py)
+    checked_in_count = Column(Integer, nullable=False, default=0, server_default="0")
     status = Column(Enum(EventStatus), default=EventStatus.scheduled)
 
     attendees = relationship("Attendee", back_populates="event")
 
 class Attendee(Base):
     __tablename__ = "attendees"
+    __table_args__ = (
+        # One registration per email per event; also serves every event_id lookup
+        UniqueConstraint("event_id", "email", name="uq_attendees_event_id_email"),
+        Index("ix_attendees_event_id_check_in_status", "event_id", "check_in_status"),
+        # Keyset pagination order for get_attendees
+        Index("ix_attendees_event_id_attendee_id", "event_id", "attendee_id"),
+    )
 
     attendee_id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
-    email = Column(String, unique=True, nullable=False)
+    email = Column(String, nullable=False)
     phone_number = Column(String, nullable=False)
     event_id = Column(Integer, ForeignKey("events.event_id"), nullable=False)
     check_in_status = Column(Boolean, default=False)
@@ -42,4 +64,73 @@ class User(Base):
 
     user_id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
-    password = Column(String, nullable=False)
\ No newline at end of file
+    password = Column(String, nullable=False)
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    canceled = "canceled"
+
+
+class Job(Base):
+    """A spooled bulk upload or check-in file, processed by the workers in jobs.py."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued (or stale running) job
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
+
+    job_id = Column(String(32), primary_key=True)
+    kind = Column(String, nullable=False)
+    event_id = Column(Integer, ForeignKey("events.event_id"), nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    spool_path = Column(String, nullable=False)
+    # Data rows in the file (estimated from line count) and rows committed so far
+    rows_total = Column(Integer)
+    rows_done = Column(Integer, nullable=False, default=0)
+    result = Column(JSON)
+    error = Column(String)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String)
+    created_by = Column(String)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class EventDailyStats(Base):
+    """Registrations and check-ins per event and day (UTC); maintained by reporting.py."""
+
+    __tablename__ = "event_daily_stats"
+    __table_args__ = (
+        # Timelines across all events for a date range
+        Index("ix_event_daily_stats_day", "day"),
+    )
+
+    event_id = Column(Integer, ForeignKey("events.event_id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    registrations = Column(Integer, nullable=False, default=0, server_default="0")
+    check_ins = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class EventGroupStats(Base):
+    """
+    Event totals per (location, status), maintained by reporting.py.
+
+    Each group is spread over a few shard rows (by event_id) so concurrent
+    registrations at different events of one city do not queue on one row.
+    """
+
+    __tablename__ = "event_group_stats"
+
+    location = Column(String, primary_key=True)
+    status = Column(String(16), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    events = Column(Integer, nullable=False, default=0, server_default="0")
+    capacity = Column(Integer, nullable=False, default=0, server_default="0")
+    registered = Column(Integer, nullable=False, default=0, server_default="0")
+    checked_in = Column(Integer, nullable=False, default=0, server_default="0")
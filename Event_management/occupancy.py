@@ -0,0 +1,161 @@
+"""
+Per-event occupancy: registered, checked in and remaining capacity.
+
+`Event.registered_count` and `Event.checked_in_count` are maintained by the
+write paths (seat reservations and check-ins), so a summary is a primary-key
+read instead of a scan of the attendees table. Committed changes are also
+published as deltas to in-process subscribers, which feed the Server-Sent
+Events stream; subscribers periodically re-read the summary, which also
+covers changes made by other worker processes.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from models import Event
+import reporting
+
+# Deltas buffered per subscriber; a slow client skips ahead to the next resync
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def record_check_ins(db: Session, event_id: int, count: int):
+    """Add `count` new check-ins to the event's counter, in the caller's transaction."""
+    if count:
+        stmt = (
+            update(Event)
+            .where(Event.event_id == event_id)
+            .values(checked_in_count=Event.checked_in_count + count)
+            .execution_options(synchronize_session=False)
+        )
+        group = None
+        if db.get_bind().dialect.update_returning:
+            group = db.execute(stmt.returning(Event.location, Event.status)).first()
+        else:
+            db.execute(stmt)
+        reporting.record_check_ins(db, event_id, count, group)
+
+
+def summary(db: Session, event_id: int):
+    """Occupancy of an event, or None if it does not exist."""
+    row = db.execute(
+        select(Event.max_attendees, Event.registered_count, Event.checked_in_count)
+        .where(Event.event_id == event_id)
+    ).first()
+    if row is None:
+        return None
+    capacity, registered, checked_in = row
+    return {
+        "event_id": event_id,
+        "capacity": capacity,
+        "registered": registered,
+        "checked_in": checked_in,
+        "remaining": max(capacity - registered, 0),
+    }
+
+
+class OccupancyBroker:
+    """Fan-out of occupancy deltas to asyncio subscribers, publishable from any thread."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[event_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, event_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(event_id, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(event_id, None)
+
+    def publish(self, event_id: int, registered: int = 0, checked_in: int = 0):
+        """Announce committed changes; call after the commit."""
+        if not (registered or checked_in):
+            return
+        delta = {"event_id": event_id, "registered": registered, "checked_in": checked_in}
+        with self._lock:
+            subscribers = list(self._subscribers.get(event_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, delta)
+            except RuntimeError:
+                pass  # Subscriber's loop already closed
+
+    def subscriber_count(self, event_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(event_id, ()))
+
+
+def _offer(queue: asyncio.Queue, delta: dict):
+    try:
+        queue.put_nowait(delta)
+    except asyncio.QueueFull:
+        pass
+
+
+broker = OccupancyBroker()
+
+
+async def read_summary(bind, event_id: int):
+    """`summary` on a session of its own, for use outside a request's session."""
+    if not hasattr(bind, "sync_engine"):
+        def read():
+            with Session(bind) as db:
+                return summary(db, event_id)
+        return await run_in_threadpool(read)
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async with AsyncSession(bind) as db:
+        return await db.run_sync(summary, event_id)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream(bind, event_id: int, resync_seconds: float):
+    """
+    Server-Sent Events: a `snapshot` first, then a `delta` per committed change.
+
+    A fresh `snapshot` is sent every `resync_seconds`, however busy the event;
+    it doubles as a keep-alive and corrects for deltas this process never saw.
+    """
+    loop = asyncio.get_running_loop()
+    # Subscribe before the first read so no change falls in between
+    queue = broker.subscribe(event_id)
+    try:
+        initial = await read_summary(bind, event_id)
+        if initial is None:
+            return
+        yield _sse("snapshot", initial)
+        resync_at = loop.time() + resync_seconds
+        while True:
+            delta = None
+            wait = resync_at - loop.time()
+            if wait > 0:
+                try:
+                    delta = await asyncio.wait_for(queue.get(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+            if delta is not None:
+                yield _sse("delta", delta)
+                continue
+            current = await read_summary(bind, event_id)
+            if current is None:
+                return
+            yield _sse("snapshot", current)
+            resync_at = loop.time() + resync_seconds
+    finally:
+        broker.unsubscribe(event_id, queue)
@@ -0,0 +1,48 @@
+"""
+Opaque cursors and column projection for keyset-paginated listings.
+
+A cursor encodes the sort key of the last row on a page; the next page
+continues strictly after it (`WHERE key > cursor ORDER BY key LIMIT n`), so
+each page costs an index seek regardless of how deep the client has paged.
+"""
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Response header carrying the cursor for the following page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """Encode sort key values (ints, strings, datetimes) as an opaque cursor."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor back into its `size` raw values; raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_fields(fields, allowed) -> list:
+    """
+    Split a comma-separated `fields` parameter, validating against `allowed`.
+
+    Returns every allowed field, in declared order, when `fields` is empty.
+    """
+    if not fields:
+        return list(allowed)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
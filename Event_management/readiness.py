@@ -0,0 +1,99 @@
+"""
+Startup schema handling and the readiness probe.
+
+Alembic owns the schema (`alembic upgrade head`); importing the app never
+touches the database. The lifespan runs `readiness.check()`, whose work
+depends on `SCHEMA_MODE`:
+
+    check   the database must be reachable and at the Alembic head revision
+    create  create missing tables (local development and throwaway databases)
+    off     only check that the database is reachable
+
+Until the check passes, `GET /ready` answers 503 with the reason and
+re-checks on every call, so a process started before its migrations ran
+becomes ready once they have, without a restart.
+"""
+import logging
+from pathlib import Path
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+import config
+import database
+
+logger = logging.getLogger("event_management.readiness")
+
+ALEMBIC_INI = Path(__file__).with_name("alembic.ini")
+
+
+def expected_heads() -> set:
+    """Head revisions of the migration scripts shipped with the app."""
+    # Alembic is only needed here, so it is not imported with the app
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    alembic_config = Config(str(ALEMBIC_INI))
+    alembic_config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return set(ScriptDirectory.from_config(alembic_config).get_heads())
+
+
+def _check(connection, mode: str, expected: set):
+    """Return None if `connection`'s database is usable, else the reason it is not."""
+    connection.execute(text("SELECT 1"))
+    if mode == "create":
+        database.Base.metadata.create_all(bind=connection)
+    elif mode == "check":
+        from alembic.runtime.migration import MigrationContext
+
+        current = set(MigrationContext.configure(connection).get_current_heads())
+        if current != expected:
+            found = ", ".join(sorted(current)) or "no revision"
+            return f"Database schema is at {found}, expected {', '.join(sorted(expected))}; run `alembic upgrade head`"
+    return None
+
+
+class Readiness:
+    """Whether this process may serve traffic, and why not."""
+
+    def __init__(self):
+        self.ready = False
+        self.reason = "Starting"
+        self.stopping = False
+        self._expected = None
+
+    async def check(self) -> bool:
+        if self.ready or self.stopping:
+            return self.ready
+        mode = config.SCHEMA_MODE
+        try:
+            if mode == "check" and self._expected is None:
+                self._expected = await run_in_threadpool(expected_heads)
+            if database.async_engine is not None:
+                async with database.async_engine.begin() as connection:
+                    reason = await connection.run_sync(_check, mode, self._expected)
+            else:
+                reason = await run_in_threadpool(self._check_sync, mode)
+        except Exception as e:
+            reason = f"Database unavailable: {e}"
+
+        self.ready, self.reason = reason is None, reason
+        if reason:
+            logger.warning("Not ready: %s", reason)
+        return self.ready
+
+    def _check_sync(self, mode: str):
+        with database.engine.begin() as connection:
+            return _check(connection, mode, self._expected)
+
+    def stop(self):
+        """Report not ready from now on, while the worker drains."""
+        self.ready, self.reason, self.stopping = False, "Shutting down", True
+
+    def status(self) -> dict:
+        if self.ready:
+            return {"status": "ready"}
+        return {"status": "not ready", "reason": self.reason}
+
+
+readiness = Readiness()
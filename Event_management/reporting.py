@@ -0,0 +1,239 @@
+"""
+Event analytics served from rollup tables.
+
+Two tables are kept in step by the write paths, in the writer's transaction:
+
+    event_daily_stats   registrations and check-ins per (event, day)
+    event_group_stats   events, capacity, registered and checked in per
+                        (location, status), spread over `SHARDS` rows
+
+`capacity.reserve_seats` and `occupancy.record_check_ins`, which every
+registration and check-in path already goes through, count into both (their
+counter UPDATEs return the event's group, so no extra read is needed);
+`create_event` and `update_event` add an event to its group and move its
+totals when its location, status or capacity changes. Reports then read a
+handful of rollup rows (and the event row) instead of scanning attendees.
+
+Daily rows start when the tables are created: attendees carry no
+registration time, so earlier history cannot be recovered. Group totals can
+be recomputed from the events table at any time with `rebuild`
+(`python -m reporting --rebuild`), e.g. after loading data around the API.
+"""
+import functools
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import String, bindparam, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Event, EventDailyStats, EventGroupStats, EventStatus
+
+# Rows per (location, status) group; writers to different events of a group
+# mostly update different rows
+SHARDS = 8
+# Longest timeline served by `timeline`
+MAX_TIMELINE_DAYS = 366
+GROUP_COLUMNS = ("location", "status")
+
+
+@functools.lru_cache(maxsize=None)
+def _upsert(dialect: str, table, keys: tuple, counters: tuple):
+    """INSERT ... ON CONFLICT DO UPDATE adding to `counters`, built once per shape; None where unsupported."""
+    if dialect not in ("sqlite", "postgresql"):
+        return None
+    stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(
+        {name: bindparam(name) for name in keys + counters}
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: table.c[name] + stmt.excluded[name] for name in counters},
+    )
+
+
+def _increment(db: Session, model, keys: dict, **deltas):
+    """Add `deltas` to the counters of the row at `keys`, creating it if needed."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = model.__table__
+    stmt = _upsert(db.get_bind().dialect.name, table, tuple(keys), tuple(deltas))
+    if stmt is not None:
+        db.execute(stmt, {**keys, **deltas})
+        return
+    # Other databases: update, and insert the row the first time
+    result = db.execute(
+        update(table)
+        .where(*(table.c[name] == value for name, value in keys.items()))
+        .values({name: table.c[name] + delta for name, delta in deltas.items()})
+    )
+    if result.rowcount == 0:
+        db.execute(insert(table).values(**keys, **deltas))
+
+
+def _group_keys(event_id: int, location, status) -> dict:
+    return {
+        "location": location or "",
+        "status": getattr(status, "value", status) or "",
+        "shard": event_id % SHARDS,
+    }
+
+
+def _event_group(db: Session, event_id: int, group=None) -> dict:
+    """Group keys of the event from its `(location, status)`, read from the events table if not given."""
+    if group is None:
+        group = db.execute(select(Event.location, Event.status).where(Event.event_id == event_id)).one()
+    return _group_keys(event_id, *group)
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def record_registrations(db: Session, event_id: int, count: int, group=None):
+    """
+    Count `count` new registrations of the event, in the caller's transaction.
+
+    `group` is the event's `(location, status)` when the caller already has it.
+    """
+    if count:
+        _increment(db, EventDailyStats, {"event_id": event_id, "day": _today()}, registrations=count)
+        _increment(db, EventGroupStats, _event_group(db, event_id, group), registered=count)
+
+
+def record_check_ins(db: Session, event_id: int, count: int, group=None):
+    """Count `count` new check-ins at the event, in the caller's transaction (`group` as above)."""
+    if count:
+        _increment(db, EventDailyStats, {"event_id": event_id, "day": _today()}, check_ins=count)
+        _increment(db, EventGroupStats, _event_group(db, event_id, group), checked_in=count)
+
+
+def record_event_created(db: Session, event: Event):
+    """Add a new (flushed) event to its group."""
+    _increment(db, EventGroupStats, _group_keys(event.event_id, event.location, event.status),
+               events=1, capacity=event.max_attendees)
+
+
+def record_event_updated(db: Session, event_id: int, before: dict):
+    """
+    Move an event's totals after an update has been flushed.
+
+    `before` holds the event's previous location, status and max_attendees.
+    The flushed row stays locked until commit, so its counters cannot move
+    while they are transferred.
+    """
+    location, status, capacity, registered, checked_in = db.execute(
+        select(Event.location, Event.status, Event.max_attendees, Event.registered_count, Event.checked_in_count)
+        .where(Event.event_id == event_id)
+    ).one()
+    old = _group_keys(event_id, before["location"], before["status"])
+    new = _group_keys(event_id, location, status)
+    if old == new:
+        _increment(db, EventGroupStats, new, capacity=capacity - before["max_attendees"])
+        return
+    _increment(db, EventGroupStats, old, events=-1, capacity=-before["max_attendees"],
+               registered=-registered, checked_in=-checked_in)
+    _increment(db, EventGroupStats, new, events=1, capacity=capacity, registered=registered, checked_in=checked_in)
+
+
+def rebuild(db: Session):
+    """Recompute the group totals from the events table (daily rows are left as they are)."""
+    location = func.coalesce(Event.location, "")
+    status = func.coalesce(cast(Event.status, String), "")
+    shard = Event.event_id % SHARDS
+    db.execute(delete(EventGroupStats))
+    db.execute(insert(EventGroupStats).from_select(
+        ["location", "status", "shard", "events", "capacity", "registered", "checked_in"],
+        select(location, status, shard, func.count(), func.sum(Event.max_attendees),
+               func.sum(Event.registered_count), func.sum(Event.checked_in_count))
+        .group_by(location, status, shard),
+    ))
+
+
+def _rates(capacity: int, registered: int, checked_in: int, ended: bool) -> dict:
+    check_in_rate = round(checked_in / registered, 4) if registered else None
+    return {
+        "utilization": round(registered / capacity, 4) if capacity else None,
+        "check_in_rate": check_in_rate,
+        # Only once the event is over is everyone not checked in a no-show
+        "no_show_rate": round(1 - check_in_rate, 4) if ended and check_in_rate is not None else None,
+    }
+
+
+def event_report(db: Session, event_id: int):
+    """Occupancy, rates and daily activity of one event, or None if it does not exist."""
+    row = db.execute(
+        select(Event.max_attendees, Event.registered_count, Event.checked_in_count, Event.status, Event.end_time)
+        .where(Event.event_id == event_id)
+    ).first()
+    if row is None:
+        return None
+    capacity, registered, checked_in, status, end_time = row
+    ended = status == EventStatus.completed or (status != EventStatus.canceled and end_time <= datetime.utcnow())
+    days = db.execute(
+        select(EventDailyStats.day, EventDailyStats.registrations, EventDailyStats.check_ins)
+        .where(EventDailyStats.event_id == event_id)
+        .order_by(EventDailyStats.day)
+    ).all()
+    return {
+        "event_id": event_id,
+        "status": status,
+        "capacity": capacity,
+        "registered": registered,
+        "checked_in": checked_in,
+        **_rates(capacity, registered, checked_in, ended),
+        "daily": [{"day": day, "registrations": regs, "check_ins": check_ins} for day, regs, check_ins in days],
+    }
+
+
+def group_report(db: Session, group_by: list, location: str = None, status: str = None) -> list:
+    """
+    Totals and rates per group of events, grouped by any of `GROUP_COLUMNS`.
+
+    No-show rates are given for groups made only of completed events.
+    """
+    keys = [EventGroupStats.__table__.c[name] for name in GROUP_COLUMNS if name in group_by]
+    totals = [func.sum(EventGroupStats.__table__.c[name]).label(name)
+              for name in ("events", "capacity", "registered", "checked_in")]
+    query = select(*keys, *totals).group_by(*keys).having(func.sum(EventGroupStats.events) > 0).order_by(*keys)
+    if location is not None:
+        query = query.where(EventGroupStats.location == location)
+    if status is not None:
+        query = query.where(EventGroupStats.status == status)
+
+    report = []
+    for row in db.execute(query).mappings():
+        ended = row.get("status", status) == EventStatus.completed.value
+        report.append({**row, **_rates(row["capacity"], row["registered"], row["checked_in"], ended)})
+    return report
+
+
+def timeline(db: Session, start: date, end: date, event_id: int = None) -> list:
+    """Registrations and check-ins per day from `start` to `end` (inclusive), optionally for one event."""
+    if end < start:
+        raise ValueError("'to' must not be before 'from'")
+    if end - start >= timedelta(days=MAX_TIMELINE_DAYS):
+        raise ValueError(f"Timelines cover at most {MAX_TIMELINE_DAYS} days")
+    query = (
+        select(EventDailyStats.day, func.sum(EventDailyStats.registrations), func.sum(EventDailyStats.check_ins))
+        .where(EventDailyStats.day >= start, EventDailyStats.day <= end)
+        .group_by(EventDailyStats.day)
+        .order_by(EventDailyStats.day)
+    )
+    if event_id is not None:
+        query = query.where(EventDailyStats.event_id == event_id)
+    return [{"day": day, "registrations": regs, "check_ins": check_ins} for day, regs, check_ins in db.execute(query)]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the reporting rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the group totals from the events table")
+    args = parser.parse_args()
+    if args.rebuild:
+        with SessionLocal() as db:
+            rebuild(db)
+            db.commit()
+        print("Group totals rebuilt")
@@ -1,30 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, UploadFile, File
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import pandas as pd
-import io
-import csv
-from io import StringIO
-from typing import List
-
-from database import get_db, SessionLocal
-from models import Attendee, Event
-from schemas import AttendeeCreate, AttendeeResponse
+from typing import List, Optional
+
+import checkin_buffer
+import config
+import event_cache
+import idempotency
+import jobs
+import search
+from database import get_session, run_db, SessionLocal
+from models import Attendee, Event, JobStatus
+from schemas import AttendeeCreate, AttendeeResponse, ExportFormat
 from auth import token_required
+from capacity import reserve_seats, seats_remaining
+from occupancy import broker, record_check_ins
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, parse_fields
+from serialization import FastJSONResponse, rows_as_dicts
+from export import MEDIA_TYPES, aiter_export, iter_export
+from bulk import (ALREADY_REGISTERED, ATTENDEE_HEADERS, CHECK_IN_HEADERS, check_in_batch, check_in_emails, import_attendees,
+                  iter_csv_rows, register_batch)
 
 
 router = APIRouter()
 
 @router.post("/", response_model=AttendeeResponse)
-def register_attendee(attendee: AttendeeCreate, db: Session = Depends(get_db), user: dict = Depends(token_required)):
-    try:
-        # Check if the event exists
-        event = db.query(Event).filter(Event.event_id == attendee.event_id).first()
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
+async def register_attendee(attendee: AttendeeCreate, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    return await run_db(db, _register_attendee, attendee)
 
-        # Check if the event is fully booked
-        attendee_count = db.query(Attendee).filter(Attendee.event_id == attendee.event_id).count()
-        if attendee_count >= event.max_attendees:
+
+def _register_attendee(db: Session, attendee: AttendeeCreate):
+    try:
+        # Claim a seat; fails if the event is full or does not exist
+        if not reserve_seats(db, attendee.event_id):
+            if not event_cache.get_event(db, attendee.event_id):
+                raise HTTPException(status_code=404, detail="Event not found")
             raise HTTPException(status_code=400, detail="Event is fully booked")
 
         # Register the new attendee
@@ -32,8 +45,15 @@ def register_attendee(attendee: AttendeeCreate, db: Session = Depends(get_db), u
         db.add(new_attendee)
         db.commit()
         db.refresh(new_attendee)
+        broker.publish(attendee.event_id, registered=1)
 
         return new_attendee
+    except HTTPException:
+        raise
+    except IntegrityError:
+        # A concurrent registration of the same email won the unique constraint
+        db.rollback()
+        raise HTTPException(status_code=409, detail=ALREADY_REGISTERED)
     except ValueError as ve:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Invalid data: {str(ve)}")
@@ -44,19 +64,52 @@ def register_attendee(attendee: AttendeeCreate, db: Session = Depends(get_db), u
 
 
 @router.put("/{attendee_id}/checkin", response_model=AttendeeResponse)
-def check_in_attendee(attendee_id: int, db: Session = Depends(get_db), user: dict = Depends(token_required)):
+async def check_in_attendee(attendee_id: int, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    buffer = checkin_buffer.active()
+    if buffer is None:
+        return await run_db(db, _check_in_attendee, attendee_id)
+
+    # Write-behind: acknowledged once logged, applied by the next flush
+    attendee = await run_db(db, _get_detached_attendee, attendee_id)
+    if not attendee.check_in_status:
+        try:
+            await run_in_threadpool(buffer.submit, attendee_id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+        attendee.check_in_status = True
+    return attendee
+
+
+def _get_detached_attendee(db: Session, attendee_id: int):
+    attendee = db.get(Attendee, attendee_id)
+    if not attendee:
+        raise HTTPException(status_code=404, detail="Attendee not found")
+    db.expunge(attendee)
+    return attendee
+
+
+def _check_in_attendee(db: Session, attendee_id: int):
     try:
         # Check if the attendee exists
         attendee = db.query(Attendee).filter(Attendee.attendee_id == attendee_id).first()
         if not attendee:
             raise HTTPException(status_code=404, detail="Attendee not found")
 
-        # Update check-in status
-        attendee.check_in_status = True
+        # Flip the status only if still unset, so the event counter moves exactly once
+        checked_in = db.execute(
+            update(Attendee)
+            .where(Attendee.attendee_id == attendee_id, Attendee.check_in_status.isnot(True))
+            .values(check_in_status=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        record_check_ins(db, attendee.event_id, checked_in)
         db.commit()
         db.refresh(attendee)
+        broker.publish(attendee.event_id, checked_in=checked_in)
 
         return attendee
+    except HTTPException:
+        raise
     except ValueError as ve:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Invalid data: {str(ve)}")
@@ -66,169 +119,395 @@ def check_in_attendee(attendee_id: int, db: Session = Depends(get_db), user: dic
 
 
 
-@router.get("/attendees", response_model=List[dict])
-async def get_attendees(event_id: int, db: Session = Depends(get_db), user: dict = Depends(token_required)):
+def _check_batch_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {config.BATCH_MAX_ITEMS} items")
+
+
+@router.post("/batch")
+async def register_attendees_batch(attendees: List[AttendeeCreate], db: Session = Depends(get_session),
+                                   user: dict = Depends(token_required)):
+    """
+    Register many attendees in one transaction.
+
+    Each event's seats are reserved once for the whole batch. Items that
+    cannot be registered (unknown event, duplicate email, event full) are
+    rejected individually; `results` has one entry per item, in order.
+    """
+    _check_batch_size(attendees)
+    return await run_db(db, _register_attendees_batch, attendees)
+
+
+def _register_attendees_batch(db: Session, attendees: List[AttendeeCreate]):
+    try:
+        results = register_batch(db, [attendee.dict() for attendee in attendees])
+        db.commit()
+
+        created = [attendees[r["index"]].event_id for r in results if r["status"] == "created"]
+        for event_id in set(created):
+            broker.publish(event_id, registered=created.count(event_id))
+
+        return {"created": len(created), "rejected": len(results) - len(created), "results": results}
+    except HTTPException:
+        raise
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"{ALREADY_REGISTERED}; retry the batch")
+    except ValueError as ve:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid data: {str(ve)}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.put("/checkin/batch")
+async def check_in_attendees_batch(attendee_ids: List[int], db: Session = Depends(get_session),
+                                   user: dict = Depends(token_required)):
     """
-    Fetch all attendees based on event_id.
+    Check in many attendees by id in one transaction.
+
+    `results` gives each id's status: `checked_in`, `already_checked_in`
+    or `not_found`.
     """
+    _check_batch_size(attendee_ids)
+    return await run_db(db, _check_in_attendees_batch, attendee_ids)
+
+
+def _check_in_attendees_batch(db: Session, attendee_ids: List[int]):
     try:
-        # Query attendees for the given event ID
-        attendees = db.query(Attendee).filter(Attendee.event_id == event_id).all()
+        results, checked_in = check_in_batch(db, attendee_ids)
+        db.commit()
+        for event_id, count in checked_in.items():
+            broker.publish(event_id, checked_in=count)
+
+        totals = dict.fromkeys(["checked_in", "already_checked_in", "not_found"], 0)
+        for result in results:
+            totals[result["status"]] += 1
+        return {**totals, "results": results}
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid data: {str(ve)}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
 
-        if not attendees:
+# Response keys selectable through `fields=` on get_attendees
+ATTENDEE_FIELDS = {
+    "attendee_id": Attendee.attendee_id,
+    "first_name": Attendee.first_name,
+    "last_name": Attendee.last_name,
+    "email": Attendee.email,
+    "phone": Attendee.phone_number,
+    "event_id": Attendee.event_id,
+    "check_in_status": Attendee.check_in_status,
+}
+
+
+@router.get("/attendees", response_model=List[dict])
+async def get_attendees(response: Response, event_id: int, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        cursor: str = None, fields: str = None, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """
+    Fetch attendees based on event_id, one page at a time.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page. `fields` (comma-separated) limits the keys returned.
+    """
+    attendees, next_cursor = await run_db(db, _get_attendees, event_id, limit, cursor, fields)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if config.FAST_JSON:
+        return FastJSONResponse(attendees, headers=headers)
+    response.headers.update(headers)
+    return attendees
+
+
+def _get_attendees(db: Session, event_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, fields: str = None):
+    try:
+        selected = parse_fields(fields, ATTENDEE_FIELDS)
+        # Select only the requested columns (plus the sort key), without ORM objects
+        columns = dict.fromkeys(selected + ["attendee_id"])
+        query = select(*(ATTENDEE_FIELDS[name].label(name) for name in columns)).where(Attendee.event_id == event_id)
+        if cursor:
+            (after_id,) = decode_cursor(cursor, 1)
+            query = query.where(Attendee.attendee_id > int(after_id))
+
+        # One extra row tells us whether another page exists
+        rows = db.execute(query.order_by(Attendee.attendee_id).limit(limit + 1)).all()
+
+        if not rows and not cursor:
             raise HTTPException(status_code=404, detail="No attendees found for this event")
 
-        # Convert attendees to a list of dictionaries
-        attendees_list = [
-            {
-                "attendee_id": a.attendee_id,
-                "first_name": a.first_name,
-                "last_name": a.last_name,
-                "email": a.email,
-                "phone": a.phone_number,
-                "event_id": a.event_id,
-                "check_in_status": a.check_in_status  # Assuming this field exists
-            }
-            for a in attendees
-        ]
-
-        return attendees_list  # Return the final list
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].attendee_id)
 
+        # Selected columns come first in each row
+        return rows_as_dicts(rows, selected), next_cursor
+
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(ve)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.get("/search", response_model=List[dict])
+async def search_attendees(response: Response, q: str = Query(..., min_length=search.MIN_TERM_LENGTH, max_length=200),
+                           event_id: int = None,
+                           limit: int = Query(search.SEARCH_PAGE_SIZE, ge=1, le=search.MAX_SEARCH_PAGE_SIZE),
+                           cursor: str = None, fields: str = None, db: Session = Depends(get_session),
+                           user: dict = Depends(token_required)):
+    """
+    Search attendees by name, email or phone number, best match first.
+
+    Every word of `q` must match the start of a word in one of those fields
+    (`jo`, `smith`, `john.sm`, `555`); `event_id` restricts the search to one
+    event. Paginated with `X-Next-Cursor` like `get_attendees`.
+    """
+    attendees, next_cursor = await run_db(db, _search_attendees, q, event_id, limit, cursor, fields)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if config.FAST_JSON:
+        return FastJSONResponse(attendees, headers=headers)
+    response.headers.update(headers)
+    return attendees
+
+
+def _search_attendees(db: Session, q: str, event_id: int = None, limit: int = search.SEARCH_PAGE_SIZE,
+                      cursor: str = None, fields: str = None):
+    try:
+        return search.search_page(db, search.search_attendees, q, fields, ATTENDEE_FIELDS, limit, cursor,
+                                  event_id=event_id)
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Invalid input: {str(ve)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+@router.get("/attendee/{event_id}/export")
+async def export_attendees(event_id: int, format: ExportFormat = ExportFormat.csv, gzip: bool = False,
+                           db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """
+    Stream every attendee of an event as CSV or NDJSON.
+
+    Rows are streamed as they are read from the database, so memory stays
+    flat for any event size. `gzip=true` compresses the stream
+    (`Content-Encoding: gzip`).
+    """
+    if not await run_db(db, _event_exists, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    fmt = format.value
+    if isinstance(db, Session):
+        body = iter_export(db.get_bind(), event_id, fmt, gzip)
+    else:
+        body = aiter_export(db.bind, event_id, fmt, gzip)
+
+    headers = {"Content-Disposition": f'attachment; filename="event_{event_id}_attendees.{fmt}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+def _registered_count(db: Session, event_id: int):
+    return db.scalar(select(Event.registered_count).where(Event.event_id == event_id))
+
+
+def _event_exists(db: Session, event_id: int) -> bool:
+    return event_cache.get_event(db, event_id) is not None
 
 
 @router.post("/attendee/{event_id}/bulk-upload")
-def bulk_upload_attendees(event_id: int, file: UploadFile = File(...), db: Session = Depends(get_db), user: dict = Depends(token_required)):
+async def bulk_upload_attendees(event_id: int, background: bool = False, force: bool = False,
+                                file: UploadFile = File(...), idempotency_key: Optional[str] = Header(None),
+                                db: Session = Depends(get_session), user: dict = Depends(token_required)):
     """
     Bulk upload attendees for a given event from a CSV file.
+
+    The file is parsed as a stream and written in chunks; rows that are not
+    imported are reported back with a reason. With `background=true` the
+    file is queued as a job instead and the response is `202` with the job
+    to poll at `/jobs/{job_id}`. Re-sending a file that was already imported
+    into this event, at its current capacity, returns the earlier report or
+    job, marked `X-Duplicate-Upload: true`, without reading the file again;
+    `force=true` or an `Idempotency-Key` imports it again.
+    """
+    digest, earlier = await _earlier_upload(db, jobs.ATTENDEE_IMPORT, event_id, file,
+                                            force or idempotency_key is not None)
+    if earlier is not None:
+        return earlier
+    if background:
+        return await _enqueue_upload(db, jobs.ATTENDEE_IMPORT, event_id, file, ATTENDEE_HEADERS, user, digest)
+    report = await run_db(db, _bulk_upload_attendees, event_id, file.file)
+    await run_in_threadpool(idempotency.remember_upload, jobs.ATTENDEE_IMPORT, event_id, digest, {"report": report})
+    return report
+
+
+async def _earlier_upload(db: Session, kind: str, event_id: int, file: UploadFile, force: bool):
+    """
+    Hash an upload and, unless `force`, look for a successful earlier upload of the same file.
+
+    Imports are keyed by the event's capacity as well, since a raised limit
+    admits rows that were turned away, and check-ins by its registrations,
+    since attendees who registered since can now be checked in. Returns the
+    digest and, for a duplicate, the earlier response: its report, or its job
+    unless that job failed or was canceled.
     """
+    digest = await run_in_threadpool(idempotency.file_digest, file.file)
+    if kind == jobs.ATTENDEE_IMPORT:
+        event = await run_db(db, event_cache.get_event, event_id)
+        digest = f"{digest}:{event['max_attendees'] if event else None}"
+    else:
+        digest = f"{digest}:{await run_db(db, _registered_count, event_id)}"
+    if force:
+        return digest, None
+    earlier = await run_in_threadpool(idempotency.recent_upload, kind, event_id, digest)
+    if earlier is None:
+        return digest, None
+    headers = {idempotency.DUPLICATE_UPLOAD_HEADER: "true"}
+    if "job_id" not in earlier:
+        return digest, JSONResponse(earlier["report"], headers=headers)
+    job = await run_db(db, jobs.get_job, earlier["job_id"])
+    if job is None or job["status"] in (JobStatus.failed.value, JobStatus.canceled.value):
+        return digest, None
+    return digest, _job_accepted(job, headers)
+
+
+def _job_accepted(job: dict, headers: dict = None):
+    return JSONResponse(
+        {"job_id": job["job_id"], "status": job["status"], "rows_total": job["rows_total"],
+         "status_url": f"/jobs/{job['job_id']}"},
+        status_code=202,
+        headers=headers,
+    )
+
+
+async def _enqueue_upload(db: Session, kind: str, event_id: int, file: UploadFile, expected_headers, user: dict,
+                          digest: str):
+    if not await run_db(db, event_cache.get_event, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
     try:
-        # Check if the event exists
-        event = db.query(Event).filter(Event.event_id == event_id).first()
-        if not event:
+        headers = await run_in_threadpool(jobs.read_header, file.file)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid file encoding. Please upload a UTF-8 encoded CSV file.")
+    if headers != expected_headers:
+        raise HTTPException(status_code=400, detail="Invalid CSV format")
+
+    # The upload's temporary file goes away with the request; keep a copy for the workers
+    spool_path, rows_total = await run_in_threadpool(jobs.spool_upload, file.file)
+    job = await run_db(db, jobs.enqueue, kind, event_id, spool_path, rows_total, user.get("sub"))
+    await run_in_threadpool(idempotency.remember_upload, kind, event_id, digest, {"job_id": job["job_id"]})
+    return _job_accepted(job)
+
+
+def _bulk_upload_attendees(db: Session, event_id: int, fileobj):
+    try:
+        # Check if the event exists and has seats left before reading the file
+        remaining = seats_remaining(db, event_id)
+        if remaining is None:
             raise HTTPException(status_code=404, detail="Event not found")
-        
-        # Check max attendees constraint
-        existing_attendees = db.query(Attendee).filter(Attendee.event_id == event_id).count()
-        if existing_attendees >= event.max_attendees:
+        if remaining <= 0:
             raise HTTPException(status_code=400, detail="Max attendees limit reached")
-        
-        # Read and parse CSV file
-        contents = file.file.read().decode("utf-8")
-        file.file.seek(0)
-        csv_reader = csv.reader(StringIO(contents))
-        
+
+        # Stream and parse the CSV file
+        csv_reader = iter_csv_rows(fileobj)
         headers = next(csv_reader, None)  # Read the header row
-        expected_headers = ["first_name", "last_name", "email", "phone_number", "event_id"]
-        
-        if not headers or headers != expected_headers:
+
+        if not headers or headers != ATTENDEE_HEADERS:
             raise HTTPException(status_code=400, detail="Invalid CSV format")
-        
-        attendees_to_add = []
-        added_emails = set()  # Track added emails to avoid duplicates
-
-        for row in csv_reader:
-            try:
-                # Unpack row values
-                first_name, last_name, email, phone_number, event_id_csv = row
-
-                # Ensure event_id in CSV matches the provided event_id
-                if int(event_id_csv) != event_id:
-                    continue  # Skip mismatched event_id
-                
-                # Skip duplicate attendees (already in DB or within current batch)
-                if db.query(Attendee).filter(Attendee.email == email, Attendee.event_id == event_id).first() or email in added_emails:
-                    continue
-                
-                # Stop adding attendees if the max limit is reached
-                if existing_attendees + len(attendees_to_add) >= event.max_attendees:
-                    break
-
-                # Add valid attendee to the list
-                attendees_to_add.append(Attendee(
-                    first_name=first_name,
-                    last_name=last_name,
-                    email=email,
-                    phone_number=phone_number,
-                    event_id=event_id
-                ))
-                added_emails.add(email)
-
-            except ValueError:
-                continue  # Skip invalid rows
-
-        # Insert attendees into the database
-        if attendees_to_add:
-            db.add_all(attendees_to_add)
-            db.commit()
-
-        return {"message": f"Successfully added {len(attendees_to_add)} attendees"}
 
+        report = import_attendees(db, event_id, csv_reader)
+        # Seats can run out while the file is read: the reservations turn the rest away
+        if not report["added"] and report["fully_booked_count"]:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Max attendees limit reached")
+        db.commit()
+        broker.publish(event_id, registered=report["added"])
+
+        return {"message": f"Successfully added {report['added']} attendees", **report}
+
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Invalid file encoding. Please upload a UTF-8 encoded CSV file.")
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
 @router.post("/attendee/{event_id}/bulk-check-in")
-def bulk_check_in_attendees(event_id: int, file: UploadFile = File(...), db: Session = Depends(get_db), user: dict = Depends(token_required)):
+async def bulk_check_in_attendees(event_id: int, misses_csv: bool = False, background: bool = False,
+                                  force: bool = False, file: UploadFile = File(...),
+                                  idempotency_key: Optional[str] = Header(None), db: Session = Depends(get_session),
+                                  user: dict = Depends(token_required)):
     """
     Bulk check-in attendees for a given event using a CSV file containing emails.
+
+    Returns counts of checked-in, already checked-in and unknown emails. With
+    `misses_csv=true` the response is instead a CSV download of every email
+    that was not checked in, with the reason. `background=true` queues the
+    file as a job, as for bulk uploads (counts only, no misses CSV). Duplicate
+    files are answered from the earlier upload, and `force=true` or an
+    `Idempotency-Key` processes them again, as for bulk uploads.
     """
+    if misses_csv and not background:
+        # Streamed per request; not kept for duplicates
+        return await run_db(db, _bulk_check_in_attendees, event_id, file.file, misses_csv)
+    digest, earlier = await _earlier_upload(db, jobs.CHECK_IN, event_id, file, force or idempotency_key is not None)
+    if earlier is not None:
+        return earlier
+    if background:
+        return await _enqueue_upload(db, jobs.CHECK_IN, event_id, file, CHECK_IN_HEADERS, user, digest)
+    report = await run_db(db, _bulk_check_in_attendees, event_id, file.file, misses_csv)
+    await run_in_threadpool(idempotency.remember_upload, jobs.CHECK_IN, event_id, digest, {"report": report})
+    return report
+
+
+def _bulk_check_in_attendees(db: Session, event_id: int, fileobj, misses_csv: bool):
     try:
         # Check if event exists
-        event = db.query(Event).filter(Event.event_id == event_id).first()
-        if not event:
+        if not event_cache.get_event(db, event_id):
             raise HTTPException(status_code=404, detail="Event not found")
 
-        # Read and parse CSV
-        contents = file.file.read().decode("utf-8")
-        file.file.seek(0)
-        csv_reader = csv.reader(StringIO(contents))
+        # Stream and parse the CSV file
+        csv_reader = iter_csv_rows(fileobj)
 
         # Validate headers
         headers = next(csv_reader, None)  # Read the header row
-        expected_headers = ["email"]
 
-        if not headers or headers != expected_headers:
+        if not headers or headers != CHECK_IN_HEADERS:
             raise HTTPException(status_code=400, detail="Invalid CSV format. Expected headers: 'email'")
 
-        updated_count = 0
-        processed_emails = set()  # Track processed emails to avoid duplicates in the same batch
-
-        # Batch update attendees
-        for row in csv_reader:
-            try:
-                email = row[0].strip().lower()  # Normalize email input
-
-                # Skip duplicate emails within the batch
-                if email in processed_emails:
-                    continue
-
-                attendee = db.query(Attendee).filter(
-                    Attendee.email == email, Attendee.event_id == event_id
-                ).first()
-
-                if attendee and not attendee.check_in_status:
-                    attendee.check_in_status = True
-                    updated_count += 1
-                    processed_emails.add(email)  # Mark as processed
-
-            except IndexError:
-                continue  
+        report = check_in_emails(db, event_id, csv_reader, record_misses=misses_csv)
+        db.commit()
+        broker.publish(event_id, checked_in=report.checked_in)
 
-        # Commit changes only if updates were made
-        if updated_count > 0:
-            db.commit()
+        if misses_csv:
+            return StreamingResponse(
+                _iter_and_close(report.misses),
+                media_type="text/csv",
+                headers={"Content-Disposition": f'attachment; filename="event_{event_id}_check_in_misses.csv"'},
+            )
 
-        return {"message": f"Successfully checked in {updated_count} attendees"}
+        return {"message": f"Successfully checked in {report.checked_in} attendees", **report.as_dict()}
 
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Invalid file encoding. Please upload a UTF-8 encoded CSV file.")
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+def _iter_and_close(fileobj):
+    with fileobj:
+        yield from fileobj
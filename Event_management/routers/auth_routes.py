@@ -1,35 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
-from database import get_db
+import event_cache
+from database import get_session, run_db
 from models import User
 from schemas import UserCreate, Token
-from auth import hash_password, verify_password, create_access_token
+from auth import (
+    create_access_token, auth_cache_stats, hash_password_async, login_slot,
+    token_required, verify_and_update_password,
+)
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserCreate)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = hash_password(user.password)
-    new_user = User(email=user.email, password=hashed_password)
+def _get_user(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def _create_user(db: Session, email: str, hashed_password: str):
+    new_user = User(email=email, password=hashed_password)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
     return new_user
 
+
+def _update_password(db: Session, user_id: int, hashed_password: str):
+    db.query(User).filter(User.user_id == user_id).update({"password": hashed_password})
+    db.commit()
+
+
+@router.post("/register", response_model=UserCreate)
+async def register(user: UserCreate, db: Session = Depends(get_session)):
+    existing_user = await run_db(db, _get_user, user.email)
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    # bcrypt is CPU bound, keep it on the hashing pool
+    hashed_password = await hash_password_async(user.password)
+    return await run_db(db, _create_user, user.email, hashed_password)
+
 @router.post("/token", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
+    with login_slot(form_data.username):
+        user = await run_db(db, _get_user, form_data.username)
+        valid, new_hash = (False, None)
+        if user:
+            valid, new_hash = await verify_and_update_password(form_data.password, user.password)
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect email or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        # The bcrypt cost changed since this hash was made; upgrade it transparently
+        if new_hash:
+            await run_db(db, _update_password, user.user_id, new_hash)
 
     access_token = create_access_token(data={"sub": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/cache-stats")
+def cache_stats(user: dict = Depends(token_required)):
+    """Hit/miss counters of the token, user and event caches, for sizing them."""
+    return {**auth_cache_stats(), "events": event_cache.stats()}
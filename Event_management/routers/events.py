@@ -1,23 +1,59 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
 
-from database import get_db, SessionLocal
+import config
+import event_cache
+import intervals
+import occupancy
+import reporting
+import search
+from database import get_session, run_db, SessionLocal
 from models import Event, EventStatus
 from schemas import EventCreate, EventUpdate, EventResponse
 from auth import token_required
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, parse_fields
+from serialization import FastJSONResponse, rows_as_dicts
 
 router = APIRouter()
 
+# Lists the ids of other events booked at the same location for an overlapping time
+VENUE_CONFLICTS_HEADER = "X-Venue-Conflicts"
+
+
 @router.post("/", response_model=EventResponse)
-def create_event(event: EventCreate, db: Session = Depends(get_db), user: dict = Depends(token_required) ):
+async def create_event(event: EventCreate, response: Response, reject_overlap: bool = False,
+                       db: Session = Depends(get_session), user: dict = Depends(token_required) ):
+    """
+    Create an event.
+
+    Other events at the same location with overlapping times are listed in
+    the `X-Venue-Conflicts` header; with `reject_overlap=true` the event is
+    not created and the response is `409` with the conflicting events.
+    """
+    new_event, conflicts = await run_db(db, _create_event, event, reject_overlap)
+    _report_conflicts(response, conflicts)
+    return new_event
+
+
+def _create_event(db: Session, event: EventCreate, reject_overlap: bool = False):
     try:
+        intervals.validate_times(event.start_time, event.end_time)
+        conflicts = _check_venue(db, event.location, event.start_time, event.end_time, reject_overlap)
+
         new_event = Event(**event.dict())
         db.add(new_event)
+        db.flush()
+        reporting.record_event_created(db, new_event)
         db.commit()
         db.refresh(new_event)
-        return new_event
+        event_cache.invalidate_event(new_event.event_id, event_cache.snapshot(new_event))
+        return new_event, conflicts
+    except HTTPException:
+        raise
     except ValueError as ve:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Invalid data: {str(ve)}")
@@ -26,19 +62,60 @@ def create_event(event: EventCreate, db: Session = Depends(get_db), user: dict =
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+def _check_venue(db: Session, location: str, start_time: datetime, end_time: datetime, reject_overlap: bool,
+                 exclude_event_id: int = None) -> list:
+    conflicts = intervals.find_conflicts(db, location, start_time, end_time, exclude_event_id)
+    if conflicts and reject_overlap:
+        raise HTTPException(status_code=409, detail={
+            "message": "Location is already booked for an overlapping time",
+            "conflicts": conflicts,
+        })
+    return conflicts
+
+
+def _report_conflicts(response: Response, conflicts: list):
+    if conflicts:
+        response.headers[VENUE_CONFLICTS_HEADER] = ",".join(str(c["event_id"]) for c in conflicts)
+
+
 @router.put("/{event_id}", response_model=EventResponse)
-def update_event(event_id: int, event_update: EventUpdate, db: Session = Depends(get_db), user: dict = Depends(token_required)):
+async def update_event(event_id: int, event_update: EventUpdate, response: Response, reject_overlap: bool = False,
+                       db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """Update an event; overlaps at its location are reported as for `create_event`."""
+    event, conflicts = await run_db(db, _update_event, event_id, event_update, reject_overlap)
+    _report_conflicts(response, conflicts)
+    return event
+
+
+def _update_event(db: Session, event_id: int, event_update: EventUpdate, reject_overlap: bool = False):
     try:
-        event = db.query(Event).filter(Event.event_id == event_id).first()
+        # Locked until commit, so `before` is still current when the reporting totals move
+        event = db.query(Event).filter(Event.event_id == event_id).with_for_update().first()
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
-        
-        for key, value in event_update.dict(exclude_unset=True).items():
+
+        before = event_cache.snapshot(event)
+        changes = event_update.dict(exclude_unset=True)
+        for key, value in changes.items():
             setattr(event, key, value)
 
+        if changes.keys() & {"start_time", "end_time"}:
+            intervals.validate_times(event.start_time, event.end_time)
+        # Only a move in time or place (or un-canceling) can create a new overlap
+        conflicts = []
+        if changes.keys() & {"location", "start_time", "end_time", "status"} and event.status != EventStatus.canceled:
+            conflicts = _check_venue(db, event.location, event.start_time, event.end_time, reject_overlap, event_id)
+
+        if changes.keys() & {"location", "status", "max_attendees"}:
+            db.flush()
+            reporting.record_event_updated(db, event_id, before)
         db.commit()
         db.refresh(event)
-        return event
+        # Listings of the old and the new status/location are both affected
+        event_cache.invalidate_event(event_id, before, event_cache.snapshot(event))
+        return event, conflicts
+    except HTTPException:
+        raise
     except ValueError as ve:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Invalid data: {str(ve)}")
@@ -47,22 +124,162 @@ def update_event(event_id: int, event_update: EventUpdate, db: Session = Depends
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+# Columns selectable through `fields=` on list_events, in EventResponse order
+EVENT_FIELDS = {
+    "name": Event.name,
+    "description": Event.description,
+    "start_time": Event.start_time,
+    "end_time": Event.end_time,
+    "location": Event.location,
+    "max_attendees": Event.max_attendees,
+    "event_id": Event.event_id,
+    "status": Event.status,
+}
+
+
 @router.get("/", response_model=list[EventResponse])
-def list_events(status: EventStatus = None, location: str = None, db: Session = Depends(get_db), user: dict = Depends(token_required)):
+async def list_events(response: Response, status: EventStatus = None, location: str = None,
+                      window_start: datetime = Query(None, alias="from"), window_end: datetime = Query(None, alias="to"),
+                      happening_now: bool = False,
+                      limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: str = None,
+                      fields: str = None, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """
+    List events ordered by start time, one page at a time.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page. `fields` (comma-separated) limits the columns returned.
+    `from`/`to` keep the events overlapping that time window (either bound
+    may be left open); `happening_now=true` keeps the events in progress.
+    """
+    window = (window_start, window_end, happening_now)
+    events, next_cursor = await run_db(db, _cached_list_events, status, location, limit, cursor, fields, *window)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if fields or config.FAST_JSON:
+        # Partial rows do not satisfy EventResponse, and full rows come typed from
+        # the database; either way skip response_model validation
+        return FastJSONResponse(events, headers=headers)
+    response.headers.update(headers)
+    return events
+
+
+def _cached_list_events(db: Session, status: EventStatus, location: str, limit: int, cursor: str, fields: str,
+                        window_start: datetime = None, window_end: datetime = None, happening_now: bool = False):
+    args = (status, location, limit, cursor, fields, window_start, window_end, happening_now)
+    if happening_now:
+        # The answer moves with the clock
+        return _list_events(db, *args)
+    # Dashboards poll the same pages; serve them until an event write invalidates them
+    window = [bound.isoformat() if bound else None for bound in (window_start, window_end)]
+    key = event_cache.listing_key(status, location, limit, cursor, fields, *window)
+    page = event_cache.get_listing(key)
+    if page is None:
+        page = _list_events(db, *args)
+        event_cache.set_listing(key, page)
+    return page
+
+
+def _list_events(db: Session, status: EventStatus = None, location: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                 cursor: str = None, fields: str = None, window_start: datetime = None, window_end: datetime = None,
+                 happening_now: bool = False):
     try:
-        query = db.query(Event)
+        selected = parse_fields(fields, EVENT_FIELDS)
+        # The sort key is always fetched so the next cursor can be built
+        columns = dict.fromkeys(selected + ["start_time", "event_id"])
+        query = select(*(EVENT_FIELDS[name] for name in columns))
         
         if status:
-            query = query.filter(Event.status == status)
+            query = query.where(Event.status == status)
         if location:
-            query = query.filter(Event.location == location)
+            query = query.where(Event.location == location)
+        if window_start and window_end and intervals.as_utc(window_start) > intervals.as_utc(window_end):
+            raise ValueError("'from' must not be after 'to'")
+        query = query.where(*intervals.overlapping(window_start, window_end))
+        if happening_now:
+            query = query.where(*intervals.happening_now())
+        if cursor:
+            after_start, after_id = decode_cursor(cursor, 2)
+            after_start, after_id = datetime.fromisoformat(str(after_start)), int(after_id)
+            query = query.where(or_(
+                Event.start_time > after_start,
+                and_(Event.start_time == after_start, Event.event_id > after_id),
+            ))
 
-        events = query.all()
+        # One extra row tells us whether another page exists
+        rows = db.execute(
+            query.order_by(Event.start_time, Event.event_id).limit(limit + 1)
+        ).all()
         
-        if not events:
+        if not rows and not cursor:
             raise HTTPException(status_code=404, detail="No events found matching the criteria")
 
-        return events
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].start_time, rows[-1].event_id)
+
+        # Selected columns come first in each row
+        return rows_as_dicts(rows, selected), next_cursor
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(ve)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+
+@router.get("/search", response_model=list[dict])
+async def search_events(response: Response, q: str = Query(..., min_length=search.MIN_TERM_LENGTH, max_length=200),
+                        limit: int = Query(search.SEARCH_PAGE_SIZE, ge=1, le=search.MAX_SEARCH_PAGE_SIZE),
+                        cursor: str = None, fields: str = None, db: Session = Depends(get_session),
+                        user: dict = Depends(token_required)):
+    """
+    Search events by name, description and location, best match first.
+
+    Every word of `q` must match the start of a word in one of those
+    fields. Paginated with `X-Next-Cursor` like `list_events`.
+    """
+    events, next_cursor = await run_db(db, _search_events, q, limit, cursor, fields)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if config.FAST_JSON:
+        return FastJSONResponse(events, headers=headers)
+    response.headers.update(headers)
+    return events
+
+
+def _search_events(db: Session, q: str, limit: int, cursor: str = None, fields: str = None):
+    try:
+        return search.search_page(db, search.search_events, q, fields, EVENT_FIELDS, limit, cursor)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {str(ve)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+@router.get("/{event_id}/occupancy")
+async def get_occupancy(event_id: int, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """Registered, checked-in and remaining seats of an event, from its maintained counters."""
+    summary = await run_db(db, occupancy.summary, event_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return summary
+
+
+@router.get("/{event_id}/occupancy/stream")
+async def stream_occupancy(event_id: int, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """
+    Server-Sent Events stream of an event's occupancy.
+
+    Sends a `snapshot` event with the full summary, then a `delta` event
+    (`registered`/`checked_in` increments) for every registration or
+    check-in, and a fresh `snapshot` every `OCCUPANCY_RESYNC_SECONDS`.
+    """
+    if not await run_db(db, event_cache.get_event, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    # The stream outlives the request's session; it reads through the engine
+    bind = db.get_bind() if isinstance(db, Session) else db.bind
+    return StreamingResponse(
+        occupancy.stream(bind, event_id, config.OCCUPANCY_RESYNC_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+import jobs
+from auth import token_required
+from database import get_session, run_db
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """Status, progress (`rows_done` of about `rows_total`) and running result of a background job."""
+    job = await run_db(db, jobs.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """
+    Cancel a background job.
+
+    A queued job is canceled at once; a running one stops after its current
+    chunk. Rows from chunks already committed are kept.
+    """
+    return await run_db(db, _cancel_job, job_id)
+
+
+def _cancel_job(db: Session, job_id: str):
+    try:
+        job = jobs.cancel_job(db, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=409, detail=str(ve))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
@@ -0,0 +1,55 @@
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+import reporting
+from auth import token_required
+from database import get_session, run_db
+from schemas import DailyActivity, EventReport, EventStatus, GroupReport, ReportGroup
+
+router = APIRouter()
+
+
+@router.get("/events/{event_id}", response_model=EventReport)
+async def event_report(event_id: int, db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """
+    Capacity utilization, check-in rate and registrations/check-ins per day of one event.
+
+    The no-show rate is given once the event has ended.
+    """
+    report = await run_db(db, reporting.event_report, event_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return report
+
+
+@router.get("/utilization", response_model=list[GroupReport])
+async def utilization(group_by: list[ReportGroup] = Query([ReportGroup.location, ReportGroup.status]),
+                      location: str = None, status: EventStatus = None,
+                      db: Session = Depends(get_session), user: dict = Depends(token_required)):
+    """
+    Events, capacity, registrations and check-ins per location and/or status, with their rates.
+
+    No-show rates are given for groups of completed events only (group by
+    status, or filter on `status=completed`).
+    """
+    return await run_db(db, reporting.group_report, [group.value for group in group_by], location,
+                        status.value if status else None)
+
+
+@router.get("/registrations", response_model=list[DailyActivity])
+async def registrations(start: date = Query(None, alias="from"), end: date = Query(None, alias="to"),
+                        event_id: int = None, db: Session = Depends(get_session),
+                        user: dict = Depends(token_required)):
+    """
+    Registrations and check-ins per day (UTC), across all events or for `event_id`.
+
+    Defaults to the last 30 days; days without activity are left out.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    try:
+        return await run_db(db, reporting.timeline, start, end, event_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
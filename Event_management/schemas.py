@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 import enum
 
@@ -53,6 +53,45 @@ class AttendeeResponse(AttendeeBase):
 
 
 
+class ExportFormat(str, enum.Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+
+class ReportGroup(str, enum.Enum):
+    location = "location"
+    status = "status"
+
+class DailyActivity(BaseModel):
+    day: date
+    registrations: int
+    check_ins: int
+
+class EventReport(BaseModel):
+    event_id: int
+    status: Optional[EventStatus] = None
+    capacity: int
+    registered: int
+    checked_in: int
+    utilization: Optional[float] = None
+    check_in_rate: Optional[float] = None
+    no_show_rate: Optional[float] = None
+    daily: List[DailyActivity]
+
+class GroupReport(BaseModel):
+    location: Optional[str] = None
+    status: Optional[str] = None
+    events: int
+    capacity: int
+    registered: int
+    checked_in: int
+    utilization: Optional[float] = None
+    check_in_rate: Optional[float] = None
+    no_show_rate: Optional[float] = None
+
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
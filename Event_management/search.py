@@ -0,0 +1,236 @@
+"""
+Ranked full-text and prefix search over events and attendees.
+
+SQLite uses FTS5 tables kept in step with `events` and `attendees` by
+triggers; every search term is matched as a prefix (so `jo` finds `John` and
+`john.sm` finds `john.smith@...`) and results are ranked by BM25. Scoring
+every match of a short prefix costs tens of milliseconds at a million rows,
+so only the `SEARCH_RANK_WINDOW` most recent matches are scored; older
+matches follow them unranked, newest first, and selective queries are ranked
+in full. PostgreSQL matches each term at the start of a word with a regex
+served by pg_trgm GIN indexes over the same columns, ranked by word
+similarity. Other databases fall back to
+unranked prefix matching on each column.
+
+The index DDL runs on `Base.metadata.create_all` (see `register_ddl`); the
+migration `f2d6b8c41e07` creates it, and backfills it, on existing databases.
+"""
+import re
+
+from sqlalchemy import DDL, event, func, literal_column, select, table, column, or_
+from sqlalchemy.orm import Session
+
+import config
+from database import Base
+from models import Attendee, Event
+from pagination import decode_cursor, encode_cursor, parse_fields
+from serialization import rows_as_dicts
+
+# Columns matched by the prefix fallback on other databases
+EVENT_SEARCH_COLUMNS = ["name", "description", "location"]
+ATTENDEE_SEARCH_COLUMNS = ["first_name", "last_name", "email", "phone_number"]
+
+# BM25 weights per FTS5 column: names count more than the rest
+EVENT_WEIGHTS = [10.0, 1.0, 3.0]
+# attendees_fts also indexes event_id, only for filtering
+ATTENDEE_WEIGHTS = [10.0, 10.0, 5.0, 2.0, 0.0]
+
+# Shortest accepted search term; shorter prefixes match too much of the index
+MIN_TERM_LENGTH = 2
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+SQLITE_DDL = [
+    # Prefix indexes make 2-4 character prefix queries a single index lookup
+    "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+    "name, description, location, content='events', content_rowid='event_id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS attendees_fts USING fts5("
+    "first_name, last_name, email, phone_number, event_id, content='attendees', content_rowid='attendee_id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    # Only the searchable columns fire the update triggers, so check-ins and
+    # seat counters do not touch the index
+    "CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN "
+    "INSERT INTO events_fts(rowid, name, description, location) "
+    "VALUES (new.event_id, new.name, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, name, description, location) "
+    "VALUES ('delete', old.event_id, old.name, old.description, old.location); END",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF name, description, location ON events BEGIN "
+    "INSERT INTO events_fts(events_fts, rowid, name, description, location) "
+    "VALUES ('delete', old.event_id, old.name, old.description, old.location); "
+    "INSERT INTO events_fts(rowid, name, description, location) "
+    "VALUES (new.event_id, new.name, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS attendees_fts_insert AFTER INSERT ON attendees BEGIN "
+    "INSERT INTO attendees_fts(rowid, first_name, last_name, email, phone_number, event_id) "
+    "VALUES (new.attendee_id, new.first_name, new.last_name, new.email, new.phone_number, new.event_id); END",
+    "CREATE TRIGGER IF NOT EXISTS attendees_fts_delete AFTER DELETE ON attendees BEGIN "
+    "INSERT INTO attendees_fts(attendees_fts, rowid, first_name, last_name, email, phone_number, event_id) "
+    "VALUES ('delete', old.attendee_id, old.first_name, old.last_name, old.email, old.phone_number, old.event_id); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS attendees_fts_update "
+    "AFTER UPDATE OF first_name, last_name, email, phone_number, event_id ON attendees BEGIN "
+    "INSERT INTO attendees_fts(attendees_fts, rowid, first_name, last_name, email, phone_number, event_id) "
+    "VALUES ('delete', old.attendee_id, old.first_name, old.last_name, old.email, old.phone_number, old.event_id); "
+    "INSERT INTO attendees_fts(rowid, first_name, last_name, email, phone_number, event_id) "
+    "VALUES (new.attendee_id, new.first_name, new.last_name, new.email, new.phone_number, new.event_id); END",
+]
+
+# Index and query share these expressions verbatim, so the planner can use the index
+EVENT_DOCUMENT = "(coalesce(events.name, '') || ' ' || coalesce(events.description, '') || ' ' || " \
+                 "coalesce(events.location, ''))"
+ATTENDEE_DOCUMENT = "(attendees.first_name || ' ' || attendees.last_name || ' ' || attendees.email || ' ' || " \
+                    "attendees.phone_number)"
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_events_search_trgm ON events USING gin ({EVENT_DOCUMENT} gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS ix_attendees_search_trgm ON attendees USING gin ({ATTENDEE_DOCUMENT} gin_trgm_ops)",
+]
+
+
+def register_ddl(metadata):
+    """Create the search indexes whenever `metadata.create_all` runs."""
+    for dialect, statements in (("sqlite", SQLITE_DDL), ("postgresql", POSTGRES_DDL)):
+        for statement in statements:
+            event.listen(metadata, "after_create", DDL(statement).execute_if(dialect=dialect))
+    for name in ("events_fts", "attendees_fts"):
+        event.listen(metadata, "before_drop", DDL(f"DROP TABLE IF EXISTS {name}").execute_if(dialect="sqlite"))
+
+
+register_ddl(Base.metadata)
+
+
+def parse_terms(q: str) -> list:
+    """Split a query into search terms; raises ValueError if none is usable."""
+    terms = [term for term in q.replace('"', " ").split() if term]
+    if not terms or any(len(term) < MIN_TERM_LENGTH for term in terms):
+        raise ValueError(f"Search terms must be at least {MIN_TERM_LENGTH} characters")
+    return terms
+
+
+# Word characters as FTS5's unicode61 tokenizer sees them (no underscore)
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def fts_query(terms: list, event_id: int = None) -> str:
+    """
+    FTS5 MATCH expression: every term as a prefix phrase, all required.
+
+    Leading one-character tokens are dropped from each phrase (`+1-555-01`
+    becomes `"555 01"*`): they match nearly every row, and the shorter
+    phrase still only matches where the full one could.
+    """
+    phrases = []
+    for term in terms:
+        tokens = _TOKEN.findall(term)
+        while len(tokens) > 1 and len(tokens[0]) < MIN_TERM_LENGTH:
+            tokens.pop(0)
+        if tokens:
+            phrases.append(f'"{" ".join(tokens)}"*')
+    if not phrases:
+        raise ValueError("Search terms must contain letters or digits")
+    match = " ".join(phrases)
+    if event_id is not None:
+        match = f'event_id : "{int(event_id)}" AND ({match})'
+    return match
+
+
+def _word_prefix_pattern(term: str) -> str:
+    """PostgreSQL regex matching `term` at the start of a word."""
+    return "(^|[^[:alnum:]])" + re.sub(r"([^\w\s])", r"\\\1", term)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _ranked(db: Session, model, fts_name: str, weights, document: str, search_columns, columns: dict, terms: list,
+            limit: int, offset: int, event_id: int = None):
+    """Rows of `columns` matching every term, best first, optionally limited to one event."""
+    query = select(*(expr.label(name) for name, expr in columns.items()))
+    primary_key = model.__mapper__.primary_key[0]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        # Score the most recent matches inside FTS5 and join only the requested page;
+        # the event filter goes into the MATCH so FTS5 intersects the postings
+        fts = table(fts_name, column("rowid"))
+        fts_column = literal_column(fts_name)
+        matches = fts_column.op("MATCH")(fts_query(terms, event_id))
+        rank_window = config.SEARCH_RANK_WINDOW
+        window = (
+            select(fts.c.rowid, func.bm25(fts_column, *weights).label("score"))
+            .where(matches)
+            .order_by(fts.c.rowid.desc())
+            .limit(rank_window)
+            .subquery()
+        )
+        page = (
+            select(window.c.rowid, window.c.score)
+            .order_by(window.c.score, window.c.rowid)
+            .limit(limit)
+            .offset(offset)
+            .subquery()
+        )
+        rows = db.execute(query.join(page, page.c.rowid == primary_key).order_by(page.c.score, page.c.rowid)).all()
+        if len(rows) == limit:
+            return rows
+        # Past the window, the remaining (older) matches follow unranked, newest first
+        rest = (
+            select(fts.c.rowid)
+            .where(matches)
+            .order_by(fts.c.rowid.desc())
+            .limit(limit - len(rows))
+            .offset(rank_window + max(offset - rank_window, 0))
+            .subquery()
+        )
+        return rows + db.execute(query.join(rest, rest.c.rowid == primary_key).order_by(rest.c.rowid.desc())).all()
+
+    if dialect == "postgresql":
+        # Prefix of any word, as FTS5 matches on SQLite; pg_trgm indexes serve the regex
+        document = literal_column(document)
+        query = (
+            query.where(*(document.op("~*")(_word_prefix_pattern(term)) for term in terms))
+            .order_by(func.word_similarity(" ".join(terms), document).desc(), primary_key)
+        )
+    else:
+        for term in terms:
+            query = query.where(or_(*(getattr(model, name).like(f"{_escape_like(term)}%", escape="\\")
+                                      for name in search_columns)))
+        query = query.order_by(primary_key)
+    if event_id is not None:
+        query = query.where(model.event_id == event_id)
+    return db.execute(query.limit(limit).offset(offset)).all()
+
+
+def search_events(db: Session, q: str, columns: dict, limit: int, offset: int = 0) -> list:
+    """Events matching `q` across name, description and location, best match first."""
+    return _ranked(db, Event, "events_fts", EVENT_WEIGHTS, EVENT_DOCUMENT, EVENT_SEARCH_COLUMNS, columns,
+                   parse_terms(q), limit, offset)
+
+
+def search_attendees(db: Session, q: str, columns: dict, limit: int, offset: int = 0, event_id: int = None) -> list:
+    """Attendees matching `q` across name, email and phone, best match first, optionally within one event."""
+    return _ranked(db, Attendee, "attendees_fts", ATTENDEE_WEIGHTS, ATTENDEE_DOCUMENT, ATTENDEE_SEARCH_COLUMNS,
+                   columns, parse_terms(q), limit, offset, event_id)
+
+
+def search_page(db: Session, search, q: str, fields: str, allowed: dict, limit: int, cursor: str = None, **filters):
+    """
+    One page of `search` results as dicts of the requested `fields`, plus the next cursor.
+
+    Ranked results have no stable sort key to seek on, so the cursor carries
+    the offset of the next page.
+    """
+    selected = parse_fields(fields, allowed)
+    offset = 0
+    if cursor:
+        (offset,) = decode_cursor(cursor, 1)
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError("Invalid cursor")
+
+    # One extra row tells us whether another page exists
+    rows = search(db, q, {name: allowed[name] for name in selected}, limit + 1, offset, **filters)
+    next_cursor = encode_cursor(offset + limit) if len(rows) > limit else None
+    return rows_as_dicts(rows[:limit], selected), next_cursor
@@ -0,0 +1,35 @@
+"""
+Fast JSON responses for rows that come straight from the database.
+
+`response_model` validates every row through Pydantic and then re-encodes
+it with `jsonable_encoder` and the stdlib encoder. For rows the database
+already typed, `FastJSONResponse` skips both and encodes plain dicts in one
+native call: orjson when installed, pydantic-core's encoder otherwise. Both
+produce the same JSON as the default path for the types stored here
+(ISO 8601 datetimes, enum values).
+"""
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional; pydantic-core is always available
+    orjson = None
+    from pydantic_core import to_json
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded natively, without per-object validation."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def rows_as_dicts(rows, keys) -> list:
+    """Turn result tuples into dicts of their first `len(keys)` columns."""
+    return [dict(zip(keys, row)) for row in rows]
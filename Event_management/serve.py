@@ -0,0 +1,52 @@
+"""
+Serve the API with several worker processes.
+
+    python -m serve --workers 4 --port 8000
+
+Each worker is a separate process with its own engine, pools and job
+threads. Without `EVENT_CACHE_URL` the workers share the event cache through
+a SQLite file in `JOB_SPOOL_DIR` (see `shared_state`), cleared at start, so
+an event written through one worker is not served stale by another. On
+SIGTERM/SIGINT workers stop accepting connections, give in-flight requests
+and event streams `--graceful-timeout` seconds, then drain (see `lifecycle`).
+
+Pre-forking servers work too: the database pools are reset in each forked
+child, e.g.
+
+    gunicorn main:app -k uvicorn.workers.UvicornWorker --workers 4 --preload
+"""
+import argparse
+import os
+from pathlib import Path
+
+import uvicorn
+
+import config
+from shared_state import SQLiteBackend
+
+
+def shared_state_url() -> str:
+    """Local shared-state URL for the workers of this host, emptied for a fresh start."""
+    path = Path(config.JOB_SPOOL_DIR).resolve() / "shared_state.db"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    SQLiteBackend(str(path)).clear()
+    return f"sqlite:///{path}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--graceful-timeout", type=float, default=config.SHUTDOWN_GRACE_SECONDS)
+    args = parser.parse_args(argv)
+
+    if args.workers > 1 and not config.EVENT_CACHE_URL:
+        # Inherited by the worker processes, which read it at import
+        os.environ["EVENT_CACHE_URL"] = shared_state_url()
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers,
+                timeout_graceful_shutdown=args.graceful_timeout)
+
+
+if __name__ == "__main__":
+    main()
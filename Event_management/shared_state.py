@@ -0,0 +1,294 @@
+"""
+Key-value backends for state that must agree across worker processes.
+
+All backends store values with a TTL, can claim a key atomically (`add`),
+keep integer counters (used as cache generations) next to them and hold
+token buckets for rate limiting (`take`):
+
+    ""                       MemoryBackend: this process only (one worker)
+    sqlite:///path/state.db  SQLiteBackend: every process on this host
+    redis://host:6379/0      RedisBackend: every process on every host (needs `redis`)
+
+The SQLite backend is the local stand-in for Redis: workers started by
+`python -m serve --workers N` share it by default, so a write in one worker
+invalidates the others' caches without extra infrastructure. The SQLite and
+Redis backends block on I/O; async code calls them through `call`, which
+runs them in the threadpool.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+from cache import TTLCache
+
+
+class MemoryBackend:
+    """Per-process backend on top of `TTLCache`."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self._cache = TTLCache(maxsize=maxsize)
+        # Counters live outside the LRU: evicting a cache generation could resurrect stale entries
+        self._counters = {}
+        # Token buckets, least recently used first: {key: (tokens, monotonic stamp)}
+        self._buckets = {}
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl: float):
+        self._cache.set(key, value, ttl=ttl)
+
+    def add(self, key, value, ttl: float) -> bool:
+        """Set `key` unless it holds a live value; True if it was set."""
+        with self._lock:
+            if self._cache.get(key) is not None:
+                return False
+            self._cache.set(key, value, ttl=ttl)
+            return True
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def counter(self, key) -> int:
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def take(self, key, rate: float, burst: float) -> float:
+        """
+        Take a token from the bucket at `key`, refilled at `rate` per second up to `burst`.
+
+        Returns 0 if a token was taken, else the seconds until one is available.
+        A `rate` of 0 or less means no limit.
+        """
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            # An evicted bucket comes back full, so evict the least recently used
+            if len(self._buckets) > self._maxsize:
+                del self._buckets[next(iter(self._buckets))]
+        return wait
+
+    def clear(self):
+        self._cache.clear()
+        with self._lock:
+            self._counters.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SQLiteBackend:
+    """
+    Shared by the processes of one host through a SQLite file; values are stored as JSON.
+
+    Each thread keeps its own connection, reopened after a fork.
+    """
+
+    blocking = True
+    # Expired entries are purged after this many writes
+    PURGE_EVERY = 1000
+    # Token buckets unused for this long are purged
+    BUCKET_IDLE_SECONDS = 3600
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, stamp REAL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl: float):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(jsonable_encoder(value)), time.time() + ttl),
+        )
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+
+    def add(self, key, value, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO entries (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE entries.expires_at <= ?",
+            (key, json.dumps(jsonable_encoder(value)), now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def counter(self, key) -> int:
+        row = self._connection().execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key):
+        self._connection().execute(
+            "INSERT INTO counters (key, value) VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET value = value + 1",
+            (key,),
+        )
+
+    def take(self, key, rate: float, burst: float) -> float:
+        if rate <= 0:
+            return 0.0
+        now = time.time()
+        conn = self._connection()
+        # Refill and take in one statement; the row is only written if a token is left
+        taken = conn.execute(
+            "INSERT INTO buckets (key, tokens, stamp) VALUES (:key, :burst - 1, :now) "
+            "ON CONFLICT(key) DO UPDATE SET tokens = MIN(:burst, tokens + (:now - stamp) * :rate) - 1, stamp = :now "
+            "WHERE MIN(:burst, tokens + (:now - stamp) * :rate) >= 1",
+            {"key": key, "burst": burst, "now": now, "rate": rate},
+        ).rowcount == 1
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            # Idle this long, any bucket has refilled and is as good as absent
+            conn.execute("DELETE FROM buckets WHERE stamp <= ?", (now - self.BUCKET_IDLE_SECONDS,))
+        if taken:
+            return 0.0
+        tokens, stamp = conn.execute("SELECT tokens, stamp FROM buckets WHERE key = ?", (key,)).fetchone()
+        return max((1 - min(burst, tokens + (now - stamp) * rate)) / rate, 0.0)
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM counters")
+        conn.execute("DELETE FROM buckets")
+
+    def stats(self) -> dict:
+        return {"backend": "sqlite", "hits": self.hits, "misses": self.misses}
+
+
+class RedisBackend:
+    """Shared backend; values are stored as JSON."""
+
+    blocking = True
+    prefix = "event_management:"
+    # Token bucket refill and take, atomic on the server and timed by its clock
+    TAKE_SCRIPT = """
+        local burst, rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+        local tokens = tonumber(state[1]) or burst
+        tokens = math.min(burst, tokens + (now - (tonumber(state[2]) or now)) * rate)
+        if tokens < 1 then
+            return tostring((1 - tokens) / rate)
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'stamp', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+        return '0'
+    """
+
+    def __init__(self, url: str):
+        import redis  # Optional dependency, only needed for a shared cache
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.TAKE_SCRIPT)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl: float):
+        self._client.set(self.prefix + key, json.dumps(jsonable_encoder(value)), px=int(ttl * 1000))
+
+    def add(self, key, value, ttl: float) -> bool:
+        return bool(self._client.set(self.prefix + key, json.dumps(jsonable_encoder(value)), px=int(ttl * 1000),
+                                     nx=True))
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def counter(self, key) -> int:
+        return int(self._client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        self._client.incr(self.prefix + key)
+
+    def take(self, key, rate: float, burst: float) -> float:
+        if rate <= 0:
+            return 0.0
+        return float(self._take(keys=[self.prefix + key], args=[burst, rate]))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+
+def make_backend(url: str, maxsize: int):
+    """Backend for `url` (see the module docstring); `maxsize` bounds the in-memory backend."""
+    if not url:
+        return MemoryBackend(maxsize)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported shared state URL: {url!r}")
+
+
+async def call(backend, method: str, *args):
+    """`backend.<method>(*args)` from async code: in the threadpool when the backend does I/O."""
+    if backend.blocking:
+        return await run_in_threadpool(getattr(backend, method), *args)
+    return getattr(backend, method)(*args)
@@ -0,0 +1,117 @@
+import os
+import tempfile
+from datetime import datetime
+
+# Keep test runs away from the working database; must precede app imports
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/event.db")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import admission
+import event_cache
+import idempotency
+from auth import token_required
+from config import DB_MODE
+from database import Base, get_session, make_async_engine, make_engine
+from main import app
+from models import Attendee, Event
+
+
+@pytest.fixture(autouse=True)
+def clear_event_cache():
+    """Every test gets a fresh database, so cached events, stored responses and rate limits must not leak between tests."""
+    event_cache.clear()
+    idempotency.store.clear()
+    admission.reset()
+
+
+@pytest.fixture
+def test_engine(tmp_path):
+    """Engine for a fresh SQLite database file, shared by the app and the test."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def db_session(test_engine):
+    """Session for seeding and inspecting the test database."""
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def make_event(db_session):
+    """
+    Factory for committed events; keyword arguments override the Event columns.
+
+    `attendees` registers that many people (a0@example.com, a1@example.com, ...)
+    and counts them, the first `checked_in` of them already checked in.
+    """
+    def make(attendees=0, checked_in=0, **fields):
+        event = Event(**{"name": "Test Event", "start_time": datetime(2025, 3, 15, 10),
+                         "end_time": datetime(2025, 3, 15, 17), "location": "Lisbon", "max_attendees": 10, **fields})
+        db_session.add(event)
+        db_session.flush()
+        db_session.add_all([
+            Attendee(first_name="A", last_name=str(n), email=f"a{n}@example.com", phone_number="1",
+                     event_id=event.event_id, check_in_status=n < checked_in)
+            for n in range(attendees)
+        ])
+        event.registered_count = attendees
+        event.checked_in_count = checked_in
+        db_session.commit()
+        return event
+    return make
+
+
+@pytest.fixture
+def event(make_event):
+    """An event with ten seats and nobody registered yet."""
+    return make_event()
+
+
+def _session_override(test_engine):
+    """Build a replacement for `get_session` matching the configured DB_MODE."""
+    if DB_MODE == "async":
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        # NullPool: TestClient runs each app on its own event loop
+        async_engine = make_async_engine(str(test_engine.url), poolclass=NullPool)
+        AsyncTestingSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override():
+            async with AsyncTestingSession() as db:
+                yield db
+        return override
+
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+    def override():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+    return override
+
+
+@pytest.fixture
+def auth_client(test_engine):
+    """TestClient wired to the test database with authentication bypassed."""
+    app.dependency_overrides[get_session] = _session_override(test_engine)
+    app.dependency_overrides[token_required] = lambda: {"sub": "tester@example.com"}
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import admission
+import config
+import database
+from admission import ConcurrencyLimit
+from auth import create_access_token
+from main import app
+from shared_state import SQLiteBackend
+
+
+@pytest.fixture(autouse=True)
+def rate_limit(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT", True)
+
+
+def bearer(sub: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': sub})}"}
+
+
+def test_rate_limit_per_token_subject(auth_client, monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_BURST", 2)
+    monkeypatch.setattr(config, "RATE_LIMIT_RPS", 0.5)
+    alice, bob = bearer("alice@example.com"), bearer("bob@example.com")
+
+    statuses = [auth_client.get("/auth_routes/cache-stats", headers=alice).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    refused = auth_client.get("/auth_routes/cache-stats", headers=alice)
+    assert refused.headers["retry-after"] == "2"
+    assert refused.json() == {"detail": "Rate limit exceeded"}
+    # Another subject, and unlimited probes, are unaffected
+    assert auth_client.get("/auth_routes/cache-stats", headers=bob).status_code == 200
+    assert auth_client.get("/metrics").status_code == 200
+    assert admission.REJECTED.value("api", "rate_limited") >= 2
+
+
+def test_shared_buckets_are_taken_off_the_event_loop(auth_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "RATE_LIMIT_BURST", 1)
+    monkeypatch.setattr(config, "RATE_LIMIT_RPS", 0.01)
+    backend = SQLiteBackend(str(tmp_path / "state.db"))
+    on_loop = []
+    take = backend.take
+
+    def spy(*args):
+        try:
+            on_loop.append(asyncio.get_running_loop() is not None)
+        except RuntimeError:
+            on_loop.append(False)
+        return take(*args)
+    monkeypatch.setattr(backend, "take", spy)
+    monkeypatch.setattr(admission, "buckets", backend)
+
+    statuses = [auth_client.get("/auth_routes/cache-stats").status_code for _ in range(2)]
+    assert statuses == [200, 429]
+    assert on_loop == [False, False]
+
+
+def test_logins_are_limited_per_ip(auth_client, monkeypatch):
+    monkeypatch.setattr(config, "LOGIN_RATE_LIMIT_BURST", 2)
+    first, second = TestClient(app, client=("10.0.0.1", 1000)), TestClient(app, client=("10.0.0.2", 1000))
+    form = {"username": "nobody@example.com", "password": "wrong"}
+    # A token does not buy a separate login budget
+    statuses = [first.post("/auth_routes/token", data=form, headers=bearer(f"user{n}")).status_code
+                for n in range(3)]
+    assert statuses == [401, 401, 429]
+    assert second.post("/auth_routes/token", data=form).status_code == 401
+    # Other accounts behind the same address (one venue's NAT) have budgets of their own
+    other = {"username": "Someone@example.com", "password": "wrong"}
+    assert [first.post("/auth_routes/token", data=other).status_code for _ in range(3)] == [401, 401, 429]
+    registration = {"email": "new@example.com", "password": "long-enough-password"}
+    assert first.post("/auth_routes/register", json=registration).status_code == 200
+    assert first.post("/auth_routes/register", json=registration).status_code == 400
+    assert first.post("/auth_routes/register", json=registration).status_code == 429
+
+
+def test_default_limits_admit_a_door_scanning_burst(auth_client, monkeypatch):
+    scanner = bearer("door-scanners")
+    assert all(auth_client.get("/auth_routes/cache-stats", headers=scanner).status_code == 200 for _ in range(500))
+    # A zero rate turns the limit off instead of failing every request
+    monkeypatch.setattr(config, "RATE_LIMIT_BURST", 1)
+    monkeypatch.setattr(config, "RATE_LIMIT_RPS", 0)
+    assert [auth_client.get("/auth_routes/cache-stats").status_code for _ in range(3)] == [200, 200, 200]
+
+
+def test_batch_endpoints_are_bulk_requests():
+    assert admission.classify("POST", "/attendees/batch") is admission.BULK
+    assert admission.classify("PUT", "/attendees/checkin/batch") is admission.BULK
+    assert admission.classify("POST", "/attendees/attendee/3/bulk-check-in") is admission.BULK
+    # A single check-in stays in the general budget
+    assert admission.classify("PUT", "/attendees/7/checkin") is admission.API
+
+
+def test_concurrency_limit_queues_then_refuses():
+    async def scenario():
+        limit = ConcurrencyLimit(limit=1, queue=1)
+        assert await limit.acquire(timeout=1)
+        waiter = asyncio.create_task(limit.acquire(timeout=1))
+        await asyncio.sleep(0)
+        # The queue is full, and a queued request times out while the slot stays taken
+        assert not await limit.acquire(timeout=1)
+        limit.release()
+        assert await waiter
+        assert not await limit.acquire(timeout=0.01)
+        limit.release()
+        assert limit.active == 0
+
+        # A cancelled waiter (client gone) is skipped when the slot is released
+        assert await limit.acquire(timeout=1)
+        waiter = asyncio.create_task(limit.acquire(timeout=1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limit.release()
+        assert limit.active == 0
+    asyncio.run(scenario())
+
+
+def test_concurrency_cap_answers_429(auth_client, monkeypatch):
+    monkeypatch.setattr(config, "HEAVY_READ_CONCURRENCY", 0)
+    monkeypatch.setattr(config, "ADMISSION_QUEUE", 0)
+    response = auth_client.get("/events/search", params={"q": "launch"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert auth_client.get("/auth_routes/cache-stats").status_code == 200
+
+
+def test_heavy_requests_are_shed_while_the_pool_is_congested(auth_client, monkeypatch):
+    monkeypatch.setattr(config, "SHED_POOL_WAIT_MS", 100)
+    monkeypatch.setattr(database.pool_metrics, "recent_wait", lambda: 0.5)
+    response = auth_client.get("/reports/utilization")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert auth_client.post("/attendees/attendee/1/bulk-upload").status_code == 503
+    # Check-ins and registrations still go through
+    assert auth_client.put("/attendees/999/checkin").status_code == 404
+
+    monkeypatch.setattr(database.pool_metrics, "recent_wait", lambda: 0.05)
+    assert auth_client.get("/reports/utilization").status_code == 200
@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+import auth
+from auth import create_access_token, decode_token, get_current_user, token_cache, user_cache
+from cache import TTLCache
+from models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    token_cache.clear()
+    user_cache.clear()
+
+
+def test_ttl_cache_expiry_and_lru():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None  # evicted as least recently used
+    assert cache.get("a") == 1
+    cache.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None  # expired
+    assert cache.stats()["evictions"] == 2
+
+
+def test_decode_token_verifies_once(monkeypatch):
+    token = create_access_token({"sub": "a@example.com"})
+    calls = []
+    real_decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *a, **kw: calls.append(1) or real_decode(*a, **kw))
+
+    assert decode_token(token)["sub"] == "a@example.com"
+    assert decode_token(token)["sub"] == "a@example.com"
+    assert len(calls) == 1
+    assert token_cache.stats()["hits"] >= 1
+
+
+def test_invalid_and_expired_tokens_are_not_cached():
+    assert decode_token("not-a-token") is None
+    expired = create_access_token({"sub": "a@example.com"}, expires_delta=timedelta(seconds=-1))
+    assert decode_token(expired) is None
+    assert len(token_cache) == 0
+
+
+def test_current_user_is_cached_and_invalidated(db_session):
+    db_session.add(User(email="u@example.com", password="x"))
+    db_session.commit()
+    token = create_access_token({"sub": "u@example.com"})
+
+    assert get_current_user(token, db_session).email == "u@example.com"
+    assert user_cache.get("u@example.com") is not None
+
+    user = db_session.query(User).filter(User.email == "u@example.com").one()
+    user.email = "renamed@example.com"
+    db_session.commit()
+    assert user_cache.get("u@example.com") is None
+
+
+def test_cache_stats_endpoint(auth_client):
+    stats = auth_client.get("/auth_routes/cache-stats").json()
+    assert set(stats) == {"tokens", "users", "events"}
+    assert "hits" in stats["tokens"]
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+import config
+from models import Attendee, Event
+
+
+@pytest.fixture
+def events(db_session):
+    events = [
+        Event(name=name, start_time=datetime(2025, 3, 15, 10), end_time=datetime(2025, 3, 15, 17),
+              location="Oslo", max_attendees=capacity)
+        for name, capacity in [("Big", 100), ("Small", 2)]
+    ]
+    db_session.add_all(events)
+    db_session.commit()
+    return [event.event_id for event in events]
+
+
+def person(email, event_id):
+    return {"first_name": "B", "last_name": "Atch", "email": email, "phone_number": "1", "event_id": event_id}
+
+
+def test_register_batch(auth_client, db_session, events):
+    big, small = events
+    db_session.add(Attendee(**person("taken@example.com", big)))
+    db_session.commit()
+
+    body = [
+        person("a@example.com", big),
+        person("taken@example.com", big),
+        person("a@example.com", big),
+        person("s1@example.com", small),
+        person("s2@example.com", small),
+        person("s3@example.com", small),
+        person("x@example.com", 999),
+    ]
+    response = auth_client.post("/attendees/batch", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["rejected"]) == (3, 4)
+    assert [r.get("reason") for r in data["results"]] == [
+        None, "Email already registered for this event", "Duplicate email in batch",
+        None, None, "Event is fully booked", "Event not found",
+    ]
+
+    created = {r["attendee_id"]: body[r["index"]]["email"] for r in data["results"] if r["status"] == "created"}
+    assert {a.attendee_id: a.email for a in db_session.query(Attendee).filter(Attendee.attendee_id.in_(created))} == created
+    assert auth_client.get(f"/events/{small}/occupancy").json()["registered"] == 2
+    assert auth_client.get(f"/events/{big}/occupancy").json()["remaining"] == 99
+
+
+def test_check_in_batch(auth_client, events):
+    big, small = events
+    results = auth_client.post("/attendees/batch", json=[person("a@example.com", big), person("b@example.com", small)])
+    a, b = (r["attendee_id"] for r in results.json()["results"])
+    auth_client.put(f"/attendees/{a}/checkin")
+
+    response = auth_client.put("/attendees/checkin/batch", json=[a, b, b, 999])
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["checked_in"], data["already_checked_in"], data["not_found"]) == (1, 2, 1)
+    assert [r["status"] for r in data["results"]] == ["already_checked_in", "checked_in", "already_checked_in", "not_found"]
+    assert auth_client.get(f"/events/{big}/occupancy").json()["checked_in"] == 1
+    assert auth_client.get(f"/events/{small}/occupancy").json()["checked_in"] == 1
+
+
+def test_batch_size_limits(auth_client, events, monkeypatch):
+    monkeypatch.setattr(config, "BATCH_MAX_ITEMS", 2)
+    assert auth_client.put("/attendees/checkin/batch", json=[1, 2, 3]).status_code == 400
+    assert auth_client.put("/attendees/checkin/batch", json=[]).status_code == 400
+    assert auth_client.post("/attendees/batch", json=[person(f"{n}@example.com", events[0]) for n in range(3)]).status_code == 400
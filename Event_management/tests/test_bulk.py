@@ -0,0 +1,140 @@
+import pytest
+
+from bulk import import_attendees
+from models import Attendee
+
+HEADER = "first_name,last_name,email,phone_number,event_id\n"
+
+
+@pytest.fixture
+def event(make_event):
+    return make_event(max_attendees=3)
+
+
+def upload(client, event_id, content):
+    files = {"file": ("attendees.csv", content)}
+    return client.post(f"/attendees/attendee/{event_id}/bulk-upload", files=files)
+
+
+def test_bulk_upload_reports_rejections(auth_client, db_session, event):
+    db_session.add(Attendee(first_name="Old", last_name="Timer", email="old@example.com",
+                            phone_number="1", event_id=event.event_id))
+    event.registered_count = 1
+    db_session.commit()
+
+    eid = event.event_id
+    csv_content = HEADER + "\n".join([
+        f"John,Doe,john@example.com,123,{eid}",
+        f"John,Doe,john@example.com,123,{eid}",
+        f"Old,Timer,old@example.com,1,{eid}",
+        f"Bad,Row,bad@example.com,123,{eid + 1}",
+        "Short,Row",
+        f"Jane,Doe,jane@example.com,456,{eid}",
+        f"Late,Comer,late@example.com,789,{eid}",
+    ])
+
+    response = upload(auth_client, eid, csv_content)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["added"] == 2
+    assert body["message"] == "Successfully added 2 attendees"
+    reasons = {(r["row"], r["reason"]) for r in body["rejected"]}
+    assert reasons == {
+        (3, "Duplicate email in file"),
+        (4, "Email already registered for this event"),
+        (5, "event_id does not match the upload"),
+        (6, "Expected 5 columns, got 2"),
+        (8, "Event is fully booked"),
+    }
+    assert body["rejected_count"] == 5
+    assert body["fully_booked_count"] == 1
+    assert db_session.query(Attendee).filter(Attendee.event_id == eid).count() == 3
+    db_session.refresh(event)
+    assert event.registered_count == 3
+
+
+def test_full_event_is_refused_before_the_file_is_read(auth_client, db_session, event, monkeypatch):
+    event.registered_count = event.max_attendees
+    db_session.commit()
+    response = upload(auth_client, event.event_id, b"\xff not even a csv")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Max attendees limit reached"
+
+    # Seats taken while the file is read: judged on the counts, not the truncated rejection list
+    monkeypatch.setattr("routers.attendence.seats_remaining", lambda db, event_id: 1)
+    monkeypatch.setattr("bulk.MAX_REPORTED_REJECTIONS", 1)
+    eid = event.event_id
+    response = upload(auth_client, eid, HEADER + f"Bad,Row,bad,1,{eid}\nLate,Comer,late@example.com,1,{eid}\n")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Max attendees limit reached"
+
+
+def test_import_dedupes_across_chunks(db_session, event):
+    eid = event.event_id
+    rows = [["A", "B", "a@example.com", "1", str(eid)]] * 2
+
+    report = import_attendees(db_session, eid, iter(rows), chunk_size=1)
+    assert report["added"] == 1
+    assert report["rejected"] == [{"row": 3, "email": "a@example.com", "reason": "Email already registered for this event"}]
+
+
+def test_bulk_upload_invalid_header(auth_client, event):
+    response = upload(auth_client, event.event_id, "email\njohn@example.com")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid CSV format"
+
+
+def test_bulk_upload_invalid_encoding(auth_client, event):
+    response = upload(auth_client, event.event_id, HEADER.encode() + b"\xff\xfe\n")
+    assert response.status_code == 400
+
+
+def check_in(client, event_id, content, **params):
+    files = {"file": ("checkin.csv", content)}
+    return client.post(f"/attendees/attendee/{event_id}/bulk-check-in", files=files, params=params)
+
+
+@pytest.fixture
+def registered(db_session, event):
+    db_session.add_all([
+        Attendee(first_name="A", last_name="A", email="a@example.com", phone_number="1", event_id=event.event_id),
+        Attendee(first_name="B", last_name="B", email="b@example.com", phone_number="2",
+                 event_id=event.event_id, check_in_status=True),
+    ])
+    db_session.commit()
+
+
+def test_bulk_check_in_counts(auth_client, db_session, event, registered):
+    response = check_in(auth_client, event.event_id, "email\nA@example.com\na@example.com\nb@example.com\nnobody@example.com\n")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["message"] == "Successfully checked in 1 attendees"
+    assert (body["checked_in"], body["already_checked_in"], body["unknown"]) == (1, 1, 1)
+    attendee = db_session.query(Attendee).filter(Attendee.email == "a@example.com").one()
+    db_session.refresh(attendee)
+    assert attendee.check_in_status is True
+
+
+def test_bulk_check_in_misses_csv(auth_client, event, registered):
+    response = check_in(auth_client, event.event_id, "email\na@example.com\nb@example.com\nnobody@example.com\n", misses_csv=True)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "email,result",
+        "b@example.com,already_checked_in",
+        "nobody@example.com,unknown",
+    ]
+
+
+def test_bulk_check_in_invalid_header(auth_client, event):
+    response = check_in(auth_client, event.event_id, "wrong_header\na@example.com")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid CSV format. Expected headers: 'email'"
+
+
+def test_same_email_can_join_two_events(db_session, event, make_event):
+    other = make_event(name="Other", location="Rome", max_attendees=3)
+    row = ["A", "B", "a@example.com", "1"]
+
+    assert import_attendees(db_session, event.event_id, iter([row + [str(event.event_id)]]))["added"] == 1
+    assert import_attendees(db_session, other.event_id, iter([row + [str(other.event_id)]]))["added"] == 1
@@ -0,0 +1,71 @@
+from threading import Barrier, Thread
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from capacity import reserve_available_seats, reserve_seats
+from models import Event
+
+
+@pytest.fixture
+def event(make_event):
+    return make_event(max_attendees=5)
+
+
+def test_reserve_seats_is_bounded(db_session, event):
+    assert reserve_seats(db_session, event.event_id, 3)
+    assert not reserve_seats(db_session, event.event_id, 3)
+    assert reserve_seats(db_session, event.event_id, 2)
+    assert not reserve_seats(db_session, event.event_id)
+    assert not reserve_seats(db_session, 999)
+    db_session.commit()
+    db_session.refresh(event)
+    assert event.registered_count == 5
+
+
+def test_reserve_available_seats_grants_partially(db_session, event):
+    assert reserve_available_seats(db_session, event.event_id, 3) == 3
+    assert reserve_available_seats(db_session, event.event_id, 10) == 2
+    assert reserve_available_seats(db_session, event.event_id, 1) == 0
+    assert reserve_available_seats(db_session, 999, 1) == 0
+
+
+def test_concurrent_reservations_never_overbook(test_engine, event):
+    Session = sessionmaker(bind=test_engine)
+    # Read the id up front: the fixture's session must not be shared across threads
+    event_id = event.event_id
+    start = Barrier(10)
+    results = []
+
+    def register():
+        with Session() as db:
+            start.wait()
+            if reserve_seats(db, event_id):
+                db.commit()
+                results.append(True)
+
+    threads = [Thread(target=register) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 5
+    with Session() as db:
+        assert db.get(Event, event_id).registered_count == 5
+
+
+def test_register_attendee_uses_reservation(auth_client, db_session, event):
+    event.max_attendees = 1
+    db_session.commit()
+    attendee = {"first_name": "A", "last_name": "B", "email": "a@example.com",
+                "phone_number": "1", "event_id": event.event_id}
+
+    assert auth_client.post("/attendees/", json=attendee).status_code == 200
+    full = auth_client.post("/attendees/", json={**attendee, "email": "c@example.com"})
+    assert full.status_code == 400
+    assert full.json()["detail"] == "Event is fully booked"
+    missing = auth_client.post("/attendees/", json={**attendee, "event_id": 999})
+    assert missing.status_code == 404
+    db_session.refresh(event)
+    assert event.registered_count == 1
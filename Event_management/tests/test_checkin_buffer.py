@@ -0,0 +1,124 @@
+import fcntl
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import checkin_buffer
+from checkin_buffer import CheckInBuffer
+from models import Attendee, Event
+
+
+@pytest.fixture
+def attendees(make_event):
+    event = make_event(attendees=30, max_attendees=100)
+    return event, [person.attendee_id for person in event.attendees]
+
+
+@pytest.fixture
+def make_buffer(tmp_path, test_engine):
+    """Buffers on the test database; the flusher only runs when a test calls flush()."""
+    started = []
+
+    def make(directory=tmp_path / "log"):
+        buffer = CheckInBuffer(str(directory), sessionmaker(bind=test_engine), flush_ms=60_000).start()
+        started.append(buffer)
+        return buffer
+    yield make
+    for buffer in started:
+        if buffer._segment is not None:
+            buffer.stop()
+
+
+def checked_in(db_session, event):
+    db_session.expire_all()
+    flags = [a.check_in_status for a in db_session.query(Attendee).filter(Attendee.event_id == event.event_id)]
+    return sum(flags), db_session.get(Event, event.event_id).checked_in_count
+
+
+def test_endpoint_acknowledges_then_flushes(auth_client, db_session, attendees, make_buffer, monkeypatch):
+    event, ids = attendees
+    buffer = make_buffer()
+    monkeypatch.setattr(checkin_buffer, "_buffer", buffer)
+
+    response = auth_client.put(f"/attendees/{ids[0]}/checkin")
+    assert response.status_code == 200
+    assert response.json()["check_in_status"] is True
+    # A repeated scan before the flush is not logged twice
+    assert auth_client.put(f"/attendees/{ids[0]}/checkin").json()["check_in_status"] is True
+    assert auth_client.put("/attendees/99999/checkin").status_code == 404
+    assert checked_in(db_session, event) == (0, 0)
+
+    assert buffer.flush() == 1
+    assert checked_in(db_session, event) == (1, 1)
+    # Already applied: answered from the database without logging
+    assert auth_client.put(f"/attendees/{ids[0]}/checkin").json()["check_in_status"] is True
+    assert buffer.flush() == 0
+
+
+def test_concurrent_scans_share_the_log(db_session, attendees, make_buffer):
+    event, ids = attendees
+    buffer = make_buffer()
+    with ThreadPoolExecutor(8) as pool:
+        assert all(pool.map(buffer.submit, ids))
+    assert buffer.flush() == len(ids)
+    assert checked_in(db_session, event) == (len(ids), len(ids))
+
+
+def test_orphaned_segments_are_replayed(tmp_path, db_session, attendees, make_buffer):
+    event, ids = attendees
+    directory = tmp_path / "log"
+    directory.mkdir()
+    # A process that crashed after logging, with a torn last write
+    (directory / "1-1.log").write_bytes(b"%d\n%d\n%d\n1" % (ids[0], ids[1], ids[0]))
+    # A segment still locked by a live process is left alone
+    live = directory / "2-1.log"
+    live.write_bytes(b"%d\n" % ids[2])
+    fd = os.open(live, os.O_RDONLY)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        make_buffer(directory)
+        assert checked_in(db_session, event) == (2, 2)
+        assert not (directory / "1-1.log").exists()
+        assert live.exists()
+    finally:
+        os.close(fd)
+
+    # Replaying again (e.g. after a crash between commit and delete) counts nothing twice
+    (directory / "3-1.log").write_bytes(b"%d\n%d\n" % (ids[0], ids[2]))
+    make_buffer(directory)
+    assert checked_in(db_session, event) == (3, 3)
+    # The previously locked segment was orphaned once its owner let go
+    assert not live.exists() and not (directory / "3-1.log").exists()
+
+
+def test_new_segments_are_locked_before_recovery_can_see_them(tmp_path, db_session, attendees, make_buffer,
+                                                              monkeypatch):
+    event, ids = attendees
+    directory = tmp_path / "log"
+    buffer = make_buffer(directory)
+    other = CheckInBuffer(str(directory), buffer.session_factory)
+    lock = fcntl.flock
+
+    def flock(fd, operation):
+        # Another process starting up between creating the next segment and locking it
+        if operation == fcntl.LOCK_EX:
+            other.recover()
+        return lock(fd, operation)
+    monkeypatch.setattr(checkin_buffer.fcntl, "flock", flock)
+    assert buffer.submit(ids[0])
+    buffer.flush()
+    monkeypatch.setattr(checkin_buffer.fcntl, "flock", lock)
+
+    # The segment created by the flush survived and takes the next scan
+    assert buffer._segment.path.exists()
+    assert buffer.submit(ids[1])
+    assert checkin_buffer.read_segment(buffer._segment.path) == [ids[1]]
+
+    # A temporary file left by a crash mid-create is cleaned up once stale
+    stale = directory / "9-1.tmp"
+    stale.write_bytes(b"")
+    os.utime(stale, (0, 0))
+    other.recover()
+    assert not stale.exists()
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import database
+from database import PoolMetrics, async_url, make_engine
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./event.db", "sqlite+aiosqlite:///./event.db"),
+    ("postgresql://u:p@db/events", "postgresql+asyncpg://u:p@db/events"),
+    ("postgresql+psycopg2://u:p@db/events", "postgresql+asyncpg://u:p@db/events"),
+    ("mysql+pymysql://u:p@db/events", "mysql+aiomysql://u:p@db/events"),
+])
+def test_async_url(url, expected):
+    assert async_url(url) == expected
+
+
+def test_sqlite_engine_pragmas(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_pool_metrics(tmp_path):
+    metrics = PoolMetrics()
+    engine = make_engine(f"sqlite:///{tmp_path / 'pool.db'}", metrics=metrics,
+                         pool_size=1, max_overflow=0, pool_timeout=0.01)
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    with engine.connect():
+        pass
+
+    stats = metrics.snapshot(engine.pool)
+    assert stats["checkouts"] == 2
+    assert stats["checkout_timeouts"] == 1
+    assert stats["connections_created"] == 1
+    assert (stats["pool_size"], stats["checked_out"]) == (1, 0)
+    # The timed-out checkout waited 10ms; the recent average fades once checkouts stop
+    assert 0.0005 < metrics.recent_wait() < 0.01
+    metrics._recent_at -= 60
+    assert metrics.recent_wait() < 0.00001
+    engine.dispose()
+
+
+def test_routers_round_trip(auth_client):
+    """Exercise every router against the configured DB_MODE."""
+    event = auth_client.post("/events/", json={
+        "name": "Tech Conference",
+        "start_time": "2025-03-15T10:00:00",
+        "end_time": "2025-03-15T17:00:00",
+        "location": "New York",
+        "max_attendees": 1,
+    })
+    assert event.status_code == 200
+    event_id = event.json()["event_id"]
+
+    updated = auth_client.put(f"/events/{event_id}", json={"description": "Updated"})
+    assert updated.json()["description"] == "Updated"
+    assert auth_client.put("/events/999", json={"description": "x"}).status_code == 404
+    assert len(auth_client.get("/events/", params={"location": "New York"}).json()) == 1
+
+    attendee = {"first_name": "John", "last_name": "Doe", "email": "john@example.com",
+                "phone_number": "123", "event_id": event_id}
+    registered = auth_client.post("/attendees/", json=attendee)
+    assert registered.status_code == 200
+    full = auth_client.post("/attendees/", json={**attendee, "email": "jane@example.com"})
+    assert full.status_code == 400
+    assert full.json()["detail"] == "Event is fully booked"
+
+    checked_in = auth_client.put(f"/attendees/{registered.json()['attendee_id']}/checkin")
+    assert checked_in.json()["check_in_status"] is True
+    assert auth_client.put("/attendees/999/checkin").status_code == 404
+
+    attendees = auth_client.get("/attendees/attendees", params={"event_id": event_id})
+    assert [a["email"] for a in attendees.json()] == ["john@example.com"]
+
+    credentials = {"email": "organizer@example.com", "password": "s3cret"}
+    assert auth_client.post("/auth_routes/register", json=credentials).status_code == 200
+    assert auth_client.post("/auth_routes/register", json=credentials).status_code == 400
+    token = auth_client.post("/auth_routes/token", data={"username": credentials["email"], "password": "s3cret"})
+    assert token.json()["token_type"] == "bearer"
+    bad = auth_client.post("/auth_routes/token", data={"username": credentials["email"], "password": "wrong"})
+    assert bad.status_code == 401
+
+
+def test_forked_child_gets_fresh_pool(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'fork.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    parent_pool = engine.pool
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: the inherited pooled connection must be gone, and a new one must work
+        ok = engine.pool is not parent_pool and engine.pool.checkedin() == 0
+        with engine.connect() as conn:
+            ok = ok and conn.execute(text("SELECT 1")).scalar() == 1
+        os.write(write_end, b"1" if ok else b"0")
+        os._exit(0)
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b"1"
+    # The parent's pooled connection survived the child's reset
+    assert engine.pool is parent_pool and engine.pool.checkedin() == 1
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    engine.dispose()
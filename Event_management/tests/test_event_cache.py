@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event as sa_event
+
+import event_cache
+from models import Event
+
+
+@pytest.fixture
+def events(db_session):
+    rows = [
+        Event(name=name, start_time=datetime(2025, 3, 15, 10 + n), end_time=datetime(2025, 3, 15, 18),
+              location=location, max_attendees=1)
+        for n, (name, location) in enumerate([("Paris Meetup", "Paris"), ("Berlin Meetup", "Berlin")])
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+@pytest.fixture
+def statements(test_engine):
+    executed = []
+    listener = lambda conn, cursor, statement, *args: executed.append(statement)
+    sa_event.listen(test_engine, "before_cursor_execute", listener)
+    yield executed
+    sa_event.remove(test_engine, "before_cursor_execute", listener)
+
+
+def test_get_event_reads_through(db_session, events, statements):
+    paris = events[0].event_id
+    db_session.expunge_all()
+    queries = len(statements)
+    assert event_cache.get_event(db_session, paris)["location"] == "Paris"
+    db_session.expunge_all()
+    assert event_cache.get_event(db_session, paris)["name"] == "Paris Meetup"
+    assert len(statements) == queries + 1
+    assert "registered_count" not in event_cache.get_event(db_session, paris)
+    assert event_cache.get_event(db_session, 999) is None
+
+
+def test_load_racing_an_update_is_not_cached(db_session, events, test_engine, statements):
+    paris = events[0].event_id
+    db_session.expunge_all()
+
+    def update_during_load(*args):
+        # A write commits and invalidates after the reader's SELECT has seen the old row
+        event_cache.invalidate_event(paris)
+    sa_event.listen(test_engine, "after_cursor_execute", update_during_load)
+    try:
+        assert event_cache.get_event(db_session, paris)["name"] == "Paris Meetup"
+    finally:
+        sa_event.remove(test_engine, "after_cursor_execute", update_during_load)
+
+    db_session.expunge_all()
+    queries = len(statements)
+    event_cache.get_event(db_session, paris)
+    assert len(statements) == queries + 1
+
+
+def test_listing_is_cached_until_an_event_write(auth_client, events, statements):
+    first = auth_client.get("/events/", params={"location": "Paris"}).json()
+    queries = len(statements)
+    assert auth_client.get("/events/", params={"location": "Paris"}).json() == first
+    assert len(statements) == queries
+
+    # Creating an event in Paris invalidates Paris listings only
+    berlin_key = event_cache.listing_key(None, "Berlin", 100, None, None)
+    auth_client.post("/events/", json={
+        "name": "Paris Late", "start_time": "2025-03-16T10:00:00", "end_time": "2025-03-16T12:00:00",
+        "location": "Paris", "max_attendees": 5,
+    })
+    assert event_cache.listing_key(None, "Berlin", 100, None, None) == berlin_key
+    assert [e["name"] for e in auth_client.get("/events/", params={"location": "Paris"}).json()] == [
+        "Paris Meetup", "Paris Late",
+    ]
+
+
+def test_update_invalidates_old_and_new_partitions(auth_client, events):
+    berlin = events[1].event_id
+    assert len(auth_client.get("/events/", params={"location": "Berlin"}).json()) == 1
+    assert len(auth_client.get("/events/", params={"location": "Paris"}).json()) == 1
+
+    auth_client.put(f"/events/{berlin}", json={"location": "Paris"})
+
+    assert auth_client.get("/events/", params={"location": "Berlin"}).status_code == 404
+    assert len(auth_client.get("/events/", params={"location": "Paris"}).json()) == 2
+    assert auth_client.get("/events/").json()[1]["location"] == "Paris"
+
+
+def test_bulk_upload_to_full_event(auth_client, db_session, events):
+    paris = events[0]
+    paris.registered_count = paris.max_attendees
+    db_session.commit()
+    csv_body = f"first_name,last_name,email,phone_number,event_id\nA,B,a@example.com,1,{paris.event_id}\n"
+    response = auth_client.post(f"/attendees/attendee/{paris.event_id}/bulk-upload",
+                                files={"file": ("a.csv", csv_body, "text/csv")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Max attendees limit reached"
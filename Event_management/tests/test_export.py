@@ -0,0 +1,47 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from models import Attendee, Event
+
+
+@pytest.fixture
+def event_id(db_session):
+    event = Event(name="Expo", start_time=datetime(2025, 6, 1, 9), end_time=datetime(2025, 6, 1, 18),
+                  location="Oslo", max_attendees=10)
+    db_session.add(event)
+    db_session.commit()
+    db_session.add_all([
+        Attendee(first_name="Ann", last_name="Lee", email="ann@example.com", phone_number="1",
+                 event_id=event.event_id, check_in_status=True),
+        Attendee(first_name="Bo", last_name="Ng", email="bo@example.com", phone_number="2",
+                 event_id=event.event_id, check_in_status=False),
+    ])
+    db_session.commit()
+    return event.event_id
+
+
+def test_export_csv(auth_client, event_id):
+    response = auth_client.get(f"/attendees/attendee/{event_id}/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "attendee_id,first_name,last_name,email,phone_number,event_id,check_in_status",
+        f"1,Ann,Lee,ann@example.com,1,{event_id},True",
+        f"2,Bo,Ng,bo@example.com,2,{event_id},False",
+    ]
+
+
+def test_export_ndjson_gzip(auth_client, event_id):
+    response = auth_client.get(f"/attendees/attendee/{event_id}/export",
+                               params={"format": "ndjson", "gzip": True})
+    assert response.headers["content-encoding"] == "gzip"
+    # httpx transparently decompresses the body
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["email"] for row in rows] == ["ann@example.com", "bo@example.com"]
+    assert rows[0]["check_in_status"] is True
+
+
+def test_export_unknown_event(auth_client):
+    assert auth_client.get("/attendees/attendee/999/export").status_code == 404
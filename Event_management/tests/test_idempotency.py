@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+import idempotency
+import jobs
+from benchmarks.datagen import attendee_csv
+from idempotency import Fingerprint
+from models import Attendee, Event, Job
+from shared_state import SQLiteBackend
+
+
+@pytest.fixture
+def event(make_event):
+    return make_event(max_attendees=100).event_id
+
+
+def person(email, event_id):
+    return {"first_name": "Re", "last_name": "Try", "email": email, "phone_number": "1", "event_id": event_id}
+
+
+def attendees(db_session):
+    return db_session.scalar(select(func.count()).select_from(Attendee))
+
+
+def test_idempotency_key_replays_response(auth_client, db_session, event):
+    headers = {"Idempotency-Key": "scan-1"}
+    first = auth_client.post("/attendees/", json=person("a@example.com", event), headers=headers)
+    assert first.status_code == 200
+    retry = auth_client.post("/attendees/", json=person("a@example.com", event), headers=headers)
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert attendees(db_session) == 1
+
+    # Same key, different request
+    other = auth_client.post("/attendees/", json=person("b@example.com", event), headers=headers)
+    assert other.status_code == 422
+    # Without a key the duplicate reaches the endpoint and is rejected cleanly
+    duplicate = auth_client.post("/attendees/", json=person("a@example.com", event))
+    assert duplicate.status_code == 409
+
+
+def test_shared_store_is_used_off_the_event_loop(auth_client, db_session, event, monkeypatch, tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "state.db"))
+    calls = []
+    for method in ("get", "add", "set"):
+        def spy(*args, _call=getattr(backend, method), _method=method):
+            try:
+                asyncio.get_running_loop()
+                calls.append((_method, "loop"))
+            except RuntimeError:
+                calls.append((_method, "thread"))
+            return _call(*args)
+        monkeypatch.setattr(backend, method, spy)
+    monkeypatch.setattr(idempotency, "store", backend)
+
+    headers = {"Idempotency-Key": "scan-2"}
+    first = auth_client.post("/attendees/", json=person("c@example.com", event), headers=headers)
+    retry = auth_client.post("/attendees/", json=person("c@example.com", event), headers=headers)
+    assert retry.json() == first.json() and retry.headers["Idempotent-Replayed"] == "true"
+    assert calls == [("get", "thread"), ("add", "thread"), ("set", "thread"), ("get", "thread")]
+
+
+def test_unique_violation_is_a_conflict(auth_client, db_session, event):
+    # Simulate losing the race to a concurrent registration of the same email
+    db_session.add(Attendee(**person("race@example.com", event)))
+    db_session.commit()
+    response = auth_client.post("/attendees/", json=person("race@example.com", event))
+    assert response.status_code == 409
+    assert attendees(db_session) == 1
+    db_session.expire_all()
+    assert db_session.get(Event, event).registered_count == 0
+
+
+def test_duplicate_upload_is_not_processed_again(auth_client, db_session, event, monkeypatch, tmp_path):
+    body = attendee_csv(event, 5)
+    first = auth_client.post(f"/attendees/attendee/{event}/bulk-upload", files={"file": ("a.csv", body, "text/csv")})
+    assert first.status_code == 200 and first.json()["added"] == 5
+
+    calls = []
+    monkeypatch.setattr("routers.attendence.import_attendees", lambda *args: calls.append(args))
+    retry = auth_client.post(f"/attendees/attendee/{event}/bulk-upload", files={"file": ("b.csv", body, "text/csv")})
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["X-Duplicate-Upload"] == "true"
+    assert calls == []
+
+    # Background duplicates point at the job already queued
+    monkeypatch.setattr("config.JOB_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(jobs, "wake_workers", lambda: None)
+    checkins = b"email\n" + b"".join(b"bulk%d@example.com\n" % n for n in range(5))
+    upload = {"file": ("c.csv", checkins, "text/csv")}
+    queued = auth_client.post(f"/attendees/attendee/{event}/bulk-check-in", params={"background": True}, files=upload)
+    again = auth_client.post(f"/attendees/attendee/{event}/bulk-check-in", params={"background": True}, files=upload)
+    assert queued.status_code == again.status_code == 202
+    assert again.json()["job_id"] == queued.json()["job_id"]
+    assert db_session.scalar(select(func.count()).select_from(Job)) == 1
+
+
+def test_duplicate_upload_can_be_processed_again(auth_client, db_session, event):
+    url = f"/attendees/attendee/{event}/bulk-upload"
+    upload = {"file": ("a.csv", attendee_csv(event, 5), "text/csv")}
+    assert auth_client.post(url, files=upload).json()["added"] == 5
+
+    # Asked for explicitly, or with an Idempotency-Key, the file is imported again
+    forced = auth_client.post(url, params={"force": True}, files=upload)
+    assert "X-Duplicate-Upload" not in forced.headers
+    assert forced.json()["added"] == 0 and len(forced.json()["rejected"]) == 5
+    keyed = auth_client.post(url, files=upload, headers={"Idempotency-Key": "upload-2"})
+    assert "X-Duplicate-Upload" not in keyed.headers and keyed.json()["added"] == 0
+
+    # Raising the capacity lets in rows that the full event turned away
+    assert auth_client.put(f"/events/{event}", json={"max_attendees": 6}).status_code == 200
+    upload = {"file": ("b.csv", attendee_csv(event, 3, 100), "text/csv")}
+    assert auth_client.post(url, files=upload).json()["added"] == 1
+    assert auth_client.put(f"/events/{event}", json={"max_attendees": 10}).status_code == 200
+    retry = auth_client.post(url, files=upload)
+    assert "X-Duplicate-Upload" not in retry.headers and retry.json()["added"] == 2
+    assert attendees(db_session) == 8
+
+
+def test_repeated_check_in_file_reaches_new_registrations(auth_client, db_session, event):
+    url = f"/attendees/attendee/{event}/bulk-check-in"
+    register = f"/attendees/attendee/{event}/bulk-upload"
+    assert auth_client.post(register, files={"file": ("a.csv", attendee_csv(event, 2), "text/csv")}).status_code == 200
+    upload = {"file": ("doors.csv", b"email\n" + b"".join(b"bulk%d@example.com\n" % n for n in range(3)), "text/csv")}
+    first = auth_client.post(url, files=upload).json()
+    assert auth_client.post(url, files=upload).headers["X-Duplicate-Upload"] == "true"
+
+    # bulk2 registers afterwards: the same list now checks them in
+    auth_client.post(register, files={"file": ("b.csv", attendee_csv(event, 1, 2), "text/csv")})
+    again = auth_client.post(url, files=upload)
+    assert "X-Duplicate-Upload" not in again.headers
+    assert first["checked_in"] == 2
+    assert again.json()["checked_in"] == 1
+
+
+def test_multipart_fingerprint_ignores_boundary():
+    def fingerprint(boundary: bytes, chunk_size: int):
+        body = b"--%s\r\nContent-Disposition: form-data; name=file\r\n\r\nemail\r\n--%s--\r\n" % (boundary, boundary)
+        fp = Fingerprint(b"multipart/form-data; boundary=" + boundary)
+        for start in range(0, len(body), chunk_size):
+            fp.update(body[start:start + chunk_size])
+        return fp.hexdigest()
+
+    assert fingerprint(b"abc123", 7) == fingerprint(b"zz9xy8w", 3) == fingerprint(b"q", 100)
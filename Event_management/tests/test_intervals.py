@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from models import Event, EventStatus
+
+
+def at(day: int, hour: int) -> datetime:
+    return datetime(2025, 3, day, hour)
+
+
+@pytest.fixture
+def events(db_session):
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = [
+        Event(name="Morning", location="Hall A", start_time=at(15, 9), end_time=at(15, 12), max_attendees=10),
+        Event(name="Afternoon", location="Hall A", start_time=at(15, 13), end_time=at(15, 17), max_attendees=10),
+        Event(name="Festival", location="Park", start_time=at(14, 10), end_time=at(16, 22), max_attendees=10),
+        Event(name="Canceled", location="Hall A", start_time=at(15, 9), end_time=at(15, 18), max_attendees=10,
+              status=EventStatus.canceled),
+        Event(name="Live", location="Hall B", start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1),
+              max_attendees=10),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return {event.name: event.event_id for event in rows}
+
+
+def names(response):
+    assert response.status_code == 200, response.text
+    return [event["name"] for event in response.json()]
+
+
+def test_window_filters(auth_client, events):
+    window = {"from": "2025-03-15T11:00:00", "to": "2025-03-15T13:00:00"}
+    assert names(auth_client.get("/events/", params=window)) == ["Festival", "Morning", "Canceled"]
+    # Back-to-back: ending at `from` or starting at `to` is not an overlap
+    window = {"from": "2025-03-15T12:00:00", "to": "2025-03-15T13:00:00"}
+    assert names(auth_client.get("/events/", params={**window, "location": "Hall A"})) == ["Canceled"]
+    assert names(auth_client.get("/events/", params={"from": "2025-03-16T00:00:00", "to": "2025-03-17T00:00:00"})) == [
+        "Festival",
+    ]
+    # Aware bounds are compared in UTC
+    assert names(auth_client.get("/events/", params={"from": "2025-03-16T23:00:00+02:00", "to": "2025-03-17T00:00:00"})) == [
+        "Festival",
+    ]
+    assert auth_client.get("/events/", params={"from": "2025-03-16T00:00:00", "to": "2025-03-15T00:00:00"}).status_code == 400
+
+
+def test_happening_now(auth_client, events):
+    assert names(auth_client.get("/events/", params={"happening_now": True})) == ["Live"]
+
+
+def test_venue_conflicts_on_create_and_update(auth_client, events):
+    body = {"name": "Workshop", "location": "Hall A", "start_time": "2025-03-15T11:00:00",
+            "end_time": "2025-03-15T14:00:00", "max_attendees": 5}
+    rejected = auth_client.post("/events/", params={"reject_overlap": True}, json=body)
+    assert rejected.status_code == 409
+    assert [c["event_id"] for c in rejected.json()["detail"]["conflicts"]] == [events["Morning"], events["Afternoon"]]
+
+    # Without reject_overlap the event is created and the conflicts reported
+    created = auth_client.post("/events/", json=body)
+    assert created.status_code == 200
+    assert created.headers["X-Venue-Conflicts"] == f"{events['Morning']},{events['Afternoon']}"
+
+    quiet = auth_client.post("/events/", json={**body, "location": "Hall C"})
+    assert "X-Venue-Conflicts" not in quiet.headers
+    moved = auth_client.put(f"/events/{quiet.json()['event_id']}", params={"reject_overlap": True},
+                            json={"location": "Park"})
+    assert moved.status_code == 409
+    assert auth_client.put(f"/events/{events['Morning']}", json={"description": "Coffee"}).headers.get(
+        "X-Venue-Conflicts") is None
+
+
+def test_event_times_are_validated(auth_client, monkeypatch):
+    body = {"name": "Backwards", "location": "Hall A", "start_time": "2025-03-15T11:00:00",
+            "end_time": "2025-03-15T10:00:00", "max_attendees": 5}
+    assert auth_client.post("/events/", json=body).status_code == 400
+    monkeypatch.setattr(config, "MAX_EVENT_DURATION_HOURS", 24)
+    assert auth_client.post("/events/", json={**body, "end_time": "2025-03-17T10:00:00"}).status_code == 400
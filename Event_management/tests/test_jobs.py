@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import config
+import jobs
+from benchmarks.datagen import attendee_csv
+from models import Attendee, Event, Job, JobStatus
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOB_SPOOL_DIR", str(tmp_path / "spool"))
+    return tmp_path / "spool"
+
+
+@pytest.fixture
+def event(make_event):
+    return make_event(max_attendees=100)
+
+
+@pytest.fixture
+def runner(test_engine):
+    return jobs.JobRunner(sessionmaker(bind=test_engine), chunk_size=4)
+
+
+def upload(client, event_id, body, kind="bulk-upload"):
+    files = {"file": ("a.csv", body, "text/csv")}
+    return client.post(f"/attendees/attendee/{event_id}/{kind}", params={"background": True}, files=files)
+
+
+def test_background_upload_is_processed_by_worker(auth_client, db_session, event, runner, spool_dir):
+    response = upload(auth_client, event.event_id, attendee_csv(event.event_id, 10))
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["rows_total"] == 10
+    assert auth_client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+
+    assert runner.run_pending() == 1
+
+    job = auth_client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "succeeded"
+    assert job["rows_done"] == 10 and job["progress"] == 1.0
+    assert job["result"]["added"] == 10
+    assert db_session.query(Attendee).count() == 10
+    assert list(spool_dir.iterdir()) == []
+
+
+def test_background_check_in(auth_client, event, runner):
+    upload(auth_client, event.event_id, attendee_csv(event.event_id, 3))
+    runner.run_pending()
+    job_id = upload(auth_client, event.event_id, "email\nbulk0@example.com\nbulk1@example.com\nnobody@example.com\n",
+                    kind="bulk-check-in").json()["job_id"]
+    runner.run_pending()
+    result = auth_client.get(f"/jobs/{job_id}").json()["result"]
+    assert result == {"checked_in": 2, "already_checked_in": 0, "unknown": 1}
+    assert auth_client.get(f"/events/{event.event_id}/occupancy").json()["checked_in"] == 2
+
+
+def test_interrupted_job_resumes_without_duplicates(auth_client, db_session, event, test_engine):
+    job_id = upload(auth_client, event.event_id, attendee_csv(event.event_id, 10)).json()["job_id"]
+    Session = sessionmaker(bind=test_engine)
+
+    # A shutdown after the first chunk requeues the job with its progress
+    jobs.JobRunner(Session, chunk_size=4, should_stop=lambda: True).run_next()
+    job = db_session.get(Job, job_id)
+    assert (job.status, job.rows_done) == (JobStatus.queued, 4)
+
+    # A crashed worker: claimed, but its heartbeat went stale
+    crashed = jobs.JobRunner(Session, chunk_size=4, worker_id="crashed")
+    with Session() as db:
+        assert crashed.claim(db) == job_id
+        db.query(Job).filter_by(job_id=job_id).update({"heartbeat_at": datetime.utcnow() - timedelta(hours=1)})
+        db.commit()
+
+    assert jobs.JobRunner(Session, chunk_size=4).run_pending() == 1
+    db_session.expire_all()
+    job = db_session.get(Job, job_id)
+    assert job.status == JobStatus.succeeded
+    assert job.result["added"] == 10 and job.result["rejected_count"] == 0
+    assert db_session.query(Attendee).count() == 10
+    assert db_session.get(Event, event.event_id).registered_count == 10
+
+
+def test_cancel(auth_client, event, runner, spool_dir):
+    job_id = upload(auth_client, event.event_id, attendee_csv(event.event_id, 5)).json()["job_id"]
+    assert auth_client.post(f"/jobs/{job_id}/cancel").json()["status"] == "canceled"
+    assert runner.run_pending() == 0
+    assert list(spool_dir.iterdir()) == []
+    assert auth_client.post(f"/jobs/{job_id}/cancel").status_code == 409
+    assert auth_client.post("/jobs/missing/cancel").status_code == 404
+
+
+def test_background_upload_validates_up_front(auth_client, event):
+    assert upload(auth_client, event.event_id, "wrong,header\n").status_code == 400
+    assert upload(auth_client, 999, attendee_csv(999, 1)).status_code == 404
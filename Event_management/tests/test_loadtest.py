@@ -0,0 +1,76 @@
+import json
+
+import auth
+import config
+from benchmarks.loadtest import compare, failures, main, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) == 0.0
+
+
+def test_compare_flags_regressions():
+    base = {"scenarios": {"listing": {"p99_ms": 10.0, "throughput_rps": 100.0, "errors": 0}}}
+    same = {"scenarios": {"listing": {"p99_ms": 11.0, "throughput_rps": 90.0, "errors": 0}}}
+    worse = {"scenarios": {"listing": {"p99_ms": 20.0, "throughput_rps": 50.0, "errors": 3}}}
+    assert compare(base, same, tolerance=0.2) == []
+    assert len(compare(base, worse, tolerance=0.2)) == 3
+
+
+def test_failures_count_errors_and_rejections():
+    results = {"scenarios": {
+        "listing": {"requests": 100, "errors": 1, "rejected": 0},
+        "login": {"requests": 100, "errors": 1, "rejected": 5},
+    }}
+    assert failures(results, max_error_rate=0.01) == ["login: 1 errors and 5 rejected of 100 requests"]
+    assert failures(results, max_error_rate=0.1) == []
+
+
+def test_harness_smoke_run(tmp_path):
+    output = tmp_path / "results.json"
+    args = ["--events", "2", "--attendees", "20", "--requests", "10", "--concurrency", "2",
+            "--login-users", "1", "--scenarios", "listing", "door_check_in"]
+    assert main(args + ["--database-url", f"sqlite:///{tmp_path / 'a.db'}", "--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert results["scenarios"]["listing"]["requests"] == 10
+    assert results["scenarios"]["door_check_in"]["errors"] == 0
+    # Generous tolerance: only checks that comparison against a baseline passes
+    rerun = args + ["--database-url", f"sqlite:///{tmp_path / 'b.db'}", "--baseline", str(output), "--tolerance", "10"]
+    assert main(rerun) == 0
+
+
+def test_default_limits_admit_the_load_test(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT", False)
+    output = tmp_path / "results.json"
+    args = ["--events", "2", "--attendees", "20", "--requests", "100", "--concurrency", "4",
+            "--scenarios", "listing", "door_check_in", "bulk_upload", "--bulk-rows", "5", "--output", str(output)]
+    assert main(args + ["--database-url", f"sqlite:///{tmp_path / 'a.db'}", "--admission"]) == 0
+    results = json.loads(output.read_text())
+    assert results["meta"]["admission"]
+    assert all(result["rejected"] == 0 for result in results["scenarios"].values())
+    assert not config.RATE_LIMIT
+
+    # Tight limits: 429s are counted apart from errors and fail the run
+    monkeypatch.setattr(config, "RATE_LIMIT_BURST", 2)
+    monkeypatch.setattr(config, "RATE_LIMIT_RPS", 0.01)
+    args = ["--events", "2", "--attendees", "20", "--requests", "10", "--concurrency", "2",
+            "--login-users", "1", "--scenarios", "listing", "--output", str(output)]
+    assert main(args + ["--database-url", f"sqlite:///{tmp_path / 'b.db'}", "--admission"]) == 1
+    listing = json.loads(output.read_text())["scenarios"]["listing"]
+    assert listing["rejected"] >= 8 and listing["errors"] == 0
+
+
+def test_login_scenario_spreads_over_enough_accounts(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LOGIN_CONCURRENCY_PER_ACCOUNT", 2)
+    monkeypatch.setattr(auth, "LOGIN_CONCURRENCY_PER_ACCOUNT", 2)
+    output = tmp_path / "results.json"
+    args = ["--events", "1", "--attendees", "5", "--requests", "150", "--concurrency", "4",
+            "--scenarios", "login", "--output", str(output), "--database-url", f"sqlite:///{tmp_path / 'a.db'}"]
+    assert main(args) == 0
+    login = json.loads(output.read_text())["scenarios"]["login"]
+    assert login["requests"] == 6
+    assert login["errors"] == login["rejected"] == 0
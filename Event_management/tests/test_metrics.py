@@ -0,0 +1,48 @@
+import logging
+
+import config
+from metrics import REQUEST_DB_QUERIES, REQUESTS, Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    samples = {name + labels: value for name, labels, value in histogram.samples()}
+    assert samples['demo_seconds_bucket{route="/a",le="0.1"}'] == 1
+    assert samples['demo_seconds_bucket{route="/a",le="1.0"}'] == 2
+    assert samples['demo_seconds_bucket{route="/a",le="+Inf"}'] == 3
+    assert samples['demo_seconds_count{route="/a"}'] == 3
+
+
+def test_requests_are_labelled_by_route_template(auth_client, make_event):
+    event = make_event(attendees=1)
+    before = REQUESTS.value("GET", "/attendees/attendees", "200")
+    queries_before = REQUEST_DB_QUERIES.count("GET", "/attendees/attendees")
+
+    response = auth_client.get("/attendees/attendees", params={"event_id": event.event_id})
+    assert response.status_code == 200
+    assert 'desc="' in response.headers["server-timing"]
+
+    assert REQUESTS.value("GET", "/attendees/attendees", "200") == before + 1
+    assert REQUEST_DB_QUERIES.count("GET", "/attendees/attendees") == queries_before + 1
+    auth_client.get(f"/attendees/attendee/{event.event_id}/export")
+    assert REQUESTS.value("GET", "/attendees/attendee/{event_id}/export", "200") >= 1
+
+
+def test_metrics_endpoint_exposes_requests_and_pool(auth_client):
+    auth_client.get("/events/")
+    body = auth_client.get("/metrics").text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_requests_total{method="GET",route="/events/"' in body
+    assert "db_pool_checkouts_total" in body
+
+
+def test_slow_requests_log_their_sql(auth_client, make_event, monkeypatch, caplog):
+    event = make_event(attendees=1)
+    monkeypatch.setattr(config, "SLOW_REQUEST_MS", 0.001)
+    with caplog.at_level(logging.WARNING, logger="event_management.slow_requests"):
+        auth_client.get("/attendees/attendees", params={"event_id": event.event_id})
+    assert "GET /attendees/attendees (/attendees/attendees) -> 200" in caplog.text
+    assert "FROM attendees" in caplog.text
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+import occupancy
+from models import Attendee
+
+
+@pytest.fixture
+def event(make_event):
+    return make_event(attendees=3)
+
+
+def occupancy_of(client, event_id):
+    response = client.get(f"/events/{event_id}/occupancy")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_check_in_counts_once(auth_client, db_session, event):
+    attendee_id = db_session.query(Attendee.attendee_id).first()[0]
+    assert occupancy_of(auth_client, event.event_id) == {
+        "event_id": event.event_id, "capacity": 10, "registered": 3, "checked_in": 0, "remaining": 7,
+    }
+
+    for _ in range(2):
+        assert auth_client.put(f"/attendees/{attendee_id}/checkin").json()["check_in_status"] is True
+    assert occupancy_of(auth_client, event.event_id)["checked_in"] == 1
+
+    files = {"file": ("c.csv", "email\na0@example.com\na1@example.com\na2@example.com\n", "text/csv")}
+    auth_client.post(f"/attendees/attendee/{event.event_id}/bulk-check-in", files=files)
+    assert occupancy_of(auth_client, event.event_id)["checked_in"] == 3
+
+    auth_client.post("/attendees/", json={"first_name": "N", "last_name": "W", "email": "new@example.com",
+                                          "phone_number": "1", "event_id": event.event_id})
+    assert occupancy_of(auth_client, event.event_id)["remaining"] == 6
+    assert auth_client.get("/events/999/occupancy").status_code == 404
+    assert auth_client.get("/events/999/occupancy/stream").status_code == 404
+
+
+def test_stream_pushes_snapshot_then_deltas(test_engine, event):
+    event_id = event.event_id
+
+    async def scenario():
+        events = occupancy.stream(test_engine, event_id, resync_seconds=0.05)
+        first = await anext(events)
+        occupancy.broker.publish(event_id, checked_in=2)
+        delta = await anext(events)
+        resync = await anext(events)
+        assert occupancy.broker.subscriber_count(event_id) == 1
+        await events.aclose()
+        assert occupancy.broker.subscriber_count(event_id) == 0
+        return first, delta, resync
+
+    first, delta, resync = asyncio.run(scenario())
+    assert first.startswith("event: snapshot\n")
+    assert json.loads(first.split("data: ")[1])["registered"] == 3
+    assert delta.startswith("event: delta\n")
+    assert json.loads(delta.split("data: ")[1]) == {"event_id": event_id, "registered": 0, "checked_in": 2}
+    assert resync.startswith("event: snapshot\n")
+
+
+def test_stream_resyncs_while_deltas_keep_arriving(test_engine, event):
+    event_id = event.event_id
+
+    async def publish():
+        while True:
+            occupancy.broker.publish(event_id, checked_in=1)
+            await asyncio.sleep(0.005)
+
+    async def scenario():
+        events = occupancy.stream(test_engine, event_id, resync_seconds=0.05)
+        received = [await anext(events)]
+        publisher = asyncio.create_task(publish())
+
+        async def until_snapshot():
+            while len(received) == 1 or not received[-1].startswith("event: snapshot\n"):
+                received.append(await anext(events))
+        try:
+            await asyncio.wait_for(until_snapshot(), timeout=1)
+        finally:
+            publisher.cancel()
+            await events.aclose()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received[0].startswith("event: snapshot\n")
+    assert received[-1].startswith("event: snapshot\n")
+    assert all(message.startswith("event: delta\n") for message in received[1:-1])
+    assert len(received) > 3
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Attendee, Event
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, parse_fields
+
+
+def test_cursor_round_trip():
+    when = datetime(2025, 3, 15, 10, 30)
+    assert decode_cursor(encode_cursor(when, 7), 2) == [when.isoformat(), 7]
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", 2)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(1), 2)
+
+
+def test_parse_fields():
+    allowed = {"a": 1, "b": 2, "c": 3}
+    assert parse_fields(None, allowed) == ["a", "b", "c"]
+    assert parse_fields("c, a,c", allowed) == ["c", "a"]
+    with pytest.raises(ValueError):
+        parse_fields("a,zzz", allowed)
+
+
+@pytest.fixture
+def events(db_session):
+    start = datetime(2025, 1, 1, 9)
+    # Two events share a start time to exercise the event_id tie-break
+    rows = [
+        Event(name=f"Event {n}", start_time=start + timedelta(hours=n // 2), end_time=start + timedelta(hours=n // 2 + 1),
+              location="Berlin" if n % 2 else "Paris", max_attendees=10)
+        for n in range(5)
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def collect_pages(client, url, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+def test_list_events_pages_in_start_time_order(auth_client, events):
+    pages = collect_pages(auth_client, "/events/", limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [e["name"] for page in pages for e in page] == [f"Event {n}" for n in range(5)]
+
+
+def test_list_events_projection_and_filter(auth_client, events):
+    response = auth_client.get("/events/", params={"fields": "name", "location": "Berlin"})
+    assert response.json() == [{"name": "Event 1"}, {"name": "Event 3"}]
+    assert auth_client.get("/events/", params={"fields": "nope"}).status_code == 400
+    assert auth_client.get("/events/", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_get_attendees_pages_and_projects(auth_client, db_session, events):
+    event_id = events[0].event_id
+    db_session.add_all([
+        Attendee(first_name="A", last_name=str(n), email=f"a{n}@example.com", phone_number="555", event_id=event_id)
+        for n in range(3)
+    ])
+    db_session.commit()
+
+    pages = collect_pages(auth_client, "/attendees/attendees", event_id=event_id, limit=2, fields="email,phone")
+    assert pages == [
+        [{"email": "a0@example.com", "phone": "555"}, {"email": "a1@example.com", "phone": "555"}],
+        [{"email": "a2@example.com", "phone": "555"}],
+    ]
+    missing = auth_client.get("/attendees/attendees", params={"event_id": 999})
+    assert missing.status_code == 404
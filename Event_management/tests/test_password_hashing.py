@@ -0,0 +1,37 @@
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+import auth
+from auth import login_slot, pwd_context
+from config import BCRYPT_ROUNDS
+from models import User
+
+
+def test_login_rehashes_when_cost_changes(auth_client, db_session):
+    cheap = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    db_session.add(User(email="old@example.com", password=cheap.hash("pw")))
+    db_session.commit()
+
+    response = auth_client.post("/auth_routes/token", data={"username": "old@example.com", "password": "pw"})
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    stored = db_session.query(User).filter(User.email == "old@example.com").one().password
+    assert stored.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    assert not pwd_context.needs_update(stored)
+    assert pwd_context.verify("pw", stored)
+
+
+def test_login_slot_caps_concurrency_per_account(monkeypatch):
+    monkeypatch.setattr(auth, "LOGIN_CONCURRENCY_PER_ACCOUNT", 1)
+    with login_slot("a@example.com"):
+        with pytest.raises(HTTPException) as exc:
+            with login_slot("a@example.com"):
+                pass
+        assert exc.value.status_code == 429
+        # Other accounts are unaffected
+        with login_slot("b@example.com"):
+            pass
+    with login_slot("a@example.com"):
+        pass
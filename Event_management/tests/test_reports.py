@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select
+
+import capacity
+import occupancy
+import reporting
+from models import EventGroupStats
+
+
+def create(client, name, location, max_attendees=10, day=15):
+    response = client.post("/events/", json={
+        "name": name, "location": location, "max_attendees": max_attendees,
+        "start_time": f"2025-03-{day}T10:00:00", "end_time": f"2025-03-{day}T12:00:00",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["event_id"]
+
+
+def register(client, event_id, count):
+    ids = []
+    for n in range(count):
+        response = client.post("/attendees/", json={"first_name": "R", "last_name": f"Eg{n}", "email": f"r{n}@example.com",
+                                                   "phone_number": "1", "event_id": event_id})
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["attendee_id"])
+    return ids
+
+
+def groups(client, **params):
+    response = client.get("/reports/utilization", params=params)
+    assert response.status_code == 200, response.text
+    return {tuple(row.get(key) for key in ("location", "status")): row for row in response.json()}
+
+
+def group_totals(db_session):
+    db_session.expire_all()
+    rows = db_session.execute(select(EventGroupStats.location, EventGroupStats.status, EventGroupStats.events,
+                                     EventGroupStats.capacity, EventGroupStats.registered, EventGroupStats.checked_in))
+    totals = {}
+    for location, status, *counts in rows:
+        current = totals.get((location, status), [0, 0, 0, 0])
+        totals[(location, status)] = [a + b for a, b in zip(current, counts)]
+    return {key: value for key, value in totals.items() if any(value)}
+
+
+def test_rollups_follow_registrations_check_ins_and_updates(auth_client, db_session):
+    oslo = create(auth_client, "Talk", "Oslo")
+    workshop = create(auth_client, "Workshop", "Oslo", max_attendees=30, day=16)
+    rome = create(auth_client, "Meetup", "Rome")
+    attendees = register(auth_client, oslo, 4)
+    register(auth_client, workshop, 2)
+    batch = [{"first_name": "B", "last_name": "At", "email": f"b{n}@example.com", "phone_number": "1",
+              "event_id": rome} for n in range(3)]
+    assert auth_client.post("/attendees/batch", json=batch).status_code == 200
+    auth_client.put(f"/attendees/{attendees[0]}/checkin")
+    auth_client.put("/attendees/checkin/batch", json=attendees[1:3])
+
+    report = groups(auth_client)
+    assert report[("Oslo", "scheduled")] == {
+        "location": "Oslo", "status": "scheduled", "events": 2, "capacity": 40, "registered": 6, "checked_in": 3,
+        "utilization": 0.15, "check_in_rate": 0.5, "no_show_rate": None,
+    }
+    assert report[("Rome", "scheduled")]["registered"] == 3
+
+    # Completing the Oslo talk moves its totals to the completed group
+    assert auth_client.put(f"/events/{oslo}", json={"status": "completed", "max_attendees": 12}).status_code == 200
+    report = groups(auth_client)
+    assert report[("Oslo", "scheduled")]["events"] == 1
+    assert report[("Oslo", "scheduled")]["registered"] == 2
+    assert report[("Oslo", "completed")]["capacity"] == 12
+    assert report[("Oslo", "completed")]["no_show_rate"] == 0.25
+    # By location only, and filtered
+    assert groups(auth_client, group_by="location")[("Oslo", None)]["registered"] == 6
+    assert list(groups(auth_client, group_by="location", status="completed")) == [("Oslo", None)]
+
+    # The incrementally kept totals match a recount from the events table
+    kept = group_totals(db_session)
+    reporting.rebuild(db_session)
+    db_session.commit()
+    assert group_totals(db_session) == kept
+
+
+def test_event_report_and_timeline(auth_client):
+    event_id = create(auth_client, "Talk", "Oslo", max_attendees=8)
+    attendees = register(auth_client, event_id, 4)
+    auth_client.put(f"/attendees/{attendees[0]}/checkin")
+    today = datetime.utcnow().date().isoformat()
+
+    report = auth_client.get(f"/reports/events/{event_id}").json()
+    assert report["utilization"] == 0.5
+    assert report["check_in_rate"] == 0.25
+    # The event (in 2025) is over, so everyone else is a no-show
+    assert report["no_show_rate"] == 0.75
+    assert report["daily"] == [{"day": today, "registrations": 4, "check_ins": 1}]
+    assert auth_client.get("/reports/events/999").status_code == 404
+
+    assert auth_client.get("/reports/registrations").json() == [{"day": today, "registrations": 4, "check_ins": 1}]
+    yesterday = (datetime.utcnow().date() - timedelta(days=1)).isoformat()
+    assert auth_client.get("/reports/registrations", params={"to": yesterday}).json() == []
+    assert auth_client.get("/reports/registrations", params={"from": today, "to": yesterday}).status_code == 400
+    assert auth_client.get("/reports/registrations", params={"from": "2020-01-01", "to": today}).status_code == 400
+
+
+def test_registering_and_checking_in_do_not_reread_the_event(auth_client, db_session, test_engine):
+    event_id = create(auth_client, "Talk", "Oslo")
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(test_engine, "before_cursor_execute", record)
+    try:
+        assert capacity.reserve_seats(db_session, event_id, 2)
+        occupancy.record_check_ins(db_session, event_id, 1)
+        db_session.commit()
+    finally:
+        event.remove(test_engine, "before_cursor_execute", record)
+    # One counter UPDATE and two rollup upserts each; the group comes back from the UPDATE
+    assert len(statements) == 6
+    assert not any(sql.lstrip().upper().startswith("SELECT") for sql in statements)
+    assert group_totals(db_session)[("Oslo", "scheduled")][2:] == [2, 1]
@@ -0,0 +1,109 @@
+import re
+from datetime import datetime
+
+import pytest
+
+import config
+import search
+from models import Attendee, Event
+
+
+@pytest.fixture
+def seeded(db_session):
+    events = [
+        Event(name="Summit Berlin", description="Python conference", location="Berlin",
+              start_time=datetime(2025, 3, 15, 10), end_time=datetime(2025, 3, 15, 17), max_attendees=100),
+        Event(name="Python Meetup", description="Talks about Rust bindings", location="Paris",
+              start_time=datetime(2025, 4, 1, 18), end_time=datetime(2025, 4, 1, 21), max_attendees=50),
+    ]
+    db_session.add_all(events)
+    db_session.flush()
+    people = [
+        ("John", "Smith", "john.smith@example.com", "555-0100", events[0]),
+        ("Johanna", "Berg", "jb@example.org", "555-0101", events[0]),
+        ("Mary", "Johnson", "mary@example.com", "555-0199", events[1]),
+        ("Zoë", "Adams", "zoe@example.com", "777-1234", events[1]),
+    ]
+    db_session.add_all([
+        Attendee(first_name=first, last_name=last, email=email, phone_number=phone, event_id=event.event_id)
+        for first, last, email, phone, event in people
+    ])
+    db_session.commit()
+    return [event.event_id for event in events]
+
+
+def names(response):
+    assert response.status_code == 200, response.text
+    return [(row["first_name"], row["last_name"]) for row in response.json()]
+
+
+def test_attendee_prefix_search(auth_client, seeded):
+    assert set(names(auth_client.get("/attendees/search", params={"q": "joh"}))) == {
+        ("John", "Smith"), ("Johanna", "Berg"), ("Mary", "Johnson"),
+    }
+    assert names(auth_client.get("/attendees/search", params={"q": "john.sm"})) == [("John", "Smith")]
+    assert names(auth_client.get("/attendees/search", params={"q": "jo sm"})) == [("John", "Smith")]
+    assert names(auth_client.get("/attendees/search", params={"q": "777"})) == [("Zoë", "Adams")]
+    assert names(auth_client.get("/attendees/search", params={"q": "+1-555-0199"})) == [("Mary", "Johnson")]
+    assert names(auth_client.get("/attendees/search", params={"q": "zoe"})) == [("Zoë", "Adams")]
+    assert names(auth_client.get("/attendees/search", params={"q": "joh", "event_id": seeded[1]})) == [("Mary", "Johnson")]
+    assert auth_client.get("/attendees/search", params={"q": "nobody"}).json() == []
+
+
+def test_search_follows_updates_and_pages(auth_client, db_session, seeded):
+    attendee = db_session.query(Attendee).filter_by(email="jb@example.org").one()
+    attendee.last_name = "Lindqvist"
+    db_session.commit()
+    assert names(auth_client.get("/attendees/search", params={"q": "lindq"})) == [("Johanna", "Lindqvist")]
+    assert auth_client.get("/attendees/search", params={"q": "berg"}).json() == []
+
+    first = auth_client.get("/attendees/search", params={"q": "55", "limit": 2, "fields": "email"})
+    second = auth_client.get("/attendees/search", params={"q": "55", "limit": 2, "fields": "email",
+                                                          "cursor": first.headers["X-Next-Cursor"]})
+    assert "X-Next-Cursor" not in second.headers
+    emails = [row["email"] for row in first.json() + second.json()]
+    assert sorted(emails) == ["jb@example.org", "john.smith@example.com", "mary@example.com"]
+
+
+def test_event_search_ranks_name_above_description(auth_client, seeded):
+    response = auth_client.get("/events/search", params={"q": "pyth"})
+    assert [row["name"] for row in response.json()] == ["Python Meetup", "Summit Berlin"]
+    assert [row["name"] for row in auth_client.get("/events/search", params={"q": "paris"}).json()] == ["Python Meetup"]
+
+    assert auth_client.put(f"/events/{seeded[1]}", json={"location": "Lyon"}).status_code == 200
+    assert auth_client.get("/events/search", params={"q": "paris"}).json() == []
+
+
+def test_search_rejects_short_terms(auth_client, seeded):
+    assert auth_client.get("/attendees/search", params={"q": "j"}).status_code == 422
+    assert auth_client.get("/attendees/search", params={"q": "jo s"}).status_code == 400
+    assert auth_client.get("/attendees/search", params={"q": "jo", "cursor": "bad"}).status_code == 400
+    assert auth_client.get("/attendees/search", params={"q": "@@"}).status_code == 400
+
+
+def test_broad_queries_rank_most_recent_matches_then_page_past_them(auth_client, seeded, monkeypatch):
+    monkeypatch.setattr(config, "SEARCH_RANK_WINDOW", 2)
+    found = names(auth_client.get("/attendees/search", params={"q": "example"}))
+    # The two most recent matches are ranked; older ones follow, newest first
+    assert sorted(found[:2]) == [("Mary", "Johnson"), ("Zoë", "Adams")]
+    assert found[2:] == [("Johanna", "Berg"), ("John", "Smith")]
+
+    paged, cursor = [], None
+    while True:
+        params = {"q": "example", "limit": 1, **({"cursor": cursor} if cursor else {})}
+        response = auth_client.get("/attendees/search", params=params)
+        paged += names(response)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert paged == found
+
+
+def test_postgres_search_matches_word_prefixes():
+    pattern = search._word_prefix_pattern("john.sm")
+    assert pattern == r"(^|[^[:alnum:]])john\.sm"
+    # The same expression in Python's dialect: a prefix of any word, not a substring
+    matches = re.compile(pattern.replace("[^[:alnum:]]", r"[\W_]"), re.IGNORECASE).search
+    assert matches("John Smith john.smith@example.com")
+    assert matches("Mary Jones john.sm")
+    assert not matches("Mary Jones majohn.smith@example.com")
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+
+import config
+import serialization
+from models import EventStatus
+
+
+@pytest.fixture
+def event(make_event):
+    return make_event(attendees=3, checked_in=1, start_time=datetime(2025, 3, 15, 10, 30, 0, 250000),
+                      status=EventStatus.ongoing)
+
+
+@pytest.mark.parametrize("url", ["/events/", "/attendees/attendees?event_id={event_id}&limit=2"])
+def test_fast_path_matches_validated_output(auth_client, event, monkeypatch, url):
+    url = url.format(event_id=event.event_id)
+    validated = auth_client.get(url)
+    monkeypatch.setattr(config, "FAST_JSON", True)
+    fast = auth_client.get(url)
+
+    assert fast.status_code == validated.status_code == 200
+    assert fast.content == validated.content
+    assert fast.headers.get("X-Next-Cursor") == validated.headers.get("X-Next-Cursor")
+
+
+def test_dumps_without_orjson(monkeypatch):
+    from pydantic_core import to_json
+
+    row = {"when": datetime(2025, 3, 15, 10), "status": EventStatus.completed, "n": 1}
+    expected = serialization.dumps([row])
+    monkeypatch.setattr(serialization, "orjson", None)
+    monkeypatch.setattr(serialization, "to_json", to_json, raising=False)
+    assert serialization.dumps([row]) == expected == b'[{"when":"2025-03-15T10:00:00","status":"completed","n":1}]'
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from shared_state import MemoryBackend, SQLiteBackend, make_backend
+
+
+def test_make_backend_by_url(tmp_path):
+    assert isinstance(make_backend("", 10), MemoryBackend)
+    assert isinstance(make_backend(f"sqlite:///{tmp_path / 'state.db'}", 10), SQLiteBackend)
+    with pytest.raises(ValueError):
+        make_backend("memcached://localhost", 10)
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    # Two instances on one file stand in for two worker processes
+    path = str(tmp_path / "state.db")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+
+    first.set("event:1", {"name": "Launch", "max_attendees": 10}, ttl=60)
+    assert second.get("event:1") == {"name": "Launch", "max_attendees": 10}
+    second.delete("event:1")
+    assert first.get("event:1") is None
+
+    first.incr("events:gen:all")
+    second.incr("events:gen:all")
+    assert (first.counter("events:gen:all"), second.counter("events:gen:missing")) == (2, 0)
+
+    first.set("short", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert second.get("short") is None
+
+    second.clear()
+    assert first.counter("events:gen:all") == 0
+    assert second.stats() == {"backend": "sqlite", "hits": 1, "misses": 1}
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_token_buckets(kind, tmp_path):
+    backend = MemoryBackend(2) if kind == "memory" else SQLiteBackend(str(tmp_path / "state.db"))
+    assert [backend.take("client", rate=10, burst=2) for _ in range(2)] == [0, 0]
+    # Empty: the next token is about 1/rate away
+    assert 0.05 < backend.take("client", rate=10, burst=2) <= 0.1
+    time.sleep(0.11)
+    assert backend.take("client", rate=10, burst=2) == 0
+    assert backend.take("other", rate=10, burst=1) == 0
+    backend.clear()
+    assert backend.take("client", rate=10, burst=2) == 0
+    # A rate of 0 is no limit rather than a division by zero
+    assert [backend.take("free", rate=0, burst=1) for _ in range(3)] == [0, 0, 0]
+
+
+def test_memory_buckets_are_bounded():
+    backend = MemoryBackend(2)
+    for key in ("a", "b", "c"):
+        backend.take(key, rate=0.001, burst=1)
+    # "a" was least recently used and evicted, so it starts full again
+    assert backend.take("a", rate=0.001, burst=1) == 0
+    assert backend.take("c", rate=0.001, burst=1) > 0